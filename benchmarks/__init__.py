@@ -0,0 +1,15 @@
+"""
+Benchmarks for pyrms, on synthetic gridded models
+(see :mod:`pyrms.synthetic`), in the format of airspeed velocity (asv):
+
+    asv run
+
+or without asv:
+
+    python -m benchmarks.run
+
+Model sizes (numbers of HRUs) are set with the PYRMS_BENCHMARK_SIZES
+environment variable (e.g. PYRMS_BENCHMARK_SIZES=1e3,1e7); by default,
+10^3 to 10^6. The models are written once, to PYRMS_BENCHMARK_DIR
+(by default, a pyrms_benchmarks folder in the system temporary folder).
+"""
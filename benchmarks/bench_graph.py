@@ -0,0 +1,27 @@
+import numpy as np
+from pyrms.graph import cascadeGraph
+from .common import sizes
+
+
+class chainSuite:
+    """Routing graph of a single chain of cascades, the deepest graph
+    for its size (one HRU in each level of the topological sort)."""
+    params = sizes
+    param_names = ['nhru']
+
+    def setup(self, nhru):
+        self.up_id = np.arange(1, nhru + 1)
+        self.down_id = self.up_id + 1
+        self.down_id[-1] = 0
+        self.graph = cascadeGraph(self.up_id, self.down_id)
+        self.graph.order
+        self.values = np.ones(nhru)
+
+    def time_sort(self, nhru):
+        cascadeGraph(self.up_id, self.down_id).order
+
+    def time_accumulate(self, nhru):
+        self.graph.accumulate(self.values)
+
+    def time_outlets(self, nhru):
+        self.graph.outlets
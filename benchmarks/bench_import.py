@@ -0,0 +1,33 @@
+"""
+Import times, in a fresh interpreter. Short-lived scripts and worker
+processes pay these on every start, so pyrms only imports pandas and the
+optional dependencies (shapely, pyarrow, gisutils, matplotlib) when
+they're used.
+"""
+import subprocess
+import sys
+
+
+class importSuite:
+    """Time to import parts of pyrms (including numpy)."""
+
+    def timeraw_import_control_file(self):
+        return 'from pyrms import controlFile'
+
+    def timeraw_import_model(self):
+        return 'from pyrms import model'
+
+    def timeraw_import_numpy(self):
+        # baseline; imported by all of pyrms
+        return 'import numpy'
+
+    def timeraw_import_model_and_pandas(self):
+        # what importing pyrms cost before pandas was imported lazily
+        return 'from pyrms import model; import pandas'
+
+    def track_modules_control_file(self):
+        """Number of modules imported by ``from pyrms import controlFile``."""
+        code = 'import sys; n = len(sys.modules); ' \
+               'from pyrms import controlFile; print(len(sys.modules) - n)'
+        return int(subprocess.check_output([sys.executable, '-c', code]))
+    track_modules_control_file.unit = 'modules'
@@ -0,0 +1,71 @@
+import os
+from pyrms import model, controlFile
+from pyrms.synthetic import get_xy_points
+from .common import modelBenchmark, get_throughput
+
+
+class modelSuite(modelBenchmark):
+    """Loading and summarizing the model, and its cascades."""
+
+    def setup(self, nhru):
+        super().setup(nhru)
+        self.m = model.load(self.control_file, nrow=self.nrow, ncol=self.ncol,
+                            xy_points=get_xy_points(self.nrow, self.ncol),
+                            check=False, cache=False)
+        self.cascades = self.m.files[[k for k in self.m.files
+                                      if 'cascades' in str(k)][0]]
+        self.nvalues = sum(p.nvalues for p in self.m.params.values())
+
+    def load(self, **kwargs):
+        return model.load(self.control_file, nrow=self.nrow, ncol=self.ncol,
+                          check=False, **kwargs)
+
+    def time_load(self, nhru):
+        self.load(cache=False)
+
+    def time_load_lazy(self, nhru):
+        self.load(lazy=True, cache=False)
+
+    def time_load_parallel(self, nhru):
+        self.load(cache=False, workers=3)
+
+    def time_summary(self, nhru):
+        # statistics are cached until the parameters change
+        for p in self.m.params.values():
+            p.modified = True
+        self.m.summary
+
+    def time_cascades_df(self, nhru):
+        self.cascades.df
+
+    def time_cascades_df_xy(self, nhru):
+        self.cascades.get_cascades_dataframe(geometry=False)
+
+    def time_cascades_graph(self, nhru):
+        self.cascades.graph.levels
+
+    def peakmem_load(self, nhru):
+        self.load(cache=False)
+
+    def peakmem_cascades_df(self, nhru):
+        self.cascades.df
+
+    def track_load_values_per_second(self, nhru):
+        return get_throughput(lambda: self.load(cache=False), self.nvalues)
+    track_load_values_per_second.unit = 'values/s'
+
+
+class controlFileSuite(modelBenchmark):
+    """Reading and writing the control file."""
+    params = [1000]
+
+    def setup(self, nhru):
+        super().setup(nhru)
+        self.ctrl = controlFile.load(self.control_file)
+        self.output = os.path.join(self.workspace, 'synthetic.control')
+
+    def time_load(self, nhru):
+        controlFile.load(self.control_file)
+
+    def time_write(self, nhru):
+        self.ctrl.write(self.output)
@@ -0,0 +1,74 @@
+import os
+from pyrms import paramFile
+from .common import modelBenchmark, get_throughput
+
+
+class paramFileSuite(modelBenchmark):
+    """Reading and writing the gridded parameter file."""
+
+    def setup(self, nhru):
+        super().setup(nhru)
+        self.filename = os.path.join(self.model_ws, 'params.param')
+        self.nbytes = os.path.getsize(self.filename)
+        self.cache_dir = os.path.join(self.workspace, 'cache')
+        # parse the file into the cache (for time_load_cached),
+        # and for the write benchmarks
+        self.pf = paramFile.load(self.filename, cache_dir=self.cache_dir)
+        self.nvalues = sum(p.nvalues for p in self.pf.params.values())
+        self.output = os.path.join(self.workspace, 'params{}.param'.format(nhru))
+
+    def time_load(self, nhru):
+        paramFile.load(self.filename, cache=False)
+
+    def time_load_cached(self, nhru):
+        paramFile.load(self.filename, cache_dir=self.cache_dir)
+
+    def time_load_lazy(self, nhru):
+        paramFile.load(self.filename, lazy=True, cache=False)
+
+    def time_load_only(self, nhru):
+        paramFile.load(self.filename, load_only='hru_elev', cache=False)
+
+    def time_load_compact(self, nhru):
+        paramFile.load(self.filename, compact=True, cache=False)
+
+    def time_write(self, nhru):
+        self.pf.write(self.output, incremental=False)
+
+    def time_write_run_length(self, nhru):
+        self.pf.write(self.output, incremental=False, run_length=True)
+
+    def time_write_incremental(self, nhru):
+        # one modified parameter; the others are copied
+        self.pf.params['hru_elev'].modified = True
+        self.pf.write(self.output)
+
+    def peakmem_load(self, nhru):
+        paramFile.load(self.filename, cache=False)
+
+    def peakmem_load_compact(self, nhru):
+        paramFile.load(self.filename, compact=True, cache=False)
+
+    def peakmem_write(self, nhru):
+        self.pf.write(self.output, incremental=False)
+
+    def track_load_values_per_second(self, nhru):
+        return get_throughput(
+            lambda: paramFile.load(self.filename, cache=False), self.nvalues)
+    track_load_values_per_second.unit = 'values/s'
+
+    def track_load_mb_per_second(self, nhru):
+        return get_throughput(
+            lambda: paramFile.load(self.filename, cache=False), self.nbytes / 1e6)
+    track_load_mb_per_second.unit = 'MB/s'
+
+    def track_write_values_per_second(self, nhru):
+        return get_throughput(
+            lambda: self.pf.write(self.output, incremental=False), self.nvalues)
+    track_write_values_per_second.unit = 'values/s'
+
+    def track_write_mb_per_second(self, nhru):
+        return get_throughput(
+            lambda: self.pf.write(self.output, incremental=False),
+            self.nbytes / 1e6)
+    track_write_mb_per_second.unit = 'MB/s'
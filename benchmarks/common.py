@@ -0,0 +1,49 @@
+import os
+import time
+import tempfile
+from pyrms.synthetic import write_synthetic_model, get_grid_shape
+
+
+sizes = [int(float(s)) for s in os.environ.get(
+    'PYRMS_BENCHMARK_SIZES', '1e3,1e4,1e5,1e6').split(',')]
+benchmark_dir = os.environ.get(
+    'PYRMS_BENCHMARK_DIR', os.path.join(tempfile.gettempdir(), 'pyrms_benchmarks'))
+
+
+def get_model(nhru):
+    """Get the control file for a synthetic model with about nhru HRUs,
+    writing the model if it doesn't exist yet."""
+    model_ws = os.path.join(benchmark_dir, 'nhru{}'.format(nhru))
+    control_file = os.path.join(model_ws, 'synthetic.control')
+    # the control file is written last
+    if not os.path.exists(control_file):
+        write_synthetic_model(model_ws, nhru=nhru)
+    return control_file
+
+
+def get_workspace():
+    """Get a folder for output files."""
+    workspace = os.path.join(benchmark_dir, 'output')
+    os.makedirs(workspace, exist_ok=True)
+    return workspace
+
+
+def get_throughput(func, amount):
+    """Run a function once, and return the amount processed per second."""
+    start = time.perf_counter()
+    func()
+    return amount / (time.perf_counter() - start)
+
+
+class modelBenchmark:
+    """Base for benchmarks on synthetic models of each size."""
+    params = sizes
+    param_names = ['nhru']
+    # writing the largest models takes a while
+    timeout = 1800
+
+    def setup(self, nhru):
+        self.control_file = get_model(nhru)
+        self.model_ws = os.path.dirname(self.control_file)
+        self.nrow, self.ncol = get_grid_shape(nhru)
+        self.workspace = get_workspace()
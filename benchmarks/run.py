@@ -0,0 +1,107 @@
+"""
+Run the benchmarks without asv, e.g.
+
+    python -m benchmarks.run -b paramFileSuite.time_load --sizes 1e3,1e5
+
+Times are the best of several repeats; peak memory is the peak of the
+memory allocated while the benchmark runs (from tracemalloc), which is
+tracked by Python and numpy, rather than the process resident size.
+Code from timeraw benchmarks is timed in a new interpreter for each
+repeat (not including the interpreter's own startup).
+"""
+import argparse
+import contextlib
+import importlib
+import inspect
+import io
+import re
+import subprocess
+import sys
+import time
+import tracemalloc
+import pandas as pd
+
+
+modules = ['bench_param', 'bench_model', 'bench_graph', 'bench_import']
+
+
+def get_suites():
+    for name in modules:
+        module = importlib.import_module('.' + name, __package__)
+        for suite_name, suite in inspect.getmembers(module, inspect.isclass):
+            if suite.__module__ == module.__name__:
+                yield suite_name, suite
+
+
+def timeraw(code, repeat=3):
+    """Best time to run code in a new interpreter."""
+    timer = 'import time; start = time.perf_counter()\n{}\n' \
+            'print(time.perf_counter() - start)'.format(code)
+    return min(float(subprocess.check_output([sys.executable, '-c', timer]))
+               for i in range(repeat))
+
+
+def run_benchmark(suite, method_name, param, repeat=3):
+    instance = suite()
+    # suites without parameters
+    args = () if param is None else (param,)
+    # quiet the messages from loading and writing
+    with contextlib.redirect_stdout(io.StringIO()):
+        if hasattr(instance, 'setup'):
+            instance.setup(*args)
+        method = getattr(instance, method_name)
+        if method_name.startswith('timeraw_'):
+            return timeraw(method(*args), repeat=repeat), 's'
+        elif method_name.startswith('time_'):
+            times = []
+            for i in range(repeat):
+                start = time.perf_counter()
+                method(*args)
+                times.append(time.perf_counter() - start)
+            return min(times), 's'
+        elif method_name.startswith('peakmem_'):
+            tracemalloc.start()
+            try:
+                method(*args)
+                return tracemalloc.get_traced_memory()[1] / 2**20, 'MiB'
+            finally:
+                tracemalloc.stop()
+        return method(*args), getattr(method, 'unit', '')
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('-b', '--bench', default='.',
+                        help='regular expression for the benchmarks to run')
+    parser.add_argument('--sizes', default=None,
+                        help='numbers of HRUs, separated by commas')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('-o', '--output', default=None,
+                        help='csv file for the results')
+    args = parser.parse_args(args)
+    results = []
+    for suite_name, suite in get_suites():
+        sizes = getattr(suite, 'params', [None])
+        if args.sizes is not None and len(sizes) > 1:
+            sizes = [int(float(s)) for s in args.sizes.split(',')]
+        for method_name in sorted(dir(suite)):
+            if not re.match('(time|timeraw|peakmem|track)_', method_name):
+                continue
+            name = '{}.{}'.format(suite_name, method_name)
+            if not re.search(args.bench, name):
+                continue
+            for param in sizes:
+                value, unit = run_benchmark(suite, method_name, param,
+                                            repeat=args.repeat)
+                results.append({'benchmark': name, 'nhru': param,
+                                'value': value, 'unit': unit})
+                print('{:<50s} {:>10s} {:>14.4g} {}'.format(
+                    name, '' if param is None else str(param), value, unit))
+    results = pd.DataFrame(results)
+    if args.output is not None:
+        results.to_csv(args.output, index=False)
+    return results
+
+
+if __name__ == '__main__':
+    main()
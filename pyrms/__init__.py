@@ -1,9 +1,29 @@
 __name__ = 'pyrms'
 __author__ = 'Andrew Leaf'
+import importlib
 from .version import __version__, __build__, __git_commit__
 
 #imports
-from .control import controlFile
+# param is imported up front, because importing the pyrms.param module
+# (which every reader does) would otherwise shadow the param class;
+# other classes are imported the first time they're used (see __getattr__)
 from .param import paramFile, param
-from .cascades import cascadeParamFile
-from .prms import model
\ No newline at end of file
+
+# names that are imported from submodules on first use,
+# so that e.g. ``from pyrms import controlFile`` doesn't import everything
+_lazy = {'controlFile': 'control',
+         'cascadeParamFile': 'cascades',
+         'model': 'prms'}
+
+
+def __getattr__(name):
+    if name in _lazy:
+        module = importlib.import_module('.' + _lazy[name], __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    raise AttributeError("module '{}' has no attribute '{}'".format(__name__, name))
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_lazy))
@@ -0,0 +1,254 @@
+"""
+Binary cache of parsed PRMS parameter files.
+
+Parameter arrays are cached as .npy files (one per parameter), alongside a
+header.json with the file comments, dimensions and parameter index.
+Entries are keyed on the absolute path of the parameter file, and are valid
+as long as the file size and modification time (or failing that, a hash of
+the file contents) match those recorded in the header. Cached arrays are
+memory-mapped copy-on-write, so in-place changes don't alter the cache.
+Entries are written by full loads; lazy loads (and loads of only some
+parameters) only read from the cache, so that they stay fast.
+"""
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import warnings
+import numpy as np
+
+
+# default location of the cache, and maximum total size (in bytes)
+default_cache_dir = os.environ.get(
+    'PYRMS_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'pyrms'))
+default_max_size = 2**33
+
+
+def get_file_hash(filename, blocksize=2**20):
+    """Hash the contents of a file in chunks."""
+    digest = hashlib.blake2b()
+    with open(filename, 'rb') as src:
+        for chunk in iter(lambda: src.read(blocksize), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_size(path):
+    size = 0
+    for entry in os.scandir(path):
+        if entry.is_file():
+            size += entry.stat().st_size
+    return size
+
+
+def evict(cache_dir=None, max_size=None):
+    """Remove the least recently used cache entries until the cache
+    is smaller than max_size.
+
+    Parameters
+    ----------
+    cache_dir : str, optional
+        By default, pyrms.cache.default_cache_dir.
+    max_size : int, optional
+        Maximum size of the cache directory, in bytes.
+        By default, pyrms.cache.default_max_size.
+
+    Returns
+    -------
+    total_size : int
+        Size of the cache directory after the eviction, in bytes.
+    """
+    if cache_dir is None:
+        cache_dir = default_cache_dir
+    if max_size is None:
+        max_size = default_max_size
+    if not os.path.isdir(cache_dir):
+        return 0
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if entry.is_dir():
+            header = os.path.join(entry.path, 'header.json')
+            last_used = os.path.getmtime(header) if os.path.exists(header) else 0
+            entries.append((last_used, get_size(entry.path), entry.path))
+    total_size = sum(e[1] for e in entries)
+    for last_used, size, path in sorted(entries):
+        if total_size <= max_size:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total_size -= size
+    return total_size
+
+
+class paramCache:
+    """Cache entry for a PRMS parameter file.
+
+    Parameters
+    ----------
+    filename : str
+        PRMS parameter file.
+    cache_dir : str, optional
+        By default, pyrms.cache.default_cache_dir.
+    max_size : int, optional
+        Maximum size of the cache directory, in bytes.
+        By default, pyrms.cache.default_max_size.
+    read_only : bool
+        If True, arrays are only read from the cache (not added to it).
+        By default, False.
+    """
+    def __init__(self, filename, cache_dir=None, max_size=None,
+                 read_only=False):
+        self.filename = os.path.abspath(filename)
+        self.cache_dir = default_cache_dir if cache_dir is None else cache_dir
+        self.max_size = default_max_size if max_size is None else max_size
+        self.read_only = read_only
+        key = hashlib.sha1(self.filename.encode()).hexdigest()[:20]
+        self.path = os.path.join(self.cache_dir, key)
+        self.header_file = os.path.join(self.path, 'header.json')
+        # bytes that can be added before the cache size is checked again
+        # (writes by other processes aren't counted)
+        self._headroom = None
+
+    def array_file(self, name):
+        return os.path.join(self.path, '{}.npy'.format(name))
+
+    def read_header(self, stat):
+        """Read the header for the cache entry.
+
+        Parameters
+        ----------
+        stat : tuple
+            (size, modification time) of the parameter file.
+
+        Returns
+        -------
+        header : dict
+            Cached comments, dimensions and parameter index,
+            or None if the cache entry doesn't exist or is out of date.
+        """
+        try:
+            with open(self.header_file) as src:
+                header = json.load(src)
+        except (OSError, ValueError):
+            return
+        size, mtime = stat
+        if header['size'] != size:
+            return
+        try:
+            if header['mtime'] != mtime:
+                # file was touched; check whether the contents changed
+                if header['hash'] != get_file_hash(self.filename):
+                    return
+                header['mtime'] = mtime
+                self._write_json(header)
+            else:
+                # update the last use time for eviction
+                os.utime(self.header_file)
+        except OSError:
+            pass
+        return header
+
+    def write_header(self, stat, file_hash, comments, dimensions, blocks):
+        """Start a new cache entry for the parameter file,
+        replacing any existing entry.
+
+        The entry is made in a temporary folder, and then moved into place,
+        so that other processes never see a partial entry."""
+        header = {'filename': self.filename,
+                  'size': stat[0],
+                  'mtime': stat[1],
+                  'hash': file_hash,
+                  'comments': comments,
+                  'dimensions': dimensions,
+                  'params': [{'name': b.name,
+                              'dim_names': b.dim_names,
+                              'nvalues': b.nvalues,
+                              'dtype': b.dtype,
+                              'header_offset': b.header_offset,
+                              'offset': b.offset,
+                              'nbytes': b.nbytes} for b in blocks]
+                  }
+        tmpdir = old = None
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            prefix = os.path.split(self.path)[1] + '.'
+            tmpdir = tempfile.mkdtemp(prefix=prefix, suffix='.tmp',
+                                      dir=self.cache_dir)
+            self._write_json(header, os.path.join(tmpdir, 'header.json'))
+            if os.path.isdir(self.path):
+                # move the existing entry aside (arrays that are
+                # memory-mapped from it stay valid until it's removed)
+                old = tempfile.mkdtemp(prefix=prefix, suffix='.old',
+                                       dir=self.cache_dir)
+                os.replace(self.path, os.path.join(old, 'entry'))
+            try:
+                os.replace(tmpdir, self.path)
+            except OSError:
+                # another process made a new entry first
+                if not os.path.isdir(self.path):
+                    raise
+            self._check_size()
+        except OSError as e:
+            warnings.warn('Could not write to cache {}:\n{}'.format(self.path, e))
+        finally:
+            for path in tmpdir, old:
+                if path is not None and os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+
+    def _write_json(self, header, header_file=None):
+        if header_file is None:
+            header_file = self.header_file
+        tmpfile = '{}.{}.tmp'.format(header_file, os.getpid())
+        with open(tmpfile, 'w') as dest:
+            json.dump(header, dest)
+        os.replace(tmpfile, header_file)
+
+    def _check_size(self, nbytes=0):
+        """Evict cache entries if nbytes more could put the cache
+        over max_size; the cache folder is only scanned when
+        the bytes written since the last check could exceed it."""
+        if self._headroom is not None:
+            self._headroom -= nbytes
+        if self._headroom is None or self._headroom < 0:
+            self._headroom = self.max_size - evict(self.cache_dir,
+                                                   self.max_size)
+
+    def load_array(self, name):
+        """Memory-map a cached parameter array (copy-on-write);
+        returns None if the array isn't cached."""
+        array_file = self.array_file(name)
+        if not os.path.exists(array_file):
+            return
+        try:
+            return np.asarray(np.load(array_file, mmap_mode='c'))
+        except ValueError:
+            # empty arrays can't be memory-mapped
+            return np.load(array_file)
+
+    def load_digest(self, name):
+        """Read the digest of a cached parameter array;
+        returns None if it isn't cached."""
+        try:
+            with open(self.array_file(name)[:-4] + '.sha256') as src:
+                return src.read().strip()
+        except OSError:
+            return
+
+    def save_array(self, name, array, digest=None):
+        """Add a parameter array (and optionally its digest) to the cache."""
+        if self.read_only or not os.path.isdir(self.path):
+            return
+        array_file = self.array_file(name)
+        tmpfile = '{}.{}.tmp'.format(array_file, os.getpid())
+        try:
+            if digest is not None:
+                digest_file = array_file[:-4] + '.sha256'
+                with open(tmpfile, 'w') as dest:
+                    dest.write(digest)
+                os.replace(tmpfile, digest_file)
+            with open(tmpfile, 'wb') as dest:
+                np.save(dest, array)
+            os.replace(tmpfile, array_file)
+            self._check_size(os.path.getsize(array_file))
+        except OSError as e:
+            warnings.warn('Could not write to cache {}:\n{}'.format(self.path, e))
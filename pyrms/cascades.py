@@ -1,25 +1,18 @@
+import logging
 import numpy as np
-import pandas as pd
-
-try:
-    from shapely.geometry import LineString, Point
-except:
-    LineString = False
-    Point = False
 from .param import paramFile
-try:
-    from gisutils import df2shp
-except:
-    df2shp = False
+from .graph import cascadeGraph
+from .columnar import write_table
+from .utils import lazy_import
+
+pd = lazy_import('pandas')
+# optional dependencies
+shapely = lazy_import('shapely', optional=True)
+shapely_geometry = lazy_import('shapely.geometry', optional=True)
+gisutils = lazy_import('gisutils', optional=True)
 
 
-if not LineString:
-    class LineString:
-        def __init__(self, crds):
-            return crds
-    class Point:
-        def __init__(self, x, y):
-            return x, y
+logger = logging.getLogger(__name__)
 
 
 class cascadeParamFile(paramFile):
@@ -33,7 +26,6 @@ class cascadeParamFile(paramFile):
                            nrow=nrow, ncol=ncol,
                            verbose=False)
 
-        self._set_names(gw)
         self.gw = gw # groundwater or hru cascades
 
         self.xy_points = xy_points
@@ -51,32 +43,158 @@ class cascadeParamFile(paramFile):
         return
 
 
+    @property
+    def gw(self):
+        """True for groundwater (GWR) cascades, False for HRU cascades."""
+        return self._gw
+
+    @gw.setter
+    def gw(self, gw):
+        self._gw = gw
+        self._set_names(gw)
+
     def _set_names(self, gw=False):
         self.didname = 'hru_down_id' if not gw else 'gw_down_id'
         self.uidname = 'hru_up_id' if not gw else 'gw_up_id'
+        self.pctname = 'hru_pct_up' if not gw else 'gw_pct_up'
+        self.dimname = 'nhru' if not gw else 'ngw'
 
     @property
     def df(self):
+        return self.get_cascades_dataframe()
+
+    @property
+    def outlets(self):
+        return self.get_outlets_dataframe()
+
+    @property
+    def graph(self):
+        return self.get_graph()
+
+    def get_graph(self, nnodes=None):
+        """Get the routing graph of the cascades.
+
+        Parameters
+        ----------
+        nnodes : int, optional
+            Number of HRUs (or GWRs). By default, the nhru (or ngw)
+            dimension of the file or model, if available.
+
+        Returns
+        -------
+        graph : :class:`pyrms.graph.cascadeGraph`
+        """
+        assert self.didname in self.params.keys() and self.uidname in self.params.keys()
+        if nnodes is None:
+            nnodes = self.dimensions.get(self.dimname)
+        if nnodes is None and self.model is not None:
+            dimensions = self.model.dimensions
+            if isinstance(dimensions, dict):
+                nnodes = dimensions.get(self.dimname)
+        weights = None
+        if self.pctname in self.params.keys():
+            weights = self.params[self.pctname].array
+        return cascadeGraph(self.params[self.uidname].array,
+                            self.params[self.didname].array,
+                            weights=weights, nnodes=nnodes)
+
+    def get_cascade_coordinates(self):
+        """Get the start and end points of the cascade arrows,
+        which cover the middle half of the line from each upslope HRU
+        to its downslope HRU.
+
+        Returns
+        -------
+        did, uid : 1D numpy arrays
+            Down and up HRU (or GWR) numbers for each cascade.
+        start, end : 2D numpy arrays
+            x, y coordinates of the start and end of each arrow.
+        """
         assert self.didname in self.params.keys() and self.uidname in self.params.keys()
         did = self.params[self.didname].array.ravel()
         uid = self.params[self.uidname].array.ravel()
-        lines = [self.make_arrow(d, u) for d, u in zip(did, uid) if d > 0]
-        return pd.DataFrame({self.didname: did[did > 0], self.uidname: uid[did > 0], 'geometry': lines})
+        valid = did > 0
+        did, uid = did[valid], uid[valid]
+        up_xy = np.asarray(self.xy_points)[uid - 1]
+        dn_xy = np.asarray(self.xy_points)[did - 1]
+        # trim the lines so they only cover half the distance between nodes
+        start = up_xy + 0.25 * (dn_xy - up_xy)
+        end = up_xy + 0.75 * (dn_xy - up_xy)
+        return did, uid, start, end
 
-    @property
-    def outlets(self):
+    def get_cascades_dataframe(self, geometry=True):
+        """Get a DataFrame of cascade arrows.
+
+        Parameters
+        ----------
+        geometry : bool
+            If True, include a column of shapely LineStrings
+            (shapely is required); otherwise include columns of arrow
+            start (x1, y1) and end (x2, y2) coordinates. By default, True.
+
+        Returns
+        -------
+        df : DataFrame
+        """
+        did, uid, start, end = self.get_cascade_coordinates()
+        df = pd.DataFrame({self.didname: did, self.uidname: uid})
+        if not geometry:
+            df['x1'], df['y1'] = start[:, 0], start[:, 1]
+            df['x2'], df['y2'] = end[:, 0], end[:, 1]
+        elif not shapely_geometry:
+            raise ImportError('Cascade geometries require shapely; use '
+                              'get_cascades_dataframe(geometry=False) for '
+                              'columns of coordinates instead.')
+        elif shapely and hasattr(shapely, 'linestrings'):
+            df['geometry'] = shapely.linestrings(np.stack([start, end], axis=1))
+        else:
+            df['geometry'] = [shapely_geometry.LineString([p1, p2])
+                              for p1, p2 in zip(start, end)]
+        return df
+
+    def get_outlet_coordinates(self):
+        """Get the HRU (or GWR) numbers and x, y coordinates
+        of the cascade outlets."""
         assert self.didname in self.params.keys() and self.uidname in self.params.keys()
-        did = self.params[self.didname].array
-        uid = self.params[self.uidname].array
+        did = self.params[self.didname].array.ravel()
+        uid = self.params[self.uidname].array.ravel()
         outlets = uid[did <= 0]
-        outletxys = self.xy_points[outlets - 1]
-        outletpoints = [Point(*p) for p in outletxys]
-        return pd.DataFrame({self.uidname: outlets, 'geometry': outletpoints})
+        return outlets, np.asarray(self.xy_points)[outlets - 1]
+
+    def get_outlets_dataframe(self, geometry=True):
+        """Get a DataFrame of cascade outlets (cascades without
+        a downslope HRU or GWR).
+
+        Parameters
+        ----------
+        geometry : bool
+            If True, include a column of shapely Points at the outlet
+            locations (shapely is required); otherwise include x and y
+            columns. By default, True.
+
+        Returns
+        -------
+        df : DataFrame
+        """
+        outlets, outletxys = self.get_outlet_coordinates()
+        df = pd.DataFrame({self.uidname: outlets})
+        if not geometry:
+            df['x'], df['y'] = outletxys[:, 0], outletxys[:, 1]
+        elif not shapely_geometry:
+            raise ImportError('Outlet geometries require shapely; use '
+                              'get_outlets_dataframe(geometry=False) for '
+                              'columns of coordinates instead.')
+        elif shapely and hasattr(shapely, 'points'):
+            df['geometry'] = shapely.points(outletxys)
+        else:
+            df['geometry'] = [shapely_geometry.Point(*p) for p in outletxys]
+        return df
 
     @staticmethod
     def load(filename, model=None, nrow=None, ncol=None,
              xy_points=None, sr=None, gw=False, verbose=False,
-             load_only=None):
+             load_only=None, lazy=False, cache=True, cache_dir=None,
+             cache_max_size=None, compact=False):
 
         pf = cascadeParamFile(filename=filename, nrow=nrow, ncol=ncol,
                               xy_points=xy_points, sr=sr, gw=gw,
@@ -86,20 +204,12 @@ class cascadeParamFile(paramFile):
         if load_only is not None and isinstance(load_only, str):
             load_only = [load_only]
         pf.load_only = load_only
-        with open(filename) as input:
-
-            line = pf.read_comments(input)
-            if 'Dimensions' in line:
-                if verbose:
-                    print('reading dimensions...')
-                line = paramFile._read_stuff(input, line, pf.read_dimension)
-            if 'Parameters' in line or '####' in line:
-                if verbose:
-                    print('reading parameters...')
-                line = paramFile._read_stuff(input, line, pf.read_param)
+        pf.compact = compact
+        pf.read(lazy=lazy, cache=cache, cache_dir=cache_dir,
+                cache_max_size=cache_max_size)
 
         cascadetype = set([k.split('_')[0] for k in pf.params.keys()])
-        print(cascadetype)
+        logger.debug('cascade types in {}: {}'.format(filename, cascadetype))
         if len(cascadetype) == 1 and 'gw' in cascadetype:
             pf.gw = True
 
@@ -126,26 +236,65 @@ class cascadeParamFile(paramFile):
         # get the coordinates of the up and down hrus; make a line
         dn_xy = self.xy_points[d - 1]
         up_xy = self.xy_points[u - 1]
-        ls = LineString([dn_xy, up_xy])
+        ls = shapely_geometry.LineString([dn_xy, up_xy])
 
         # trim the line so it only covers half distance between nodes
         p1 = ls.interpolate(ls.length * .25)
         p2 = ls.interpolate(ls.length * .75)
-        ls = LineString([p1, p2])
+        ls = shapely_geometry.LineString([p1, p2])
         return ls
 
+    def write_cascades_table(self, filename, geometry='wkb', epsg=None,
+                             proj4=None, chunksize=2**20, format=None):
+        """Write the cascade arrows to a GeoParquet or Arrow/Feather file,
+        in chunks. Parts of the file can be read back by area or
+        upslope HRU number with :func:`pyrms.columnar.read_table`.
+
+        Parameters
+        ----------
+        filename : str
+            Output file; .parquet for GeoParquet, .feather or .arrow
+            for Arrow IPC.
+        geometry : {'wkb', 'xy'}
+            Write a well-known binary geometry column, or arrow start
+            (x1, y1) and end (x2, y2) coordinate columns. By default, 'wkb'.
+        epsg, proj4 : optional
+            Coordinate reference system; by default, the file's.
+        chunksize : int
+            Number of cascades per row group or record batch.
+        format : {'parquet', 'feather'}, optional
+            By default, inferred from the file extension.
+        """
+        epsg = self.epsg if epsg is None else epsg
+        proj4 = self.proj4 if proj4 is None else proj4
+        did, uid, start, end = self.get_cascade_coordinates()
+        write_table(filename, {self.didname: did, self.uidname: uid},
+                    [start, end], geometry=geometry, epsg=epsg, proj4=proj4,
+                    id_column=self.uidname, chunksize=chunksize, format=format)
+
+    def write_outlets_table(self, filename, geometry='wkb', epsg=None,
+                            proj4=None, chunksize=2**20, format=None):
+        """Write the cascade outlets to a GeoParquet or Arrow/Feather file;
+        see :meth:`write_cascades_table`."""
+        epsg = self.epsg if epsg is None else epsg
+        proj4 = self.proj4 if proj4 is None else proj4
+        outlets, outletxys = self.get_outlet_coordinates()
+        write_table(filename, {self.uidname: outlets}, [outletxys],
+                    geometry=geometry, epsg=epsg, proj4=proj4,
+                    id_column=self.uidname, chunksize=chunksize, format=format)
+
     def write_cascades_shapefile(self, filename, gw=False, epsg=None, proj4=None):
         epsg = self.epsg if epsg is None else epsg
         proj4 = self.proj4 if proj4 is None else proj4
-        if not df2shp:
-            print('GIS_utils not installed.')
+        if not gisutils:
+            logger.warning('GIS_utils not installed.')
             return
-        df2shp(self.df, filename, epsg=epsg, proj4=proj4)
+        gisutils.df2shp(self.df, filename, epsg=epsg, proj4=proj4)
 
     def write_outlets_shapefile(self, filename, gw=False, epsg=None, proj4=None):
         epsg = self.epsg if epsg is None else epsg
         proj4 = self.proj4 if proj4 is None else proj4
-        if not df2shp:
-            print('GIS_utils not installed.')
+        if not gisutils:
+            logger.warning('GIS_utils not installed.')
             return
-        df2shp(self.outlets, filename, epsg=epsg, proj4=proj4)
\ No newline at end of file
+        gisutils.df2shp(self.outlets, filename, epsg=epsg, proj4=proj4)
\ No newline at end of file
@@ -0,0 +1,223 @@
+"""
+Columnar (GeoParquet or Arrow/Feather) export of point and line features,
+such as cascade arrows and outlets.
+
+Tables are written in chunks (one Parquet row group or Arrow record batch
+per chunk). Each feature has a bounding box column (a struct of xmin, ymin,
+xmax, ymax; the GeoParquet 1.1 bbox covering), so that :func:`read_table`
+can select features by area, skipping row groups that don't overlap it.
+"""
+import json
+import numpy as np
+from pyrms.utils import lazy_import
+
+# optional dependencies
+pa = lazy_import('pyarrow', optional=True)
+pc = lazy_import('pyarrow.compute', optional=True)
+ds = lazy_import('pyarrow.dataset', optional=True)
+pq = lazy_import('pyarrow.parquet', optional=True)
+shapely = lazy_import('shapely', optional=True)
+pyproj = lazy_import('pyproj', optional=True)
+
+
+# well-known binary (little endian) layouts for points and two-vertex lines
+wkb_dtypes = {
+    'Point': np.dtype([('byteorder', 'u1'), ('type', '<u4'),
+                       ('coords', '<f8', (2,))]),
+    'LineString': np.dtype([('byteorder', 'u1'), ('type', '<u4'),
+                            ('npoints', '<u4'), ('coords', '<f8', (4,))]),
+}
+wkb_types = {'Point': 1, 'LineString': 2}
+
+
+def get_format(filename, format=None):
+    if format is None:
+        ext = str(filename).lower().rsplit('.', 1)[-1]
+        format = 'feather' if ext in {'feather', 'arrow', 'ipc'} else 'parquet'
+    if format not in {'parquet', 'feather'}:
+        raise ValueError('Unrecognized format: {}'.format(format))
+    return format
+
+
+def to_wkb(coordinates):
+    """Encode points or two-vertex lines as well-known binary.
+
+    Parameters
+    ----------
+    coordinates : list of 2D arrays
+        One (n, 2) array of x, y coordinates for points,
+        or two (start and end) for lines.
+
+    Returns
+    -------
+    wkb : pyarrow.BinaryArray
+    """
+    geom_type = 'Point' if len(coordinates) == 1 else 'LineString'
+    dtype = wkb_dtypes[geom_type]
+    n = len(coordinates[0])
+    records = np.empty(n, dtype=dtype)
+    records['byteorder'] = 1
+    records['type'] = wkb_types[geom_type]
+    if geom_type == 'LineString':
+        records['npoints'] = 2
+    records['coords'] = np.hstack(coordinates)
+    offsets = np.arange(n + 1, dtype=np.int32) * dtype.itemsize
+    return pa.BinaryArray.from_buffers(pa.binary(), n,
+                                       [None, pa.py_buffer(offsets),
+                                        pa.py_buffer(records.view(np.uint8))])
+
+
+def get_crs(epsg=None, proj4=None):
+    """Get a PROJJSON coordinate reference system for the GeoParquet
+    metadata, or None (unknown) if pyproj isn't installed."""
+    if not pyproj or (epsg is None and proj4 is None):
+        return
+    crs = pyproj.CRS.from_epsg(epsg) if epsg is not None \
+        else pyproj.CRS.from_proj4(proj4)
+    return crs.to_json_dict()
+
+
+def get_metadata(geom_type, geometry='wkb', crs=None, id_column=None):
+    metadata = {b'pyrms': json.dumps({'id_column': id_column}).encode()}
+    if geometry == 'wkb':
+        geo = {'version': '1.1.0',
+               'primary_column': 'geometry',
+               'columns': {'geometry': {
+                   'encoding': 'WKB',
+                   'geometry_types': [geom_type],
+                   'crs': crs,
+                   'covering': {'bbox': {
+                       'xmin': ['bbox', 'xmin'], 'ymin': ['bbox', 'ymin'],
+                       'xmax': ['bbox', 'xmax'], 'ymax': ['bbox', 'ymax']}}
+               }}}
+        metadata[b'geo'] = json.dumps(geo).encode()
+    return metadata
+
+
+def get_chunk(columns, coordinates, geometry='wkb'):
+    """Make a record batch of attributes, geometries and bounding boxes."""
+    arrays = {name: pa.array(values) for name, values in columns.items()}
+    xy = np.stack(coordinates)
+    xmin, ymin = xy.min(axis=0).T
+    xmax, ymax = xy.max(axis=0).T
+    if geometry == 'wkb':
+        arrays['geometry'] = to_wkb(coordinates)
+    elif len(coordinates) == 1:
+        arrays['x'], arrays['y'] = [pa.array(c) for c in coordinates[0].T]
+    else:
+        (x1, y1), (x2, y2) = [c.T for c in coordinates]
+        arrays.update({'x1': pa.array(x1), 'y1': pa.array(y1),
+                       'x2': pa.array(x2), 'y2': pa.array(y2)})
+    arrays['bbox'] = pa.StructArray.from_arrays(
+        [pa.array(xmin), pa.array(ymin), pa.array(xmax), pa.array(ymax)],
+        names=['xmin', 'ymin', 'xmax', 'ymax'])
+    return pa.RecordBatch.from_pydict(arrays)
+
+
+def write_table(filename, columns, coordinates, geometry='wkb',
+                epsg=None, proj4=None, id_column=None,
+                chunksize=2**20, format=None):
+    """Write point or line features to a GeoParquet or Arrow/Feather file.
+
+    Parameters
+    ----------
+    filename : str
+    columns : dict
+        Attribute arrays, keyed by column name.
+    coordinates : list of 2D arrays
+        One (n, 2) array of x, y coordinates for points,
+        or two (start and end) for lines.
+    geometry : {'wkb', 'xy'}
+        Write the geometries as a well-known binary (GeoParquet)
+        geometry column, or as coordinate columns (x, y for points;
+        x1, y1, x2, y2 for lines). By default, 'wkb'.
+    epsg, proj4 : optional
+        Coordinate reference system, recorded in the GeoParquet metadata
+        if pyproj is installed.
+    id_column : str, optional
+        Column for selecting features by ID range in :func:`read_table`.
+    chunksize : int
+        Number of features per row group or record batch.
+    format : {'parquet', 'feather'}, optional
+        By default, inferred from the file extension
+        (feather for .feather, .arrow or .ipc; otherwise parquet).
+    """
+    if not pa:
+        raise ImportError('Writing GeoParquet or Feather files requires pyarrow.')
+    if geometry not in {'wkb', 'xy'}:
+        raise ValueError('geometry must be "wkb" or "xy"')
+    format = get_format(filename, format)
+    geom_type = 'Point' if len(coordinates) == 1 else 'LineString'
+    metadata = get_metadata(geom_type, geometry,
+                            crs=get_crs(epsg, proj4), id_column=id_column)
+    n = len(coordinates[0])
+    schema = get_chunk({k: v[:0] for k, v in columns.items()},
+                       [c[:0] for c in coordinates], geometry).schema
+    schema = schema.with_metadata(metadata)
+    if format == 'parquet':
+        writer = pq.ParquetWriter(str(filename), schema)
+    else:
+        writer = pa.ipc.new_file(str(filename), schema)
+    with writer:
+        for i in range(0, max(n, 1), chunksize):
+            chunk = get_chunk({k: v[i:i + chunksize] for k, v in columns.items()},
+                              [c[i:i + chunksize] for c in coordinates],
+                              geometry)
+            if format == 'parquet':
+                writer.write_batch(chunk, row_group_size=chunksize)
+            else:
+                writer.write_batch(chunk)
+
+
+def read_table(filename, bbox=None, id_range=None, columns=None,
+               format=None):
+    """Read all or part of a file written by :func:`write_table`.
+
+    Parameters
+    ----------
+    filename : str
+    bbox : tuple, optional
+        (xmin, ymin, xmax, ymax) area; only features whose bounding boxes
+        intersect it are read. In Parquet files, row groups that don't
+        overlap the area are skipped.
+    id_range : tuple, optional
+        (first, last) range of IDs to read (inclusive), from the id_column
+        specified when the file was written.
+    columns : list of str, optional
+        Columns to read. By default, all columns except bbox.
+    format : {'parquet', 'feather'}, optional
+        By default, inferred from the file extension.
+
+    Returns
+    -------
+    df : DataFrame
+        With the geometry column converted to shapely objects,
+        if shapely is installed.
+    """
+    if not pa:
+        raise ImportError('Reading GeoParquet or Feather files requires pyarrow.')
+    format = get_format(filename, format)
+    dataset = ds.dataset(str(filename),
+                         format='parquet' if format == 'parquet' else 'ipc')
+    if columns is None:
+        columns = [name for name in dataset.schema.names if name != 'bbox']
+    expression = None
+    if bbox is not None:
+        xmin, ymin, xmax, ymax = bbox
+        expression = (pc.field('bbox', 'xmax') >= xmin) & \
+                     (pc.field('bbox', 'xmin') <= xmax) & \
+                     (pc.field('bbox', 'ymax') >= ymin) & \
+                     (pc.field('bbox', 'ymin') <= ymax)
+    if id_range is not None:
+        metadata = json.loads(dataset.schema.metadata[b'pyrms'])
+        id_column = metadata['id_column']
+        if id_column is None:
+            raise ValueError('No id_column in {}'.format(filename))
+        first, last = id_range
+        in_range = (pc.field(id_column) >= first) & (pc.field(id_column) <= last)
+        expression = in_range if expression is None else expression & in_range
+    table = dataset.to_table(columns=columns, filter=expression)
+    df = table.to_pandas()
+    if 'geometry' in df.columns and shapely:
+        df['geometry'] = shapely.from_wkb(df['geometry'].values)
+    return df
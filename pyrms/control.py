@@ -1,6 +1,18 @@
+import os
+import logging
+import itertools
+from time import perf_counter
 import numpy as np
-import pandas as pd
+from pyrms.data import dataFile
 from pyrms.dtypes import dtypes
+from pyrms.instrument import hooks, emit
+from pyrms.output import statVarFile, aniFile, csvOutputFile, mapOutputFile
+from pyrms.utils import lazy_import
+
+pd = lazy_import('pandas')
+
+
+logger = logging.getLogger(__name__)
 
 
 class controlParam:
@@ -34,7 +46,7 @@ class controlParam:
         for v in self.values:
             f.write('{}\n'.format(v))
         if self.verbose:
-            print(self.name)
+            logger.info(self.name)
 
 
 class controlFile:
@@ -134,7 +146,65 @@ class controlFile:
 
     @property
     def nstatVars(self):
-        return len(self.aniOutVar_names)
+        return len(self.statVar_names)
+
+    def get_path(self, name, model_ws=None):
+        """Get the path to a file named in the control file
+        (e.g. 'stat_var_file'), relative to model_ws (by default, the
+        folder containing the control file)."""
+        if model_ws is None:
+            model_ws = os.path.split(getattr(self, 'filename', ''))[0]
+        filename = self.__dict__[name].values[0].replace('\\', '/')
+        return os.path.join(model_ws, filename)
+
+    def get_data_file(self, model_ws=None):
+        """Load the PRMS data file (:class:`pyrms.data.dataFile`);
+        see :meth:`get_statvar_file`."""
+        return dataFile.load(self.get_path('data_file', model_ws))
+
+    def get_statvar_file(self, model_ws=None):
+        """Get a reader for the statvar output file.
+
+        Parameters
+        ----------
+        model_ws : str, optional
+            Folder that the stat_var_file path is relative to.
+            By default, the folder containing the control file.
+
+        Returns
+        -------
+        statvar : :class:`pyrms.output.statVarFile`
+        """
+        return statVarFile(self.get_path('stat_var_file', model_ws))
+
+    def get_ani_file(self, model_ws=None, nrow=None, ncol=None):
+        """Get a reader for the animation output file.
+
+        Parameters
+        ----------
+        model_ws : str, optional
+            Folder that the ani_output_file path is relative to.
+            By default, the folder containing the control file.
+        nrow, ncol : int, optional
+            Grid shape, for reshaping the HRU values.
+
+        Returns
+        -------
+        ani : :class:`pyrms.output.aniFile`
+        """
+        return aniFile(self.get_path('ani_output_file', model_ws),
+                       nrow=nrow, ncol=ncol)
+
+    def get_csv_file(self, model_ws=None):
+        """Get a reader for the csv summary output file
+        (:class:`pyrms.output.csvOutputFile`); see :meth:`get_statvar_file`."""
+        return csvOutputFile(self.get_path('csv_output_file', model_ws))
+
+    def get_map_file(self, model_ws=None, nrow=None, ncol=None):
+        """Get a reader for the map results output file
+        (:class:`pyrms.output.mapOutputFile`); see :meth:`get_ani_file`."""
+        return mapOutputFile(self.get_path('map_output_file', model_ws),
+                             nrow=nrow, ncol=ncol)
 
     @property
     def control_params(self):
@@ -167,6 +237,9 @@ class controlFile:
     @staticmethod
     def load(filename, verbose=False):
 
+        timed = len(hooks) > 0
+        if timed:
+            start = perf_counter()
         with open(filename) as input:
 
             # instantiate a new control file object
@@ -175,19 +248,30 @@ class controlFile:
             ctrl.__dict__ = {}
 
             ctrl.param_order = []
+            ctrl.filename = filename
             ctrl.verbose = verbose
             ctrl.comments = controlFile.read_comments(input)
-            for line in input:
+            # read_comments stops at the first #### delimiter
+            for line in itertools.chain(['####'], input):
                 if '####' in line:
                     name = next(input).strip()
                     ctrl.__dict__[name] = controlFile.read_param(input, name)
                     ctrl.param_order.append(name)
+        if timed:
+            emit('read', filename, source='file',
+                 bytes=os.path.getsize(filename),
+                 values=sum(ctrl.__dict__[name].nvalues
+                            for name in ctrl.param_order),
+                 elapsed=perf_counter() - start)
         return ctrl
 
     def write(self, filename=None):
 
         if filename is None:
             filename = self.filename
+        timed = len(hooks) > 0
+        if timed:
+            start = perf_counter()
 
         # determine an order for writing parameters
         # (alphabetically if none specified)
@@ -199,9 +283,13 @@ class controlFile:
 
             if len(self.control_params) > 0:
                 if self.verbose:
-                    print('\nwriting control parameters...')
+                    logger.info('writing control parameters...')
             for k in self.param_order:
                 self.__dict__[k].write(output)
+        if timed:
+            emit('write', filename, bytes=os.path.getsize(filename),
+                 values=sum(self.__dict__[k].nvalues for k in self.param_order),
+                 elapsed=perf_counter() - start)
 
 
 
@@ -0,0 +1,172 @@
+"""
+PRMS data file (climate and streamflow observations).
+"""
+import io
+import os
+from time import perf_counter
+import numpy as np
+from pyrms.instrument import hooks, emit
+from pyrms.output import get_dates
+from pyrms.param import format_values
+from pyrms.utils import lazy_import
+
+pd = lazy_import('pandas')
+
+
+class dataFile:
+    """PRMS data file, with a header of variable names and the number of
+    values for each (e.g. stations), followed by a row of observations for
+    each time step.
+
+    Parameters
+    ----------
+    filename : str, optional
+    variables : dict, optional
+        Number of values (columns) for each variable, in file order.
+    dates : sequence of datetimes, optional
+        Date of each time step.
+    values : 2D array, optional
+        Observations, with a row for each time step and a column for
+        each variable value, in the order of variables.
+    comments : str, optional
+        Title line and any // comment lines at the top of the file.
+    """
+    def __init__(self, filename=None, variables=None, dates=None, values=None,
+                 comments='Data file created by pyrms\n'):
+        self.filename = filename
+        self.variables = dict(variables) if variables is not None else {}
+        self.dates = pd.DatetimeIndex(dates if dates is not None else [],
+                                      name='datetime')
+        if values is None:
+            values = np.zeros((len(self.dates), self.nvalues))
+        self.values = np.asarray(values, dtype=float)
+        if self.values.shape != (len(self.dates), self.nvalues):
+            raise ValueError('Expected values of shape {}, got {}'.format(
+                (len(self.dates), self.nvalues), self.values.shape))
+        self.comments = comments
+
+    @property
+    def nvalues(self):
+        return sum(self.variables.values())
+
+    @property
+    def columns(self):
+        """Column labels, in the form <variable>_<number>."""
+        return ['{}_{}'.format(name, i + 1)
+                for name, n in self.variables.items() for i in range(n)]
+
+    @property
+    def df(self):
+        return pd.DataFrame(self.values, index=self.dates, columns=self.columns)
+
+    def get_variable(self, name):
+        """Get a view of the observations for a variable,
+        with a row for each time step and a column for each value."""
+        start = 0
+        for variable, n in self.variables.items():
+            if variable == name:
+                return self.values[:, start:start + n]
+            start += n
+        raise KeyError(name)
+
+    @staticmethod
+    def read_header(src):
+        """Read the comments and variables from the start of a data file,
+        up to the #### delimiter."""
+        comments = src.readline().decode()
+        variables = {}
+        for line in src:
+            line = line.decode().strip()
+            if line.startswith('####'):
+                break
+            if line.startswith('//') or len(line) == 0:
+                comments += line + '\n'
+                continue
+            name, n = line.split()[:2]
+            variables[name] = int(n)
+        return comments, variables
+
+    @staticmethod
+    def load(filename):
+        """Load a PRMS data file.
+
+        Parameters
+        ----------
+        filename : str
+
+        Returns
+        -------
+        data : dataFile instance
+        """
+        timed = len(hooks) > 0
+        if timed:
+            start = perf_counter()
+        with open(filename, 'rb') as src:
+            comments, variables = dataFile.read_header(src)
+            data = src.read()
+        nvalues = sum(variables.values())
+        # year, month, day, hour, minute, second, then the values
+        df = pd.read_csv(io.BytesIO(data), sep=r'\s+', header=None,
+                         dtype={i: float for i in range(6, 6 + nvalues)},
+                         float_precision='round_trip')
+        if df.shape[1] != 6 + nvalues:
+            raise ValueError('Expected {} columns in {}, found {}'.format(
+                6 + nvalues, filename, df.shape[1]))
+        if timed:
+            parsed = perf_counter()
+        dates = get_dates(*(df[i].values for i in range(6)))
+        data = dataFile(filename=filename, variables=variables, dates=dates,
+                        values=df.values[:, 6:].astype(float), comments=comments)
+        if timed:
+            end = perf_counter()
+            emit('read', filename, source='file', bytes=os.path.getsize(filename),
+                 values=data.values.size, parse_time=parsed - start,
+                 convert_time=end - parsed, allocated=data.values.nbytes,
+                 elapsed=end - start)
+        return data
+
+    def write(self, filename=None, fmt=None, nodata=-999, chunksize=2**14):
+        """Write a PRMS data file.
+
+        Parameters
+        ----------
+        filename : str, optional
+            By default, the file that was loaded.
+        fmt : str, optional
+            printf-style format for the values (e.g. '%.2f'). By default,
+            values are written with their shortest round-trip representation.
+        nodata : float
+            Value to write for nans. By default, -999 (the PRMS
+            missing value).
+        chunksize : int
+            Number of time steps formatted at a time.
+        """
+        if filename is None:
+            filename = self.filename
+        timed = len(hooks) > 0
+        if timed:
+            start = perf_counter()
+        values = self.values
+        if np.isnan(values).any():
+            values = np.where(np.isnan(values), nodata, values)
+        dates = self.dates
+        date_parts = [dates.year, dates.month, dates.day,
+                      dates.hour, dates.minute, dates.second]
+        with open(filename, 'w') as dest:
+            dest.write(self.comments)
+            for name, n in self.variables.items():
+                dest.write('{} {}\n'.format(name, n))
+            dest.write('#' * 40 + '\n')
+            for start in range(0, len(dates), chunksize):
+                end = start + chunksize
+                # format each column of the chunk at once, then join the rows
+                columns = [list(map(str, part[start:end].tolist()))
+                           for part in date_parts]
+                columns += [format_values(column, fmt=fmt)
+                            for column in values[start:end].T]
+                lines = list(map(' '.join, zip(*columns)))
+                lines.append('')
+                dest.write('\n'.join(lines))
+        if timed:
+            emit('write', filename, bytes=os.path.getsize(filename),
+                 values=values.size, elapsed=perf_counter() - start)
@@ -0,0 +1,225 @@
+"""
+Ensembles of perturbed parameter sets.
+"""
+import os
+import shutil
+import numpy as np
+from pyrms.dtypes import dtypes
+from pyrms.param import get_canonical
+from pyrms.utils import lazy_import
+
+pd = lazy_import('pandas')
+
+
+def link_file(src, dest, link='hardlink'):
+    """Link (or copy) a file to a new location, replacing any existing file.
+
+    Parameters
+    ----------
+    src, dest : str
+    link : {'hardlink', 'symlink', 'copy'}
+        Hard links fall back to copies if they aren't supported
+        (e.g. across file systems). By default, 'hardlink'.
+    """
+    if os.path.lexists(dest):
+        os.remove(dest)
+    if link == 'hardlink':
+        try:
+            os.link(src, dest)
+            return
+        except OSError:
+            pass
+    elif link == 'symlink':
+        os.symlink(os.path.abspath(src), dest)
+        return
+    elif link != 'copy':
+        raise ValueError('Unrecognized link option: {}'.format(link))
+    shutil.copy2(src, dest)
+
+
+class parameterEnsemble:
+    """Perturbed parameter sets for a model, stored as one
+    (nmembers, nvalues) array for each perturbed parameter.
+    The model itself isn't modified.
+
+    Parameters
+    ----------
+    model : :class:`pyrms.prms.model`
+    nmembers : int
+        Number of ensemble members.
+    names : sequence of str, optional
+        Names for the members (and their workspaces).
+        By default, member000, member001, ...
+
+    Examples
+    --------
+    >>> ens = parameterEnsemble(m, 100)  # doctest: +SKIP
+    >>> ens.multiply('covden_sum', np.random.uniform(0.8, 1.2, 100))  # doctest: +SKIP
+    >>> ens.write('ensemble')  # doctest: +SKIP
+    """
+    def __init__(self, model, nmembers, names=None):
+        self.model = model
+        self.nmembers = nmembers
+        if names is None:
+            width = len(str(nmembers - 1))
+            names = ['member{:0{}d}'.format(i, max(width, 3))
+                     for i in range(nmembers)]
+        if len(names) != nmembers:
+            raise ValueError('Expected {} names'.format(nmembers))
+        self.names = list(names)
+        self.values = {}
+
+    def __getitem__(self, name):
+        return self.get_array(name)
+
+    def get_array(self, name):
+        """Get the (nmembers, nvalues) array for a parameter,
+        starting from the model values."""
+        if name not in self.values:
+            p = self.model.params[name]
+            base = get_canonical(p.array, p.dtype).ravel()
+            if base.dtype.kind not in 'iuf':
+                raise ValueError('{} is not numeric'.format(name))
+            self.values[name] = np.tile(base.astype(float), (self.nmembers, 1))
+        return self.values[name]
+
+    def _apply(self, name, operand, operation, mask=None):
+        array = self.get_array(name)
+        operand = np.asarray(operand, dtype=float)
+        # one value per member
+        if operand.ndim == 1 and operand.size == self.nmembers:
+            operand = operand[:, None]
+        operand = np.broadcast_to(operand, array.shape)
+        if mask is None:
+            mask = slice(None)
+        else:
+            mask = np.asarray(mask, dtype=bool).ravel()
+        if operation == 'multiply':
+            array[:, mask] *= operand[:, mask]
+        elif operation == 'add':
+            array[:, mask] += operand[:, mask]
+        else:
+            array[:, mask] = operand[:, mask]
+
+    def multiply(self, name, factors, mask=None):
+        """Multiply a parameter by factors.
+
+        Parameters
+        ----------
+        name : str
+            Parameter name.
+        factors : scalar or array
+            One factor for each member (nmembers,), or an array that
+            broadcasts to (nmembers, nvalues) (e.g. a factor for each value
+            of each member).
+        mask : boolean array, optional
+            Values to perturb (e.g. model.get_active(nvalues) for the
+            active HRUs). By default, all values.
+        """
+        self._apply(name, factors, 'multiply', mask)
+
+    def add(self, name, offsets, mask=None):
+        """Add offsets to a parameter; see :meth:`multiply`."""
+        self._apply(name, offsets, 'add', mask)
+
+    def set(self, name, values, mask=None):
+        """Set parameter values (e.g. sampled values); see :meth:`multiply`."""
+        self._apply(name, values, 'set', mask)
+
+    def get_values(self, name, member):
+        """Get the values of a parameter for a member, in the parameter's
+        data type (integer parameters are rounded)."""
+        values = self.get_array(name)[member]
+        dtype = np.dtype(dtypes[self.model.params[name].dtype])
+        if dtype.kind in 'iu':
+            values = np.rint(values)
+        return values.astype(dtype)
+
+    def get_changed_files(self):
+        """Get the perturbed parameters in each model file,
+        keyed by file."""
+        changed = {}
+        for key, pf in self.model.files.items():
+            names = [name for name in self.values
+                     if pf.params.get(name) is self.model.params[name]]
+            if len(names) > 0:
+                changed[key] = names
+        return changed
+
+    def get_file_paths(self):
+        """Get the paths of the model files relative to the model folder
+        (as they are listed in the control file), keyed by file.
+        Files outside of the model folder are keyed by their file names."""
+        model_ws = self.model.model_ws or os.curdir
+        paths = {}
+        for key in self.model.files:
+            path = os.path.relpath(str(key), model_ws)
+            if path.startswith(os.pardir) or os.path.isabs(path):
+                path = os.path.split(str(key))[1]
+            paths[key] = path
+        if len(set(paths.values())) < len(paths):
+            raise ValueError('Model files have the same paths relative to '
+                             'the model folder: {}'.format(paths))
+        return paths
+
+    def write(self, workspace, members=None, link='hardlink',
+              run_length=False, fmt=None):
+        """Write the parameter files for the ensemble members,
+        each into its own folder. Only files with perturbed parameters are
+        written for each member (with unperturbed parameters copied
+        verbatim from the model files); the other files are linked
+        to the model files. Files have the same paths in the member
+        folders as in the model folder (see :meth:`get_file_paths`).
+
+        Parameters
+        ----------
+        workspace : str
+            Folder for the member folders.
+        members : sequence of int, optional
+            Members to write. By default, all members.
+        link : {'hardlink', 'symlink', 'copy'}
+            How to share the files that are the same for all members.
+            Model files with unsaved changes are written once to
+            workspace/shared first. By default, 'hardlink'.
+        run_length, fmt :
+            See :meth:`pyrms.param.paramFile.write`.
+
+        Returns
+        -------
+        summary : DataFrame
+            Folder and parameter files written for each member.
+        """
+        if members is None:
+            members = range(self.nmembers)
+        changed = self.get_changed_files()
+        paths = self.get_file_paths()
+        shared = {}
+        for key, pf in self.model.files.items():
+            if key in changed:
+                continue
+            src = str(pf.filename)
+            if any([p.check_modified() for p in pf.params.values()]) or \
+                    not os.path.exists(src):
+                src = os.path.join(workspace, 'shared', paths[key])
+                os.makedirs(os.path.dirname(src), exist_ok=True)
+                pf.write(src)
+            shared[key] = src
+        summary = []
+        for i in members:
+            member_ws = os.path.join(workspace, self.names[i])
+            os.makedirs(member_ws, exist_ok=True)
+            written = []
+            for key, pf in self.model.files.items():
+                dest = os.path.join(member_ws, paths[key])
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                if key in changed:
+                    values = {name: self.get_values(name, i) for name in changed[key]}
+                    if os.path.lexists(dest):
+                        os.remove(dest)
+                    pf.write(dest, run_length=run_length, fmt=fmt, values=values)
+                    written.append(dest)
+                else:
+                    link_file(shared[key], dest, link=link)
+            summary.append({'name': self.names[i], 'workspace': member_ws,
+                            'written': written})
+        return pd.DataFrame(summary)
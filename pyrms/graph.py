@@ -0,0 +1,326 @@
+"""
+Routing graph for PRMS cascades.
+"""
+import numpy as np
+
+
+# levels of the topological sort with fewer nodes than this are processed
+# one node at a time (in Python), rather than all at once with numpy;
+# numpy's overhead for each level dominates in deep, narrow graphs
+# (such as long chains of cascades)
+small_level = 32
+
+
+def gather(indptr, nodes):
+    """Get the positions of the edges for a set of nodes
+    in a compressed sparse row (CSR) graph."""
+    starts = indptr[nodes]
+    counts = indptr[nodes + 1] - starts
+    total = counts.sum()
+    # offset of each edge from the start of its node's edges
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    return np.repeat(starts, counts) + offsets
+
+
+def make_csr(src, dst, nnodes):
+    """Sort edges by source node, and make an index pointer array
+    to the edges for each node."""
+    order = np.argsort(src, kind='stable')
+    indptr = np.zeros(nnodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=nnodes), out=indptr[1:])
+    return indptr, order
+
+
+class cascadeGraph:
+    """Directed graph of the links from upslope to downslope HRUs (or GWRs)
+    in a PRMS cascade network, stored in compressed sparse row (CSR) form.
+
+    HRU numbers in the inputs and outputs are one-based, as in the
+    PRMS parameter files.
+
+    Parameters
+    ----------
+    up_id : 1D array of ints
+        Upslope HRU for each cascade (hru_up_id).
+    down_id : 1D array of ints
+        Downslope HRU for each cascade (hru_down_id). Cascades with
+        down_id <= 0 (to a stream segment or out of the model) aren't
+        included in the graph.
+    weights : 1D array of floats, optional
+        Fraction of the upslope HRU that drains to each link (hru_pct_up),
+        used for accumulating values. By default, 1.
+    nnodes : int, optional
+        Number of HRUs. By default, the largest HRU number in the cascades.
+    """
+    def __init__(self, up_id, down_id, weights=None, nnodes=None):
+        up_id = np.asarray(up_id).ravel().astype(np.int64)
+        down_id = np.asarray(down_id).ravel().astype(np.int64)
+        if weights is None:
+            weights = np.ones(len(up_id))
+        weights = np.asarray(weights, dtype=float).ravel()
+        links = down_id > 0
+        if nnodes is None:
+            nnodes = int(max(up_id.max(initial=0), down_id.max(initial=0)))
+        self.nnodes = nnodes
+        self.src = up_id[links] - 1
+        self.dst = down_id[links] - 1
+        self.weights = weights[links]
+
+        # downslope (out) and upslope (in) adjacency
+        self.indptr, order = make_csr(self.src, self.dst, nnodes)
+        self.indices = self.dst[order]
+        self.edge_weights = self.weights[order]
+        self.rindptr, rorder = make_csr(self.dst, self.src, nnodes)
+        self.rindices = self.src[rorder]
+        # nodes in topological order, and the start of each level in it
+        self._order = None
+        self._bounds = None
+        self._cycle_nodes = None
+
+    @property
+    def nlinks(self):
+        return len(self.src)
+
+    def _sort(self):
+        """Topologically sort the nodes into levels (Kahn's algorithm).
+        Large levels of nodes are processed at once, and small levels
+        one node at a time (see :meth:`_sort_nodes`), so that sorting
+        takes linear time, however deep the graph is."""
+        indegree = np.bincount(self.dst, minlength=self.nnodes)
+        frontier = np.flatnonzero(indegree == 0)
+        # sorted nodes (in runs of one or more levels), and level sizes
+        runs = []
+        sizes = []
+        nsmall = 0
+        adjacency = self.indptr, self.indices
+        while frontier.size > 0:
+            if frontier.size < small_level:
+                # indexing lists is faster, but converting the arrays
+                # is only worth it in graphs with many small levels
+                max_levels = None
+                if nsmall < small_level:
+                    max_levels = small_level - nsmall
+                elif isinstance(adjacency[0], np.ndarray):
+                    adjacency = self.indptr.tolist(), self.indices.tolist()
+                run, run_sizes, frontier = self._sort_nodes(
+                    frontier, indegree, *adjacency, max_levels=max_levels)
+                runs.append(run)
+                sizes += run_sizes
+                nsmall += len(run_sizes)
+                continue
+            runs.append(frontier)
+            sizes.append(frontier.size)
+            successors = self.indices[gather(self.indptr, frontier)]
+            successors, counts = np.unique(successors, return_counts=True)
+            indegree[successors] -= counts
+            frontier = successors[indegree[successors] == 0]
+        self._order = np.concatenate(runs) if len(runs) > 0 \
+            else np.zeros(0, dtype=np.int64)
+        self._bounds = np.cumsum([0] + sizes)
+        nsorted = self._order.size
+        # nodes that couldn't be sorted are in cycles,
+        # or downslope of cycles; peel off the latter
+        remaining = indegree > 0
+        if nsorted < self.nnodes:
+            in_remaining = remaining[self.src] & remaining[self.dst]
+            outdegree = np.bincount(self.src[in_remaining], minlength=self.nnodes)
+            frontier = np.flatnonzero(remaining & (outdegree == 0))
+            while frontier.size > 0:
+                remaining[frontier] = False
+                predecessors = self.rindices[gather(self.rindptr, frontier)]
+                predecessors = predecessors[remaining[predecessors]]
+                predecessors, counts = np.unique(predecessors, return_counts=True)
+                outdegree[predecessors] -= counts
+                frontier = predecessors[outdegree[predecessors] == 0]
+        self._cycle_nodes = np.flatnonzero(remaining) + 1
+
+    def _sort_nodes(self, frontier, indegree, indptr, indices, max_levels=None):
+        """Continue the topological sort one node at a time, while the
+        levels are small. indegree is updated in place, for the nodes
+        that are visited.
+
+        Parameters
+        ----------
+        frontier : 1D numpy array
+            Next level of nodes.
+        indegree : 1D numpy array
+            Number of unsorted upslope nodes of each node.
+        indptr, indices : lists or 1D numpy arrays
+            The (downslope) adjacency.
+        max_levels : int, optional
+            Maximum number of levels to sort.
+
+        Returns
+        -------
+        order : 1D numpy array
+            The sorted nodes, level by level.
+        sizes : list of int
+            Number of nodes in each level.
+        frontier : 1D numpy array
+            The next level (large, empty, or after max_levels).
+        """
+        remaining = {}
+        order = []
+        sizes = []
+        level = frontier.tolist()
+        while 0 < len(level) < small_level and \
+                (max_levels is None or len(sizes) < max_levels):
+            order += level
+            sizes.append(len(level))
+            successors = []
+            for node in level:
+                for edge in range(indptr[node], indptr[node + 1]):
+                    successor = int(indices[edge])
+                    count = remaining.get(successor)
+                    if count is None:
+                        count = int(indegree[successor])
+                    remaining[successor] = count - 1
+                    if count == 1:
+                        successors.append(successor)
+            level = sorted(successors)
+        if len(remaining) > 0:
+            indegree[np.fromiter(remaining.keys(), dtype=np.int64,
+                                 count=len(remaining))] = list(remaining.values())
+        return (np.array(order, dtype=np.int64), sizes,
+                np.array(level, dtype=np.int64))
+
+    @property
+    def levels(self):
+        """List of arrays of HRU numbers in topological order; each HRU
+        only cascades to HRUs in later levels."""
+        if self._order is None:
+            self._sort()
+        return np.split(self._order + 1, self._bounds[1:-1])
+
+    @property
+    def order(self):
+        """HRU numbers in topological (upslope to downslope) order.
+        HRUs in or downslope of cycles are not included."""
+        if self._order is None:
+            self._sort()
+        return self._order + 1
+
+    @property
+    def cycle_nodes(self):
+        """HRU numbers of HRUs in cycles (which PRMS doesn't allow)."""
+        if self._cycle_nodes is None:
+            self._sort()
+        return self._cycle_nodes
+
+    @property
+    def has_cycles(self):
+        return len(self.cycle_nodes) > 0
+
+    def check(self):
+        """Raise a ValueError if the cascades have any cycles."""
+        if self.has_cycles:
+            raise ValueError('Cascades contain cycles involving {} HRUs: {}...'
+                             .format(len(self.cycle_nodes),
+                                     self.cycle_nodes[:10].tolist()))
+
+    def _traverse(self, nodes, indptr, indices):
+        visited = np.zeros(self.nnodes, dtype=bool)
+        frontier = np.unique(np.atleast_1d(nodes) - 1)
+        while frontier.size > 0:
+            neighbors = indices[gather(indptr, frontier)]
+            neighbors = np.unique(neighbors[~visited[neighbors]])
+            visited[neighbors] = True
+            frontier = neighbors
+        return np.flatnonzero(visited) + 1
+
+    def upstream(self, hru):
+        """HRU numbers of all HRUs that cascade (directly or indirectly)
+        to one or more HRUs."""
+        return self._traverse(hru, self.rindptr, self.rindices)
+
+    def downstream(self, hru):
+        """HRU numbers of all HRUs downslope of one or more HRUs."""
+        return self._traverse(hru, self.indptr, self.indices)
+
+    @property
+    def outlets(self):
+        """Terminal HRU for each HRU, following the link with the largest
+        weight from each HRU until reaching an HRU that doesn't cascade
+        to another HRU.
+
+        Returns
+        -------
+        outlets : 1D array of HRU numbers, with nnodes values
+        """
+        self.check()
+        # largest weight link from each node
+        # (the first one in each node's edges, after sorting by weight)
+        degree = np.diff(self.indptr)
+        src = np.repeat(np.arange(self.nnodes), degree)
+        order = np.lexsort((-self.edge_weights, src))
+        has_links = degree > 0
+        dominant = np.full(self.nnodes, -1, dtype=np.int64)
+        dominant[has_links] = self.indices[order][self.indptr[:-1][has_links]]
+        # follow the links by pointer jumping; each pass doubles
+        # the length of the paths followed, so the number of passes
+        # is logarithmic in the depth of the cascades
+        outlets = np.where(has_links, dominant, np.arange(self.nnodes))
+        while True:
+            jumped = outlets[outlets]
+            if np.array_equal(jumped, outlets):
+                break
+            outlets = jumped
+        return outlets + 1
+
+    def accumulate(self, values, weighted=True):
+        """Accumulate a value for each HRU down the cascades,
+        so that each HRU gets its own value plus the values of all of the
+        HRUs upslope of it. Runs in linear time; the nodes are processed
+        level by level (with numpy) if the levels of the topological sort
+        are large, otherwise one at a time (see :data:`small_level`).
+
+        Parameters
+        ----------
+        values : array
+            Value for each HRU (e.g. hru_area, or an hru_type mask),
+            with nnodes values.
+        weighted : bool
+            If True, the value cascading along each link is multiplied
+            by the link weight (e.g. hru_pct_up). By default, True.
+
+        Returns
+        -------
+        accumulated : 1D numpy array of floats
+        """
+        self.check()
+        accumulated = np.array(values, dtype=float).ravel()
+        if accumulated.size != self.nnodes:
+            raise ValueError('Expected {} values, got {}'.format(
+                self.nnodes, accumulated.size))
+        nlevels = len(self._bounds) - 1
+        if nlevels * small_level > self.nnodes:
+            return self._accumulate_nodes(accumulated, weighted)
+        return self._accumulate_levels(accumulated, weighted)
+
+    def _accumulate_levels(self, accumulated, weighted=True):
+        """Accumulate values down the cascades, one level at a time."""
+        degree = np.diff(self.indptr)
+        for i in range(len(self._bounds) - 1):
+            level = self._order[self._bounds[i]:self._bounds[i + 1]]
+            edges = gather(self.indptr, level)
+            if edges.size == 0:
+                continue
+            src = np.repeat(level, degree[level])
+            contribution = accumulated[src]
+            if weighted:
+                contribution = contribution * self.edge_weights[edges]
+            np.add.at(accumulated, self.indices[edges], contribution)
+        return accumulated
+
+    def _accumulate_nodes(self, accumulated, weighted=True):
+        """Accumulate values down the cascades, one node at a time."""
+        indptr = self.indptr.tolist()
+        indices = self.indices.tolist()
+        weights = self.edge_weights.tolist() if weighted \
+            else [1.] * len(indices)
+        values = accumulated.tolist()
+        for node in self._order.tolist():
+            value = values[node]
+            for edge in range(indptr[node], indptr[node + 1]):
+                values[indices[edge]] += value * weights[edge]
+        return np.array(values)
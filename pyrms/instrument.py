@@ -0,0 +1,134 @@
+"""
+Instrumentation of reading and writing PRMS files.
+
+Readers and writers report an event (a dict) for each file, and for each
+parameter that is read, formatted or copied, to the functions (hooks)
+in :data:`hooks`. With no hooks (the default), nothing is timed or
+reported. :class:`ioStats` collects events, and exports them as a
+DataFrame:
+
+>>> with ioStats() as stats:  # doctest: +SKIP
+...     m = model.load('model.control')
+>>> stats.df  # doctest: +SKIP
+>>> stats.summary()  # doctest: +SKIP
+
+Event fields (fields that don't apply to an event are None):
+
+operation : str
+    'index' (reading a parameter file header and index),
+    'read' (parsing a parameter, or reading a whole file),
+    'write' (formatting a parameter, or writing a whole file),
+    or 'copy' (copying an unmodified parameter entry verbatim).
+file : str
+name : str
+    Parameter name, or None for events covering a whole file.
+source : str
+    Where parameter values were read from: 'file' or 'cache'.
+bytes : int
+    Bytes read or written.
+values : int
+    Number of values parsed or formatted.
+parse_time : float
+    Seconds spent reading and parsing (or formatting and writing) values.
+convert_time : float
+    Seconds spent converting parsed values (dtype conversion and
+    reshaping).
+allocated : int
+    Bytes allocated for the resulting arrays.
+elapsed : float
+    Total seconds for the event.
+
+Events from files that are read in other processes
+(e.g. model.load(workers=...)) aren't reported.
+"""
+import os
+from pyrms.utils import lazy_import
+
+pd = lazy_import('pandas')
+
+
+# functions called with each event; readers and writers check
+# that this isn't empty before timing anything
+hooks = []
+
+columns = ['operation', 'file', 'name', 'source', 'bytes', 'values',
+           'parse_time', 'convert_time', 'allocated', 'elapsed']
+
+
+def add_hook(hook):
+    """Add a function to be called with each event."""
+    hooks.append(hook)
+
+
+def remove_hook(hook):
+    """Stop calling a function with events."""
+    if hook in hooks:
+        hooks.remove(hook)
+
+
+def emit(operation, filename, name=None, **metrics):
+    """Report an event to the hooks."""
+    event = dict.fromkeys(columns)
+    event.update(operation=operation, name=name, **metrics)
+    event['file'] = os.fspath(filename) if filename is not None else None
+    for hook in list(hooks):
+        hook(event)
+
+
+class ioStats:
+    """Collect instrumentation events, while in a with block
+    (or between calls to :meth:`start` and :meth:`stop`).
+
+    Attributes
+    ----------
+    events : list of dict
+    """
+    def __init__(self):
+        self.events = []
+
+    def __call__(self, event):
+        self.events.append(event)
+
+    def start(self):
+        add_hook(self)
+        return self
+
+    def stop(self):
+        remove_hook(self)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def clear(self):
+        self.events = []
+
+    @property
+    def df(self):
+        """Events as a DataFrame, with a row for each event."""
+        return pd.DataFrame(self.events, columns=columns)
+
+    def summary(self, by=('file', 'operation')):
+        """Totals of the parameter-level events.
+
+        Parameters
+        ----------
+        by : sequence of str
+            Event fields to group by. By default, ('file', 'operation').
+
+        Returns
+        -------
+        summary : DataFrame
+            Number of parameters, bytes, values, times and memory allocated
+            for each group.
+        """
+        df = self.df
+        df = df.loc[df.name.notnull()]
+        metrics = ['bytes', 'values', 'parse_time', 'convert_time',
+                   'allocated', 'elapsed']
+        df[metrics] = df[metrics].astype(float)
+        summary = df.groupby(list(by))[metrics].sum()
+        summary.insert(0, 'nparams', df.groupby(list(by)).size())
+        return summary
@@ -0,0 +1,474 @@
+"""
+Readers for PRMS output files.
+"""
+import io
+import os
+import re
+import mmap
+import numpy as np
+from pyrms.utils import lazy_import
+
+pd = lazy_import('pandas')
+
+
+def get_dates(year, month, day, hour=0, minute=0, second=0):
+    """Make a DatetimeIndex from arrays of date parts."""
+    return pd.DatetimeIndex(pd.to_datetime(
+        pd.DataFrame({'year': year, 'month': month, 'day': day,
+                      'hour': hour, 'minute': minute, 'second': second})),
+        name='datetime')
+
+
+class statVarFile:
+    """PRMS statistic variables (statvar) output file.
+
+    The header (number of variables, then a name and element on each line)
+    is read once when the object is created; the time series are read
+    in chunks of rows, so that memory use doesn't depend on the length of
+    the simulation.
+
+    Parameters
+    ----------
+    filename : str
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        with open(filename, 'rb') as src:
+            nvariables = int(src.readline().split()[0])
+            self.names = []
+            self.elements = []
+            for i in range(nvariables):
+                name, element = src.readline().decode().split()[:2]
+                self.names.append(name)
+                self.elements.append(int(element) if element.isdigit()
+                                     else element)
+            self.data_offset = src.tell()
+        self.size = os.path.getsize(filename)
+
+    @property
+    def nvariables(self):
+        return len(self.names)
+
+    @property
+    def columns(self):
+        """Column labels, in the form <variable>_<element>."""
+        return ['{}_{}'.format(n, e) for n, e in zip(self.names, self.elements)]
+
+    def get_column_numbers(self, variables=None, elements=None):
+        """Get the positions of the selected variables in the file."""
+        if isinstance(variables, str):
+            variables = [variables]
+        if elements is not None:
+            elements = {str(e) for e in np.atleast_1d(elements)}
+        numbers = []
+        for i, (name, element) in enumerate(zip(self.names, self.elements)):
+            if variables is not None and name not in variables:
+                continue
+            if elements is not None and str(element) not in elements:
+                continue
+            numbers.append(i)
+        if len(numbers) == 0:
+            raise ValueError('No variables in {} match variables={}, elements={}'
+                             .format(self.filename, variables, elements))
+        return numbers
+
+    def _read_date(self, line):
+        year, month, day, hour, minute, second = map(int, line.split()[1:7])
+        return pd.Timestamp(year, month, day, hour, minute, second)
+
+    def _seek(self, src, start, blocksize=2**16):
+        """Position the file near the first row on or after a date,
+        by bisecting the (time-ordered) rows."""
+        lo, hi = self.data_offset, self.size
+        while hi - lo > blocksize:
+            mid = (lo + hi) // 2
+            src.seek(mid)
+            src.readline()  # skip to the start of the next row
+            pos = src.tell()
+            line = src.readline()
+            if line.strip() and self._read_date(line) < start:
+                lo = pos
+            else:
+                hi = mid
+        src.seek(lo)
+
+    def iter_chunks(self, chunksize=2**14, variables=None, elements=None,
+                    start=None, end=None, as_array=False):
+        """Read the statvar file in chunks of rows (time steps).
+
+        Parameters
+        ----------
+        chunksize : int
+            Number of time steps in each chunk.
+        variables : str or sequence of str, optional
+            Variables to read. By default, all variables.
+        elements : int or sequence, optional
+            Elements (e.g. HRU or segment numbers) to read.
+            By default, all elements.
+        start, end : str or datetime-like, optional
+            Date range to read (inclusive). Rows before start are skipped
+            without being parsed.
+        as_array : bool
+            If True, yield (dates, values) tuples with a 2D numpy array
+            of values; otherwise yield DataFrames. By default, False.
+
+        Yields
+        ------
+        chunk : DataFrame (or tuple)
+            Values for the selected variables, indexed by date.
+        """
+        numbers = self.get_column_numbers(variables, elements)
+        columns = [self.columns[i] for i in numbers]
+        start = None if start is None else pd.Timestamp(start)
+        end = None if end is None else pd.Timestamp(end)
+        # timestep, year, month, day, hour, minute, second, values
+        usecols = list(range(1, 7)) + [i + 7 for i in numbers]
+        dtype = {i + 7: float for i in numbers}
+        with open(self.filename, 'rb') as src:
+            if start is not None:
+                self._seek(src, start)
+            else:
+                src.seek(self.data_offset)
+            reader = pd.read_csv(src, sep=r'\s+', header=None, usecols=usecols,
+                                 dtype=dtype, chunksize=chunksize)
+            for df in reader:
+                dates = get_dates(*(df[i].values for i in range(1, 7)))
+                values = df[[i + 7 for i in numbers]].values
+                done = False
+                if start is not None or end is not None:
+                    keep = np.ones(len(dates), dtype=bool)
+                    if start is not None:
+                        keep &= dates >= start
+                    if end is not None:
+                        keep &= dates <= end
+                        done = len(dates) > 0 and dates[-1] > end
+                    dates, values = dates[keep], values[keep]
+                if len(dates) > 0:
+                    if as_array:
+                        yield dates, values
+                    else:
+                        yield pd.DataFrame(values, index=dates, columns=columns)
+                if done:
+                    break
+
+    def read(self, variables=None, elements=None, start=None, end=None,
+             chunksize=2**14):
+        """Read the selected variables into a DataFrame;
+        see :meth:`iter_chunks`."""
+        chunks = list(self.iter_chunks(chunksize=chunksize, variables=variables,
+                                       elements=elements, start=start, end=end))
+        if len(chunks) == 0:
+            columns = [self.columns[i] for i in
+                       self.get_column_numbers(variables, elements)]
+            return pd.DataFrame(columns=columns,
+                                index=pd.DatetimeIndex([], name='datetime'))
+        return pd.concat(chunks)
+
+
+class aniFile:
+    """PRMS animation (.ani) output file, with one row per HRU
+    for each time step.
+
+    The header, the number of HRUs and the byte offsets of the time steps
+    are read once when the object is created; values are read from a
+    memory map of the file, one variable and time window at a time.
+    If all rows have the same length (fixed-width output), the offsets
+    are computed without scanning the file, and values are sliced directly
+    out of the rows.
+
+    Parameters
+    ----------
+    filename : str
+    nrow, ncol : int, optional
+        Grid shape, for reshaping the HRU values of each time step.
+    """
+    def __init__(self, filename, nrow=None, ncol=None, blocksize=2**26):
+        self.filename = filename
+        self.nrow = nrow
+        self.ncol = ncol
+        self.size = os.path.getsize(filename)
+        self._dates = None
+        with open(filename, 'rb') as src:
+            self.comments = []
+            while True:
+                line = src.readline()
+                if not line.startswith(b'#'):
+                    break
+                self.comments.append(line.decode().strip())
+            self.names = line.decode().split()
+            self.data_offset = src.tell()
+            # line of column formats (e.g. 10d 5n 10n)
+            line = src.readline()
+            if all(re.match(r'^\d+[a-z]$', f) for f in line.decode().split()):
+                self.data_offset = src.tell()
+            else:
+                src.seek(self.data_offset)
+            # the rows for the first time step
+            first = src.readline()
+            date = first.split()[0]
+            rows = [first]
+            for line in src:
+                if line.split()[0] != date:
+                    break
+                rows.append(line)
+        self.nhru = len(rows)
+        self._index(rows, blocksize)
+
+    @property
+    def variables(self):
+        return self.names[2:]
+
+    def _index(self, rows, blocksize):
+        """Get the byte offsets of the start of each time step."""
+        row_lengths = {len(row) for row in rows}
+        ndata = self.size - self.data_offset
+        self.row_length = None
+        if len(row_lengths) == 1:
+            row_length = row_lengths.pop()
+            if ndata % (row_length * self.nhru) == 0:
+                self.row_length = row_length
+                self.ntimes = ndata // (row_length * self.nhru)
+                self.offsets = self.data_offset + \
+                    np.arange(self.ntimes + 1) * row_length * self.nhru
+                self._get_fields(rows[0])
+                return
+        # scan the file for the ends of the time steps
+        offsets = [np.array([self.data_offset])]
+        nrows = 0
+        with open(self.filename, 'rb') as src, \
+                mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            for start in range(self.data_offset, self.size, blocksize):
+                block = np.frombuffer(buffer[start:start + blocksize], dtype=np.uint8)
+                newlines = np.flatnonzero(block == 10)
+                row_numbers = nrows + np.arange(1, len(newlines) + 1)
+                ends = newlines[row_numbers % self.nhru == 0]
+                offsets.append(start + ends + 1)
+                nrows += len(newlines)
+        self.offsets = np.concatenate(offsets)
+        if self.offsets[-1] < self.size:
+            # no line ending after the last row
+            self.offsets = np.append(self.offsets, self.size)
+        self.ntimes = len(self.offsets) - 1
+
+    def _get_fields(self, row):
+        """Get the start and end positions of the fields in a fixed-width row,
+        including the whitespace padding before each field."""
+        ends = [m.end() for m in re.finditer(rb'\S+', row)]
+        self.field_starts = [0] + ends[:-1]
+        self.field_ends = ends
+
+    @property
+    def dates(self):
+        """Date of each time step."""
+        if self._dates is None:
+            with open(self.filename, 'rb') as src, \
+                    mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                dates = [buffer[offset:offset + 64].split()[0].decode()
+                         for offset in self.offsets[:-1]]
+            self._dates = pd.DatetimeIndex(pd.to_datetime(dates), name='datetime')
+        return self._dates
+
+    def get_time_window(self, start=None, end=None):
+        """Get the range of time step numbers (start, stop)
+        for two dates (inclusive)."""
+        dates = self.dates
+        first = 0 if start is None else dates.searchsorted(pd.Timestamp(start))
+        stop = self.ntimes if end is None else \
+            dates.searchsorted(pd.Timestamp(end), side='right')
+        return first, stop
+
+    def _parse(self, block, column, nrows):
+        if self.row_length is not None:
+            rows = np.frombuffer(block, dtype=np.uint8).reshape(nrows, self.row_length)
+            start, end = self.field_starts[column], self.field_ends[column]
+            # check that the field is delimited by whitespace in all rows
+            delimiters = np.isin(rows[:, start], (9, 32)) & \
+                np.isin(rows[:, end], (9, 10, 13, 32))
+            if np.all(delimiters):
+                field = np.ascontiguousarray(rows[:, start:end])
+                return field.view('S{}'.format(end - start)).ravel().astype(float)
+        return pd.read_csv(io.BytesIO(block), sep=r'\s+', header=None,
+                           usecols=[column]).values[:, 0].astype(float)
+
+    def get_data(self, variable, start=None, end=None):
+        """Read the values of a variable for a time window.
+
+        Parameters
+        ----------
+        variable : str
+        start, end : str or datetime-like, optional
+            Dates of the first and last time steps to read (inclusive).
+            By default, all time steps.
+
+        Returns
+        -------
+        dates : DatetimeIndex
+        values : numpy array
+            Array of shape (ntimes, nrow, ncol) if the file has nrow * ncol
+            HRUs, otherwise (ntimes, nhru).
+        """
+        if variable not in self.variables:
+            raise ValueError('{} not in {}'.format(variable, self.filename))
+        column = self.names.index(variable)
+        first, stop = self.get_time_window(start, end)
+        with open(self.filename, 'rb') as src, \
+                mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            block = buffer[self.offsets[first]:self.offsets[max(first, stop)]]
+        nrows = (stop - first) * self.nhru
+        values = self._parse(block, column, nrows) if nrows > 0 else np.zeros(0)
+        shape = (stop - first, self.nhru)
+        if self.nrow is not None and self.ncol is not None \
+                and self.nrow * self.ncol == self.nhru:
+            shape = (stop - first, self.nrow, self.ncol)
+        return self.dates[first:stop], values.reshape(shape)
+
+
+class csvOutputFile:
+    """PRMS csv summary output (e.g. prms_summary.csv), with a header line
+    of column names and one row of basin values per time step.
+
+    Parameters
+    ----------
+    filename : str
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        self.columns = None
+        self.position = 0
+        # inode of the file, and the last complete line read
+        # (header or row), for detecting rewritten files
+        self._inode = None
+        self._last_line = b''
+
+    def _read_header(self, src):
+        line = src.readline()
+        if not line.endswith(b'\n'):
+            # empty file, or the header is still being written
+            return False
+        self.columns = [c.strip() for c in line.decode().split(',')]
+        self.position = src.tell()
+        self._last_line = line
+        return True
+
+    def _advance(self, data):
+        """Move the position past the complete rows at the start of data
+        (read from the position), and return them."""
+        end = data.rfind(b'\n') + 1
+        if end > 0:
+            self._last_line = data[data.rfind(b'\n', 0, end - 1) + 1:end]
+        self.position += end
+        return data[:end]
+
+    def _rewritten(self, src):
+        """True if the file has been replaced or rewritten since it was
+        last read; the last line read is no longer where it was."""
+        stat = os.fstat(src.fileno())
+        if stat.st_ino != self._inode or stat.st_size < self.position:
+            return True
+        src.seek(self.position - len(self._last_line))
+        return src.read(len(self._last_line)) != self._last_line
+
+    def _parse(self, data):
+        if self.columns is None or len(data) == 0:
+            columns = self.columns[1:] if self.columns is not None else []
+            return pd.DataFrame(columns=columns,
+                                index=pd.DatetimeIndex([], name='datetime'))
+        df = pd.read_csv(io.BytesIO(data), header=None, names=self.columns,
+                         index_col=0, skipinitialspace=True)
+        df.index = pd.DatetimeIndex(pd.to_datetime(df.index), name='datetime')
+        return df
+
+    def read(self):
+        """Read the whole file into a DataFrame indexed by date
+        (empty if the header line hasn't been written yet)."""
+        self.columns = None
+        self.position = 0
+        with open(self.filename, 'rb') as src:
+            self._inode = os.fstat(src.fileno()).st_ino
+            if not self._read_header(src):
+                return self._parse(b'')
+            data = src.read()
+        # a partially written last row is left for tail()
+        return self._parse(self._advance(data))
+
+    def tail(self):
+        """Read the rows that have been added to the file since the last call
+        to read() or tail(), e.g. while a simulation is running. Only
+        complete (newline-terminated) rows are read. If the file has been
+        replaced or rewritten (e.g. by another run), it is read again
+        from the start.
+
+        Returns
+        -------
+        df : DataFrame
+            New rows, indexed by date (empty if there are none).
+        """
+        if self.columns is None:
+            return self.read()
+        with open(self.filename, 'rb') as src:
+            if self._rewritten(src):
+                return self.read()
+            src.seek(self.position)
+            data = src.read()
+        return self._parse(self._advance(data))
+
+
+class mapOutputFile:
+    """PRMS map results output, with the values for each output
+    time step (e.g. month or year) in a block of lines that starts
+    with the date of the time step (e.g. 1990-10-31, or year and month).
+    Lines starting with # are comments.
+
+    Parameters
+    ----------
+    filename : str
+    nrow, ncol : int, optional
+        Grid shape, for reshaping the values of each time step.
+    """
+    date_pattern = re.compile(rb'^\s*(\d{4})[-/ ]+(\d{1,2})(?:[-/ ]+(\d{1,2}))?\s*$')
+
+    def __init__(self, filename, nrow=None, ncol=None):
+        self.filename = filename
+        self.nrow = nrow
+        self.ncol = ncol
+
+    def read(self):
+        """Read all of the time steps.
+
+        Returns
+        -------
+        dates : DatetimeIndex
+        values : numpy array
+            Array of shape (ntimes, nrow, ncol) if there are nrow * ncol
+            values for each time step, otherwise (ntimes, nvalues).
+        """
+        with open(self.filename, 'rb') as src:
+            lines = src.read().splitlines()
+        dates = []
+        starts = []
+        for i, line in enumerate(lines):
+            match = self.date_pattern.match(line)
+            if match is not None:
+                year, month, day = match.groups()
+                dates.append(pd.Timestamp(int(year), int(month),
+                                          1 if day is None else int(day)))
+                starts.append(i)
+        starts.append(len(lines))
+        # parse the values for all of the time steps at once
+        nvalues = []
+        tokens = []
+        for start, end in zip(starts[:-1], starts[1:]):
+            block = b' '.join(line for line in lines[start + 1:end]
+                              if not line.lstrip().startswith(b'#')).split()
+            nvalues.append(len(block))
+            tokens += block
+        if len(set(nvalues)) > 1:
+            raise ValueError('Time steps in {} have different numbers of values: {}'
+                             .format(self.filename, sorted(set(nvalues))))
+        values = np.array(tokens, dtype=float)
+        shape = (len(dates), nvalues[0] if len(nvalues) > 0 else 0)
+        if self.nrow is not None and self.ncol is not None \
+                and self.nrow * self.ncol == shape[1]:
+            shape = (len(dates), self.nrow, self.ncol)
+        dates = pd.DatetimeIndex(dates, name='datetime')
+        return dates, values.reshape(shape)
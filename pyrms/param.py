@@ -1,14 +1,465 @@
+import os
+import mmap
+import codecs
+import shutil
+import hashlib
+import logging
+import tempfile
+from time import perf_counter
 import numpy as np
-import pandas as pd
+from pyrms.cache import paramCache
 from pyrms.dtypes import dtypes
+from pyrms.instrument import hooks, emit
+from pyrms.stats import get_reducers, get_stats
+from pyrms.utils import lazy_import, versionedDict
+
+pd = lazy_import('pandas')
+
+
+logger = logging.getLogger(__name__)
+
+
+def read_values(text, dtype):
+    """Convert a block of parameter values to a numpy array.
+
+    Parameters
+    ----------
+    text : str or bytes
+        Value lines for a single parameter, as read from a PRMS parameter file.
+        Entries of the form N*value are expanded to N repeats of value.
+    dtype : int
+        PRMS data type (1=int, 2=float, 4=str).
+
+    Returns
+    -------
+    values : 1D numpy array
+    """
+    if not isinstance(text, str):
+        text = bytes(text).decode()
+    if dtype == 4:
+        # strings may contain spaces; keep one value per line
+        tokens = [s for s in (line.strip() for line in text.splitlines()) if s]
+    else:
+        tokens = text.split()
+    counts = None
+    if '*' in text:
+        counts = np.ones(len(tokens), dtype=int)
+        for i in [i for i, token in enumerate(tokens) if '*' in token]:
+            nval, tokens[i] = tokens[i].split('*')
+            counts[i] = int(nval)
+    if dtype == 4:
+        values = np.array(tokens, dtype=str)
+    else:
+        values = np.array(tokens, dtype=float)
+        if dtype != 2:
+            values = values.astype(dtypes[dtype])
+    if counts is not None:
+        values = np.repeat(values, counts)
+    return values
+
+
+def samefile(f1, f2):
+    return os.path.abspath(f1) == os.path.abspath(f2)
+
+
+def float32_to_float64(values, chunksize=2**16):
+    """Convert float32 values to the float64 values with the same
+    shortest decimal representation (e.g. 0.014, rather than
+    0.014000000432133675)."""
+    values = np.asarray(values)
+    # parameters often repeat values; convert each unique value once
+    unique, inverse = np.unique(values.ravel(), return_inverse=True)
+    result = np.empty(unique.size, dtype=np.float64)
+    for start in range(0, unique.size, chunksize):
+        chunk = unique[start:start + chunksize]
+        result[start:start + chunksize] = chunk.astype(str).astype(np.float64)
+    return result[inverse].reshape(values.shape)
+
+
+def get_canonical(values, dtype):
+    """Get parameter values in the numpy dtype for their PRMS
+    data type (int64, float64 or str), e.g. from compact arrays."""
+    if values.dtype == np.float32:
+        return float32_to_float64(values)
+    return values.astype(dtypes[dtype], copy=False)
+
+
+def get_compact(values, dtype, chunksize=2**20):
+    """Store parameter values in a smaller numpy dtype, if they can be
+    converted back exactly: integers as int8 (if they are between
+    -128 and 127) or int32, and floats as float32, if the shortest
+    decimal representation of each float32 value is the same as
+    for the original float64 value (so that the values are written
+    the same way). Other values are returned as is.
+
+    Parameters
+    ----------
+    values : numpy array
+    dtype : int
+        PRMS data type (1=int, 2=float, 4=str).
+
+    Returns
+    -------
+    values : numpy array
+    """
+    if values.size == 0:
+        return values
+    if dtype == 1:
+        vmin, vmax = values.min(), values.max()
+        for compact_dtype in np.int8, np.int32:
+            info = np.iinfo(compact_dtype)
+            if vmin >= info.min and vmax <= info.max:
+                return values.astype(compact_dtype)
+    elif dtype == 2:
+        with np.errstate(over='ignore'):
+            compact = values.astype(np.float32)
+        flat, compact_flat = values.ravel(), compact.ravel()
+        # check in chunks, so that arrays that can't be converted
+        # are rejected early
+        for start in range(0, values.size, chunksize):
+            end = start + chunksize
+            if not np.array_equal(float32_to_float64(compact_flat[start:end]),
+                                  flat[start:end], equal_nan=True):
+                return values
+        return compact
+    return values
+
+
+def get_digest(values):
+    """SHA-256 hex digest of the contents of an array."""
+    return hashlib.sha256(np.ascontiguousarray(values).data).hexdigest()
+
+
+def get_content_digest(values_digest, dim_names, dtype):
+    """Combine the digest of a parameter's values with its dimensions
+    and data type, into a digest of the parameter's content."""
+    header = '{}|{}|{}'.format(','.join(dim_names), dtype, values_digest)
+    return hashlib.sha256(header.encode()).hexdigest()
+
+
+def diff_params(params, other, include_unchanged=False):
+    """Compare two sets of parameters. Parameters with the same content
+    digests are considered unchanged; values are only compared
+    for parameters with different digests.
+
+    Parameters
+    ----------
+    params, other : dict
+        Parameters (:class:`param` instances), keyed by name.
+    include_unchanged : bool
+        Option to include parameters that are the same in the results.
+        By default, False.
+
+    Returns
+    -------
+    diff : DataFrame
+        One row for each parameter that differs, with columns:
+
+        name
+        status : 'modified' (values differ), 'dimensions' (dimensions,
+            data type or number of values differ), 'removed' (not in
+            other), 'added' (only in other), or 'unchanged'
+        nchanged : number of values that differ
+        max_abs_diff : largest absolute difference (for numeric values)
+        changed : positions (in PRMS order) of the values that differ
+    """
+    columns = ['name', 'status', 'nchanged', 'max_abs_diff', 'changed']
+    rows = []
+    names = list(params) + [name for name in other if name not in params]
+    for name in names:
+        if name not in other:
+            rows.append({'name': name, 'status': 'removed'})
+            continue
+        if name not in params:
+            rows.append({'name': name, 'status': 'added'})
+            continue
+        p, p2 = params[name], other[name]
+        if p.digest == p2.digest:
+            if include_unchanged:
+                rows.append({'name': name, 'status': 'unchanged', 'nchanged': 0,
+                             'max_abs_diff': 0., 'changed': np.zeros(0, dtype=int)})
+            continue
+        if list(p.dim_names) != list(p2.dim_names) or p.dtype != p2.dtype \
+                or p.nvalues != p2.nvalues:
+            rows.append({'name': name, 'status': 'dimensions'})
+            continue
+        a = get_canonical(p.array, p.dtype).ravel()
+        b = get_canonical(p2.array, p2.dtype).ravel()
+        unequal = a != b
+        if a.dtype.kind == 'f' and b.dtype.kind == 'f':
+            unequal &= ~(np.isnan(a) & np.isnan(b))
+        changed = np.flatnonzero(unequal)
+        max_abs_diff = np.nan
+        if a.dtype.kind in 'iuf' and b.dtype.kind in 'iuf':
+            diffs = np.abs(a[changed].astype(float) - b[changed].astype(float))
+            max_abs_diff = np.nanmax(diffs, initial=0.)
+        rows.append({'name': name, 'status': 'modified',
+                     'nchanged': changed.size, 'max_abs_diff': max_abs_diff,
+                     'changed': changed})
+    return pd.DataFrame(rows, columns=columns)
+
+
+def quote(value):
+    """Quote a string value for a PRMS parameter file,
+    in the same way as the csv module (and pandas)."""
+    if value == '' or any(c in value for c in ',"\r\n'):
+        return '"{}"'.format(value.replace('"', '""'))
+    return value
+
+
+def format_values(values, fmt=None):
+    """Format parameter values as strings.
+
+    Parameters
+    ----------
+    values : 1D numpy array
+    fmt : str, optional
+        printf-style format for the values. By default, floats are
+        formatted by their shortest round-trip representation, with
+        nans as empty quoted strings (matching pandas.DataFrame.to_csv).
+
+    Returns
+    -------
+    strings : list of str
+    """
+    if values.dtype == np.float32:
+        values = float32_to_float64(values)
+    if fmt is not None:
+        return list(map(fmt.__mod__, values.tolist()))
+    if values.dtype.kind == 'f':
+        strings = list(map(repr, values.tolist()))
+        for i in np.flatnonzero(np.isnan(values)):
+            strings[i] = '""'
+    elif values.dtype.kind == 'U':
+        strings = list(map(quote, values.tolist()))
+    else:
+        strings = list(map(str, values.tolist()))
+    return strings
+
+
+def get_runs(values):
+    """Find runs of repeated values in a 1D array.
+
+    Returns
+    -------
+    run_values : 1D numpy array
+        The value for each run.
+    counts : 1D numpy array
+        The length of each run.
+    """
+    if values.size == 0:
+        return values, np.zeros(0, dtype=int)
+    starts = np.flatnonzero(np.concatenate(([True], values[1:] != values[:-1])))
+    counts = np.diff(np.append(starts, values.size))
+    return values[starts], counts
+
+
+def write_values(f, values, fmt=None, run_length=False, chunksize=2**16):
+    """Write parameter values to an open file, one per line.
+
+    Parameters
+    ----------
+    f : open file handle
+    values : 1D numpy array
+    fmt : str, optional
+        printf-style format for the values; see :func:`format_values`.
+    run_length : bool
+        Option to write runs of repeated values in the PRMS N*value format.
+    chunksize : int
+        Number of values (or runs of values) formatted at a time.
+    """
+    counts = None
+    if run_length:
+        values, counts = get_runs(values)
+    for start in range(0, values.size, chunksize):
+        strings = format_values(values[start:start + chunksize], fmt=fmt)
+        if counts is not None:
+            chunk_counts = counts[start:start + chunksize]
+            for i in np.flatnonzero(chunk_counts > 1):
+                strings[i] = '{}*{}'.format(chunk_counts[i], strings[i])
+        strings.append('')
+        f.write('\n'.join(strings))
+
+
+def readline(buffer, pos):
+    """Return the stripped line of a bytes buffer starting at pos,
+    and the position of the following line."""
+    end = buffer.find(b'\n', pos)
+    if end < 0:
+        end = len(buffer)
+    return buffer[pos:end].decode().strip(), end + 1
+
+
+class paramBlock:
+    """Location and header information for a parameter
+    in a PRMS parameter file.
+
+    Parameters
+    ----------
+    name : str
+    dim_names : list of str
+    nvalues : int
+        Number of values listed in the parameter header.
+    dtype : int
+        PRMS data type (1=int, 2=float, 4=str).
+    filename : str
+        Parameter file containing the values.
+    header_offset : int
+        Byte offset of the #### delimiter starting the parameter entry.
+    offset : int
+        Byte offset of the first value.
+    nbytes : int
+        Length of the value block, in bytes.
+    stat : tuple
+        (size, modification time) of filename when it was indexed,
+        used to detect changes to the file before the values are read.
+    cache : pyrms.cache.paramCache, optional
+        Binary cache for the parameter file.
+
+    Attributes
+    ----------
+    digest : str
+        Digest of the values in the file (see :func:`get_digest`);
+        None until the values are read.
+    source : str
+        Where the values were last read from ('file' or 'cache');
+        None until the values are read.
+    """
+    def __init__(self, name, dim_names, nvalues, dtype, filename,
+                 header_offset, offset, nbytes, stat=None, cache=None):
+        self.name = name
+        self.dim_names = dim_names
+        self.nvalues = nvalues
+        self.dtype = dtype
+        self.filename = filename
+        self.header_offset = header_offset
+        self.offset = offset
+        self.nbytes = nbytes
+        self.stat = stat
+        self.cache = cache
+        self.digest = None
+        self.source = None
+
+    @property
+    def end(self):
+        """Byte offset of the end of the parameter entry."""
+        return self.offset + self.nbytes
+
+    @property
+    def changed(self):
+        """True if the file has changed since it was indexed."""
+        if self.stat is None:
+            return False
+        try:
+            st = os.stat(self.filename)
+        except OSError:
+            return True
+        return (st.st_size, st.st_mtime_ns) != self.stat
+
+    def check_file(self):
+        """Raise an IOError if the file has changed since it was indexed."""
+        if self.changed:
+            raise IOError('{} has changed since it was indexed; '
+                          'reload it to read {}'.format(self.filename,
+                                                        self.name))
+
+    def read(self, buffer=None):
+        """Read the parameter values from the cache, or the file.
+
+        Parameters
+        ----------
+        buffer : bytes or mmap.mmap, optional
+            Contents of the parameter file, if it is already open.
+        """
+        if buffer is None:
+            self.check_file()
+        if self.cache is not None:
+            values = self.cache.load_array(self.name)
+            if values is not None:
+                self.digest = self.cache.load_digest(self.name)
+                if self.digest is None:
+                    self.digest = get_digest(values)
+                self.source = 'cache'
+                return values
+        if buffer is not None:
+            text = buffer[self.offset:self.offset + self.nbytes]
+        else:
+            with open(self.filename, 'rb') as src:
+                src.seek(self.offset)
+                text = src.read(self.nbytes)
+        values = read_values(text, self.dtype)
+        self.digest = get_digest(values)
+        self.source = 'file'
+        if self.cache is not None:
+            self.cache.save_array(self.name, values, digest=self.digest)
+        return values
+
+    def copy(self, dest, blocksize=2**20):
+        """Copy the parameter entry (header and values) from the file
+        to an open text file handle."""
+        self.check_file()
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        with open(self.filename, 'rb') as src:
+            src.seek(self.header_offset)
+            remaining = self.end - self.header_offset
+            last = ''
+            pending = ''
+            while remaining > 0:
+                chunk = src.read(min(blocksize, remaining))
+                if len(chunk) == 0:
+                    break
+                remaining -= len(chunk)
+                text = pending + decoder.decode(chunk)
+                # hold back a carriage return at the end of the chunk,
+                # in case it's part of a CRLF split between chunks
+                pending = '\r' if text.endswith('\r') else ''
+                text = text[:len(text) - len(pending)].replace('\r\n', '\n')
+                if len(text) > 0:
+                    dest.write(text)
+                    last = text[-1]
+            text = pending + decoder.decode(b'', final=True)
+            if len(text) > 0:
+                dest.write(text)
+                last = text[-1]
+            if last != '\n':
+                dest.write('\n')
 
 
 class param:
 
-    def __init__(self, name, values, dim_names=['one'],
+    def __init__(self, name, values=None, dim_names=['one'],
                  filename=None,
                  dtype=None, nrow=None, ncol=None, model=None,
-                 verbose=False):
+                 block=None, compact=False, dimensions=None, verbose=False):
+
+        self.name = name
+        self.filename = filename
+        self.model = model
+        # dimension sizes (usually those of the parameter file)
+        self.dimensions = dimensions
+        if isinstance(dim_names, str):
+            self.dim_names = [dim_names]
+        else:
+            self.dim_names = dim_names
+        self.nrow = nrow
+        self.ncol = ncol
+        self.block = block
+        self.compact = compact
+        self.verbose = verbose
+        self._array = None
+        self._read_digest = None
+        self._modified = False
+        self._stats = {}
+        self._stats_key = None
+        self._digest = None
+        self._digest_key = None
+        self.version = 0
+
+        if values is None:
+            # values are read from the file on first access of the array
+            # (or set afterwards; see from_array)
+            self.dtype = block.dtype if block is not None else dtype
+            return
 
         if not isinstance(values, list) and not isinstance(values, np.ndarray):
             values = [values]
@@ -22,25 +473,267 @@ class param:
             self.dtype = dtype
             pydtype = dtypes[dtype]
             # enforce submitted dtypes
-            values = list(map(pydtype, values))
+            if isinstance(values, np.ndarray):
+                values = values.astype(pydtype, copy=False)
+            else:
+                values = list(map(pydtype, values))
+        self.array = self._reshape(np.array(values, dtype=dtypes[self.dtype]))
 
-        self.name = name
-        self.filename = filename
-        self.model = model
-        if isinstance(dim_names, str):
-            self.dim_names = [dim_names]
-        else:
-            self.dim_names = dim_names
-        self.array = np.array(values, dtype=dtypes[self.dtype])
-        if nrow is not None and ncol is not None:
-            if self.nvalues == nrow * ncol:
-                self.array = np.reshape(values, (nrow, ncol))
-        self.verbose = verbose
+    @staticmethod
+    def from_array(name, array, dim_names=['one'], dtype=None, copy=False,
+                   filename=None, nrow=None, ncol=None, model=None,
+                   dimensions=None):
+        """Make a parameter from an existing numpy array, which is used
+        as is (without converting its dtype, or copying it unless
+        copy=True); e.g. a view of values in shared memory.
+
+        Parameters
+        ----------
+        name : str
+        array : numpy array
+            Values, in PRMS order. Arrays with nrow * ncol values
+            are reshaped to (nrow, ncol).
+        dim_names : list of str
+        dtype : int, optional
+            PRMS data type (1=int, 2=float, 4=str). By default,
+            inferred from the array.
+        copy : bool
+            If True, the parameter gets a copy of the array.
+        filename, nrow, ncol, model, dimensions : optional
+            See :class:`param`.
+
+        Returns
+        -------
+        p : param instance
+        """
+        array = np.asarray(array)
+        if dtype is None:
+            dtype = {'b': 1, 'i': 1, 'u': 1, 'f': 2}.get(array.dtype.kind, 4)
+        p = param(name, dim_names=dim_names, dtype=dtype, filename=filename,
+                  nrow=nrow, ncol=ncol, model=model, dimensions=dimensions)
+        p.array = p._reshape(array.copy() if copy else array)
+        return p
+
+    @property
+    def array(self):
+        if self._array is None and self.block is not None:
+            self.read()
+        return self._array
+
+    @array.setter
+    def array(self, array):
+        self._array = array
+        self.modified = True
+
+    def __getitem__(self, key):
+        return self.array[key]
+
+    def __setitem__(self, key, value):
+        """Change values in place (indexing the array),
+        flagging the parameter as modified."""
+        self.array[key] = value
+        self.modified = True
+
+    @property
+    def modified(self):
+        """True if the parameter has been changed since it was read
+        from its source file (or doesn't have one).
+        New arrays, item assignment (p[...] = values) and header changes
+        are tracked; other in-place changes to the array (or a view of it)
+        can be flagged by setting modified = True, and are found by
+        :meth:`check_modified` (which :meth:`paramFile.write` calls
+        by default).
+        """
+        if self._modified or self.block is None:
+            return True
+        return self.name != self.block.name or \
+            list(self.dim_names) != list(self.block.dim_names) or \
+            self.dtype != self.block.dtype
+
+    def check_modified(self):
+        """Compare a digest of the array with that of the values that were
+        read, to find in-place changes that weren't flagged (which are
+        then flagged). This hashes the whole array.
+
+        Returns
+        -------
+        modified : bool
+        """
+        if not self.modified and self.loaded and \
+                get_digest(self._array) != self._read_digest:
+            self.modified = True
+        return self.modified
+
+    @modified.setter
+    def modified(self, modified):
+        self._modified = modified
+        if modified:
+            # invalidate anything derived from the values
+            self.version += 1
+
+    @property
+    def loaded(self):
+        """True if the parameter values have been read into memory."""
+        return self._array is not None
+
+    @property
+    def digest(self):
+        """Digest of the parameter content (dimensions, data type and
+        values); see :func:`get_content_digest`. Parameters that haven't
+        been read use the digest of the values in the file (or cache),
+        if it is known. Loaded arrays are hashed, so that in-place changes
+        are included; the content digest is cached until the values
+        change. A digest that is already known (e.g. from
+        :class:`pyrms.store.arrayStore`) can be set, to avoid converting
+        the values to their canonical dtype.
+        """
+        array_digest = self.array_digest
+        key = (array_digest, tuple(self.dim_names), self.dtype)
+        if key != self._digest_key:
+            values_digest = None
+            if self.block is not None:
+                if not self.loaded:
+                    if self.block.digest is None and \
+                            self.block.cache is not None and \
+                            not self.block.changed:
+                        self.block.digest = \
+                            self.block.cache.load_digest(self.name)
+                    values_digest = self.block.digest
+                elif array_digest == self._read_digest:
+                    # unchanged since it was read; the block digest is
+                    # that of the values in their canonical dtype
+                    values_digest = self.block.digest
+            if values_digest is None:
+                array = np.asarray(self.array)
+                canonical = get_canonical(array, self.dtype)
+                if array_digest is None:
+                    # the values were just read
+                    array_digest = self._read_digest
+                values_digest = array_digest if canonical is array \
+                    else get_digest(canonical)
+                key = (array_digest, tuple(self.dim_names), self.dtype)
+            self._digest = get_content_digest(values_digest, self.dim_names,
+                                              self.dtype)
+            self._digest_key = key
+        return self._digest
+
+    @digest.setter
+    def digest(self, digest):
+        self._digest = digest
+        self._digest_key = (self.array_digest, tuple(self.dim_names),
+                            self.dtype)
+
+    @property
+    def array_digest(self):
+        """Digest of the loaded array as it is now (see :func:`get_digest`),
+        including in-place changes; None if the values haven't been read.
+        This hashes the array."""
+        if not self.loaded:
+            return
+        return get_digest(self._array)
+
+    def _reshape(self, array):
+        if self.nrow is not None and self.ncol is not None:
+            if array.size == self.nrow * self.ncol:
+                array = np.reshape(array, (self.nrow, self.ncol))
+        return array
+
+    def get_shape(self, grid=True):
+        """Get the N-D shape of the parameter values, from the sizes of its
+        dimensions (in the model, or the parameter file).
+
+        PRMS lists the fastest-varying dimension first, so the shape is
+        in the reverse order of dim_names; e.g. (nmonths, nhru) for a
+        parameter with dimensions nhru, nmonths. The size of one
+        dimension that isn't defined anywhere is inferred from the
+        number of values.
+
+        Parameters
+        ----------
+        grid : bool
+            If True (default), and nrow and ncol are known, the fastest
+            dimension is split into (nrow, ncol) if it has nrow * ncol
+            values; e.g. (nmonths, nrow, ncol).
+
+        Returns
+        -------
+        shape : tuple
+        """
+        sizes = {'one': 1}
+        if self.dimensions is not None:
+            sizes.update(self.dimensions)
+        if self.model is not None and isinstance(self.model.dimensions, dict):
+            sizes.update(self.model.dimensions)
+        shape = [sizes.get(name) for name in self.dim_names]
+        nvalues = self.nvalues
+        unknown = [i for i, size in enumerate(shape) if size is None]
+        if len(unknown) == 1:
+            known = int(np.prod([s for s in shape if s is not None]))
+            if known > 0 and nvalues % known == 0:
+                shape[unknown[0]] = nvalues // known
+        if None in shape or int(np.prod(shape)) != nvalues:
+            raise ValueError('{} values in {} can\'t be shaped to dimensions {} '
+                             '({})'.format(nvalues, self.name, self.dim_names,
+                                           shape))
+        shape = [int(s) for s in reversed(shape)]
+        if grid and self.nrow is not None and self.ncol is not None \
+                and shape[-1] == self.nrow * self.ncol:
+            shape[-1:] = [self.nrow, self.ncol]
+        return tuple(shape)
+
+    def get_view(self, grid=True):
+        """Get an N-D view of the parameter values (without copying them);
+        changes to the view are changes to the array, which are found
+        when the parameter file is written (see :meth:`check_modified`).
+        See :meth:`get_shape`.
+        """
+        array = self.array
+        if not array.flags.c_contiguous:
+            # one copy, so that the view and the array share values
+            self._array = array = np.ascontiguousarray(array)
+        return array.reshape(self.get_shape(grid=grid))
+
+    @property
+    def view(self):
+        """N-D view of the parameter values, e.g. (nmonths, nrow, ncol)
+        for a gridded monthly parameter; see :meth:`get_view`."""
+        return self.get_view()
+
+    def read(self, buffer=None):
+        """Read the parameter values from the source file
+        (in compact dtypes, if compact is True; see :func:`get_compact`)."""
+        timed = len(hooks) > 0
+        if timed:
+            start = perf_counter()
+        raw = self.block.read(buffer)
+        if timed:
+            parsed = perf_counter()
+        values = raw.astype(dtypes[self.dtype], copy=False)
+        self._read_digest = self.block.digest
+        if self.compact:
+            compact = get_compact(values, self.dtype)
+            if compact is not values:
+                values = compact
+                self._read_digest = get_digest(values)
+        self._array = self._reshape(values)
+        self._modified = False
+        if timed:
+            end = perf_counter()
+            from_file = self.block.source == 'file'
+            allocated = raw.nbytes if from_file else 0
+            if not np.may_share_memory(values, raw):
+                allocated += values.nbytes
+            emit('read', self.block.filename, self.name,
+                 source=self.block.source,
+                 bytes=self.block.nbytes if from_file else raw.nbytes,
+                 values=values.size, parse_time=parsed - start,
+                 convert_time=end - parsed, allocated=allocated,
+                 elapsed=end - start)
 
     @property
     def active(self):
         if self.model is not None and self.dim_names[0] == 'nhru':
-            return self.model.hru_type > 0
+            return self.model.get_active(self.nvalues)
         else:
             return np.ones(self.nvalues, dtype=bool)
 
@@ -50,6 +743,8 @@ class param:
 
     @property
     def nvalues(self):
+        if not self.loaded and self.block is not None:
+            return self.block.nvalues
         return self.array.size
 
     @property
@@ -58,37 +753,51 @@ class param:
 
     @property
     def min(self):
-        try:
-            arr = self.array.ravel()
-            active = self.active.ravel()
-            val = arr[active].min()
-        except:
-            val = self.array[0]
-        return val
+        return self.get_stats()['min']
 
     @property
     def mean(self):
-        val = np.nan
-        try:
-            arr = self.array.ravel()
-            active = self.active.ravel()
-            val = arr[active].mean()
-        except:
-            if self.nvalues > 1:
-                val = self.array[1]
-        return val
+        return self.get_stats()['mean']
 
     @property
     def max(self):
-        val = np.nan
-        try:
-            arr = self.array.ravel()
-            active = self.active.ravel()
-            val = arr[active].max()
-        except:
-            if self.nvalues > 2:
-                val = self.array[2]
-        return val
+        return self.get_stats()['max']
+
+    def get_stats(self, stats=None):
+        """Compute summary statistics for the active parameter values.
+        Results are cached until the values (or the model's active HRU
+        mask) change; in-place changes to the array are found by
+        hashing it (see :attr:`array_digest`).
+
+        Parameters
+        ----------
+        stats : sequence or dict, optional
+            Statistics to compute; see :func:`pyrms.stats.get_reducers`.
+            By default, ['min', 'mean', 'max'].
+
+        Returns
+        -------
+        results : dict
+            Value of each statistic, plus the number of active values
+            ('nactive_values').
+        """
+        functions = get_reducers(stats)
+        active = None
+        active_version = None
+        if self.model is not None and self.dim_names[0] == 'nhru':
+            active = self.active
+            active_version = self.model.active_version
+        array = self.array
+        key = (self.array_digest, array.dtype.str, active_version)
+        if key != self._stats_key:
+            self._stats = {}
+            self._stats_key = key
+        missing = {name: func for name, func in functions.items()
+                   if name not in self._stats}
+        if len(missing) > 0 or 'nactive_values' not in self._stats:
+            self._stats.update(get_stats(array, active, missing))
+        return {name: self._stats[name]
+                for name in ['nactive_values'] + list(functions)}
 
     def plot(self):
         if len(self.array.shape) == 2:
@@ -96,13 +805,28 @@ class param:
             plt.imshow(self.array)
             plt.colorbar()
 
-    def write(self, f=None, **kwargs):
+    def write(self, f=None, run_length=False, fmt=None, chunksize=2**16,
+              values=None, **kwargs):
         """Write information for a parameter
         
         Parameters
         ----------
         f : filename (string) or open file handle
+        run_length : bool
+            Option to write runs of repeated values in the
+            PRMS N*value format. By default, False.
+        fmt : str, optional
+            printf-style format for the values (e.g. pyrms.dtypes.fmt[1]).
+            By default, floats are written in their shortest
+            round-trip representation.
+        chunksize : int
+            Number of values (or runs of values) formatted at a time,
+            which limits the memory used to write large arrays.
+        values : numpy array, optional
+            Values to write instead of the parameter's array
+            (with the same number of values).
         kwargs : keyword arguments to pandas.DataFrame.to_csv()
+            If supplied, the values are written with pandas instead.
         """
         if f is None:
             f = self.filename
@@ -111,20 +835,40 @@ class param:
             filename = f
             f = open(f, 'w')
             close=True
+        self._write(f, getattr(f, 'name', None), run_length=run_length,
+                    fmt=fmt, chunksize=chunksize, values=values, **kwargs)
+        if close:
+            f.close()
+            logger.info('wrote {}'.format(filename))
+
+    def _write(self, f, filename, run_length=False, fmt=None,
+               chunksize=2**16, values=None, **kwargs):
+        """Write the parameter to an open file handle, reporting the
+        write to any instrumentation hooks under filename."""
+        timed = len(hooks) > 0
+        if timed:
+            start = perf_counter()
+            start_pos = f.tell() if f.seekable() else None
         # update the array length in case it has been changed
-        a = self.array.ravel()
+        a = self.array.ravel() if values is None else np.asarray(values).ravel()
         f.write('####\n')
         f.write('{}\n{:d}\n'.format(self.name, self.ndim))
         for n in self.dim_names:
             f.write('{}\n'.format(n))
         f.write('{:d}\n{:d}\n'.format(self.nvalues, self.dtype))
-        df = pd.DataFrame(a)
-        df.to_csv(f, index=False, header=False, lineterminator='\n', **kwargs)
+        if len(kwargs) > 0:
+            df = pd.DataFrame(get_canonical(a, self.dtype))
+            df.to_csv(f, index=False, header=False, lineterminator='\n', **kwargs)
+        else:
+            write_values(f, a, fmt=fmt, run_length=run_length,
+                         chunksize=chunksize)
+        if timed:
+            end = perf_counter()
+            nbytes = f.tell() - start_pos if start_pos is not None else None
+            emit('write', filename, self.name, bytes=nbytes, values=a.size,
+                 parse_time=end - start, elapsed=end - start)
         if self.verbose:
-            print(self.name)
-        if close:
-            f.close()
-            print('wrote {}'.format(filename))
+            logger.info(self.name)
 
 class paramFile(object):
 
@@ -140,161 +884,361 @@ class paramFile(object):
         self.model = model
         self.filename = filename
         self.dimensions = dimensions.copy()
-        self.params = params.copy()
+        self.params = versionedDict(params)
         self.nrow = nrow
         self.ncol = ncol
         self.verbose = verbose
         self.param_order = []
+        self.load_only = None
+        self.compact = False
         return
 
     @property
     def summary(self):
         return self.get_summary_dataframe()
 
-    def get_summary_dataframe(self):
+    def get_summary_dataframe(self, stats=None):
+        """Summarize the parameters in a DataFrame.
+
+        Parameters
+        ----------
+        stats : sequence or dict, optional
+            Statistics to compute for the active values of each parameter;
+            see :func:`pyrms.stats.get_reducers`.
+            By default, ['min', 'mean', 'max'].
+
+        Returns
+        -------
+        df : DataFrame
+        """
+        functions = get_reducers(stats)
         plist = []
         for k, v in self.params.items():
+            results = v.get_stats(functions)
             plist.append([v.name, ' '.join(v.dim_names),
                           v.nvalues,
-                          v.nactive_values,
-                          v.min,
-                          v.mean,
-                          v.max,
-                          self.filename])
+                          results['nactive_values']] +
+                         [results[name] for name in functions] +
+                         [self.filename])
         return pd.DataFrame(plist, columns=['name',
                                             'dimensions',
                                             'nvalues',
-                                            'nactive_values',
-                                            'min',
-                                            'mean',
-                                            'max',
-                                            'file'])
+                                            'nactive_values'] +
+                                           list(functions) +
+                                           ['file'])
+
+    def diff(self, other, include_unchanged=False):
+        """Compare the parameters with those in another parameter file;
+        see :func:`diff_params`.
+
+        Parameters
+        ----------
+        other : paramFile instance or str
+            Parameter file to compare to (values in other are
+            compared to those in this file).
+        include_unchanged : bool
+            By default, False.
+
+        Returns
+        -------
+        diff : DataFrame
+        """
+        if not isinstance(other, paramFile):
+            other = paramFile.load(other)
+        return diff_params(self.params, other.params,
+                           include_unchanged=include_unchanged)
+
+    def save(self, store, run, metadata=None):
+        """Save the parameter file to a content-addressed store, as a run;
+        see :meth:`pyrms.store.arrayStore.save`.
+
+        Parameters
+        ----------
+        store : :class:`pyrms.store.arrayStore` or str
+            Store, or the folder for one.
+        run : str
+            Name of the run.
+        metadata : dict, optional
+        """
+        if isinstance(store, str):
+            from pyrms.store import arrayStore
+            store = arrayStore(store)
+        return store.save(run, self, metadata=metadata)
 
-    def read_comments(self, f):
+    @staticmethod
+    def load_from_store(store, run, filename=None, nrow=None, ncol=None):
+        """Load a parameter file from a run in a content-addressed store;
+        see :meth:`pyrms.store.arrayStore.load`.
+
+        Parameters
+        ----------
+        store : :class:`pyrms.store.arrayStore` or str
+            Store, or the folder for one.
+        run : str
+            Name of the run.
+        filename : str, optional
+            File to load, if there is more than one in the run: its path
+            in the run (see :meth:`pyrms.store.arrayStore.save`), or its
+            file name, if no other file in the run has that name.
+        nrow, ncol : int, optional
+
+        Returns
+        -------
+        pf : paramFile instance
+        """
+        if isinstance(store, str):
+            from pyrms.store import arrayStore
+            store = arrayStore(store)
+        param_files = store.load(run, nrow=nrow, ncol=ncol)
+        if filename is None:
+            if len(param_files) != 1:
+                raise ValueError('Run {} has {} files; specify a filename'.format(
+                    run, len(param_files)))
+            filename = list(param_files)[0]
+        key = os.path.normpath(str(filename)).replace(os.sep, '/')
+        if key in param_files:
+            return param_files[key]
+        matches = [k for k in param_files
+                   if k.split('/')[-1] == os.path.split(key)[1]]
+        if len(matches) == 1:
+            return param_files[matches[0]]
+        if len(matches) > 1:
+            raise ValueError('Run {} has more than one {}; specify one of '
+                             '{}'.format(run, filename, matches))
+        raise KeyError('{} not found in run {}'.format(filename, run))
+
+    def read_comments(self, buffer, pos=0):
         comments = ''
-        while True:
-            line = next(f)
+        while pos < len(buffer):
+            line, next_pos = readline(buffer, pos)
             if '####' in line or '**' in line:
                 break
-            else:
-                comments += line.strip() + '\n'
+            comments += line + '\n'
+            pos = next_pos
         self.comments = comments
-        return line
+        return pos
 
-    def read_dimension(self, f):
-        dim_name = next(f).strip()
-        dim_len = int(next(f).strip())
-        self.dimensions[dim_name] = dim_len
+    def read_dimension(self, buffer, pos):
+        dim_name, pos = readline(buffer, pos)
+        dim_len, pos = readline(buffer, pos)
+        self.dimensions[dim_name] = int(dim_len)
         if self.verbose:
-            print(dim_name)
+            logger.info(dim_name)
+        return pos
 
-    @staticmethod
-    def _read_stuff(f, line, addtoo):
-        # in case index is already at delimiter
-        result = None
-        if '####' in line:
-            result = addtoo(f)
-            # params are read until ####
-            # line will be the name of the next parameter
-            if result == '####':
-                while result == '####':
-                    result = addtoo(f)
-        for line in f:
-            if result == 'break':
-                return
+    def read_header(self, buffer, pos, header_offset=None, stat=None):
+        name, pos = readline(buffer, pos)
+        ndim, pos = readline(buffer, pos)
+        dim_names = []
+        for d in range(int(ndim)):
+            dim_name, pos = readline(buffer, pos)
+            dim_names.append(dim_name)
+        nvalues, pos = readline(buffer, pos)
+        dtype, pos = readline(buffer, pos)
+
+        # values extend to the next delimiter (or the end of the file)
+        end = buffer.find(b'####', pos)
+        if end < 0:
+            end = len(buffer)
+        block = paramBlock(name, dim_names, int(nvalues), int(dtype),
+                           filename=self.filename,
+                           header_offset=header_offset,
+                           offset=pos, nbytes=end - pos, stat=stat)
+        return block, end
+
+    def read_index(self, buffer, stat=None):
+        """Read the comments and dimensions from the contents of a
+        PRMS parameter file, and index the location of each parameter.
+
+        Parameters
+        ----------
+        buffer : bytes or mmap.mmap
+            Contents of the parameter file.
+        stat : tuple, optional
+            (size, modification time) of the parameter file.
+
+        Returns
+        -------
+        blocks : list of paramBlock instances
+        """
+        blocks = []
+        pos = self.read_comments(buffer)
+        read_dimensions = False
+        while pos < len(buffer):
+            line_start = pos
+            line, pos = readline(buffer, pos)
             if '####' in line:
-                result = addtoo(f)
-            # params are read until ####
-            # line will be the name of the next parameter
-            #if result == '####':
-            #    while result == '####':
-            #        result = addtoo(f, name=line)
-            elif result is not None:
-                result = addtoo(f, name=line.strip())
-            else:
-                return line
+                if read_dimensions:
+                    pos = self.read_dimension(buffer, pos)
+                else:
+                    block, pos = self.read_header(buffer, pos,
+                                                  header_offset=line_start,
+                                                  stat=stat)
+                    blocks.append(block)
+            elif 'Dimensions' in line:
+                if self.verbose:
+                    logger.info('reading dimensions...')
+                read_dimensions = True
+            elif 'Parameters' in line:
+                if self.verbose:
+                    logger.info('reading parameters...')
+                read_dimensions = False
+        return blocks
 
-    def read_param(self, f, name=None):
-        if name is None:
-            name = next(f).strip()
-        ndim = int(next(f).strip())
-        dim_names = []
-        for d in range(ndim):
-            dim_names.append(next(f).strip())
-        nvalues = int(next(f).strip())
-
-        # skip reading this one if not in load_only
-        if self.load_only is not None:
-            if len(self.load_only) == 0:
-                return 'break'
-            elif name not in self.load_only:
-                for val in f:
-                    val = val.strip()
-                    if '####' in val:
-                        return val
-            else:
-                self.load_only.remove(name)
+    def read(self, filename=None, lazy=False, cache=True, cache_dir=None,
+             cache_max_size=None):
+        """Read dimensions and parameters from a PRMS parameter file.
 
-        dtype = int(next(f).strip())
-        if dtype != 4:
-            def convert_dtype(val):
-                return dtypes[dtype](float(val))
+        Parameters
+        ----------
+        filename : str, optional
+            By default, self.filename.
+        lazy : bool
+            If True, only the header of each parameter is read,
+            and the values are read the first time that the parameter array
+            is accessed. By default, False.
+        cache : bool
+            Option to read and write parsed parameter values from/to a
+            binary cache (see :mod:`pyrms.cache`). Lazy loads, and loads
+            of only some parameters (load_only), only read from the cache,
+            so that they don't have to hash the file or write arrays.
+            By default, True.
+        cache_dir : str, optional
+            Location of the cache. By default,
+            pyrms.cache.default_cache_dir.
+        cache_max_size : int, optional
+            Maximum size of the cache, in bytes. By default,
+            pyrms.cache.default_max_size.
+        """
+        if filename is None:
+            filename = self.filename
+        timed = len(hooks) > 0
+        if timed:
+            start = perf_counter()
+        st = os.stat(filename)
+        stat = (st.st_size, st.st_mtime_ns)
+        if st.st_size == 0:
+            return
+        if cache:
+            read_only = lazy or self.load_only is not None
+            cache = paramCache(filename, cache_dir=cache_dir,
+                               max_size=cache_max_size, read_only=read_only)
+            header = cache.read_header(stat)
+            if header is not None:
+                self.comments = header['comments']
+                self.dimensions.update(header['dimensions'])
+                blocks = [paramBlock(filename=self.filename, stat=stat,
+                                     cache=cache, **b)
+                          for b in header['params']]
+                if timed:
+                    emit('index', filename, source='cache',
+                         elapsed=perf_counter() - start)
+                self._add_params(blocks, lazy=lazy)
+                if timed:
+                    self._emit_read(filename, start, source='cache')
+                return
+            if cache.read_only:
+                cache = None
         else:
-            convert_dtype = dtypes[dtype]
-
-        values = []
-        for val in f:
-            val = val.strip()
-            if '*' in val:
-                nval, val = val.split('*')
-                values += [convert_dtype(val)] * int(nval)
-            elif '####' in val:
-                break
-            elif val.strip() == '':
-                continue
-            else:
-                values.append(convert_dtype(val))
-        #values = [convert_dtype(next(f).strip()) for i in range(nvalues)]
-        self.params[name] = param(name, values,
-                                  dim_names=dim_names,
-                                  filename=self.filename,
-                                  dtype=dtype,
-                                  nrow=self.nrow, ncol=self.ncol,
-                                  model=self.model)
-        self.param_order.append(name)
-        if self.verbose:
-            print(name)
-        return val
+            cache = None
+        with open(filename, 'rb') as src, \
+                mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            blocks = self.read_index(buffer, stat=stat)
+            if cache is not None:
+                cache.write_header(stat, hashlib.blake2b(buffer).hexdigest(),
+                                   self.comments, self.dimensions, blocks)
+                for block in blocks:
+                    block.cache = cache
+            if timed:
+                emit('index', filename, source='file', bytes=st.st_size,
+                     elapsed=perf_counter() - start)
+            self._add_params(blocks, lazy=lazy, buffer=buffer)
+        if timed:
+            self._emit_read(filename, start, source='file', nbytes=st.st_size)
+
+    def _emit_read(self, filename, start, source, nbytes=None):
+        loaded = [p for p in self.params.values() if p.loaded]
+        emit('read', filename, source=source, bytes=nbytes,
+             values=sum(p.array.size for p in loaded),
+             allocated=sum(p.array.nbytes for p in loaded),
+             elapsed=perf_counter() - start)
+
+    def _add_params(self, blocks, lazy=False, buffer=None):
+        for block in blocks:
+            # skip reading this one if not in load_only
+            if self.load_only is not None:
+                if block.name not in self.load_only:
+                    continue
+                self.load_only.remove(block.name)
+            p = param(block.name, dim_names=block.dim_names,
+                      filename=self.filename,
+                      nrow=self.nrow, ncol=self.ncol,
+                      model=self.model, block=block, compact=self.compact,
+                      dimensions=self.dimensions)
+            if not lazy:
+                p.read(buffer)
+            self.params[block.name] = p
+            self.param_order.append(block.name)
+            if self.verbose:
+                logger.info(block.name)
 
     @staticmethod
     def load(filename, model=None, nrow=None, ncol=None, verbose=False,
-             load_only=None):
+             load_only=None, lazy=False, cache=True, cache_dir=None,
+             cache_max_size=None, compact=False):
+        """Load a PRMS parameter file.
 
+        Parameters
+        ----------
+        filename : str
+        model : pyrms.model instance, optional
+        nrow, ncol : int, optional
+            Parameters with nrow * ncol values are reshaped to 2D arrays.
+        verbose : bool
+        load_only : str or sequence of str, optional
+            Names of parameters to load; other parameters are skipped.
+        lazy : bool
+            If True, only the parameter headers are read on load,
+            and each parameter's values are read the first time that its
+            array is accessed. By default, False.
+        cache : bool
+            Option to read and write parsed parameter values from/to a
+            binary cache, so that the text only has to be parsed once
+            (see :mod:`pyrms.cache`). Lazy loads, and loads of only some
+            parameters, only read from the cache. By default, True.
+        cache_dir : str, optional
+            Location of the cache. By default,
+            pyrms.cache.default_cache_dir.
+        cache_max_size : int, optional
+            Maximum size of the cache, in bytes. By default,
+            pyrms.cache.default_max_size.
+        compact : bool
+            Option to store the values in smaller numpy dtypes
+            (int8 or int32 for integers, float32 for floats), where
+            they can be converted back exactly; see
+            :func:`get_compact`. Parameters are written the same way
+            either way. By default, False (int64 and float64).
+
+        Returns
+        -------
+        pf : paramFile instance
+        """
         if load_only is not None and isinstance(load_only, str):
             load_only = [load_only]
+        if load_only is not None:
+            load_only = list(load_only)
 
         pf = paramFile(filename=filename, nrow=nrow, ncol=ncol,
                        model=model,
                        verbose=verbose)
         pf.load_only = load_only
-        with open(filename) as input:
-
-            line = pf.read_comments(input)
-            if 'Dimensions' in line:
-                if verbose:
-                    print('reading dimensions...')
-                line = paramFile._read_stuff(input, line, pf.read_dimension)
-            if line is not None:
-                if 'Parameters' in line or '####' in line:
-                    if verbose:
-                        print('reading parameters...')
-                    line = paramFile._read_stuff(input, line, pf.read_param)
-            else:
-                pass
+        pf.compact = compact
+        pf.read(lazy=lazy, cache=cache, cache_dir=cache_dir,
+                cache_max_size=cache_max_size)
 
         if load_only is not None and len(load_only) > 0:
             for param in load_only:
-                print('{} not found!'.format(param))
+                logger.warning('{} not found in {}'.format(param, filename))
         if model is not None:
             #model.dimensions.update(pf.dimensions)
             #model.params.update(pf.params)
@@ -302,30 +1246,146 @@ class paramFile(object):
             #model.paramdf.append(pf.df)
         return pf
 
-    def write(self, filename=None):
+    def write(self, filename=None, run_length=False, fmt=None,
+              incremental=True, values=None, verify=True):
+        """Write the parameter file.
 
+        Parameters
+        ----------
+        filename : str, optional
+            By default, self.filename.
+        run_length : bool
+            Option to write runs of repeated values in the
+            PRMS N*value format. By default, False.
+        fmt : dict, optional
+            printf-style formats for the values, keyed by PRMS data type
+            (e.g. pyrms.dtypes.fmt). See :meth:`param.write`.
+        incremental : bool
+            If True, parameters that haven't been modified since they were
+            read (or that were never read) are copied verbatim from their
+            source file, and only the modified parameters are formatted
+            (with run_length and fmt). If False, all parameters are
+            formatted. By default, True.
+        values : dict, optional
+            Values to write instead of the arrays of some parameters,
+            keyed by parameter name (e.g. for writing ensemble members
+            without modifying the parameters). Can't be used to overwrite
+            the file that the parameters were read from.
+        verify : bool
+            If True, the parameters that have been read are checked for
+            in-place changes (see :meth:`param.check_modified`), which
+            hashes their values. If False, only parameters that are
+            flagged as modified are written from their arrays (for callers
+            that set modified = True themselves); unflagged in-place
+            changes are lost. By default, True.
+        """
         if filename is None:
             filename = self.filename
+        if fmt is None:
+            fmt = {}
+        if values is None:
+            values = {}
+        elif samefile(filename, self.filename):
+            raise ValueError('Replacement values can only be written '
+                             'to a new file.')
 
         # determine an order for writing parameters
         # (alphabetically if none specified)
         if len(self.param_order) != len(self.params):
             self.param_order = sorted(list(self.params.keys()))
+        if verify:
+            for p in self.params.values():
+                p.check_modified()
+
+        overwrite = [p for p in self.params.values() if p.block is not None
+                     and samefile(p.block.filename, filename)]
+        if not incremental:
+            # values not yet read from the file being overwritten
+            # need to be read first
+            for p in overwrite:
+                if not p.loaded:
+                    p.read()
+        dest = filename
+        if os.path.exists(filename):
+            # write to a temporary file, and then replace the file, so that
+            # unmodified entries can be copied from the original, and other
+            # links to the file (e.g. ensemble members) aren't changed
+            fd, dest = tempfile.mkstemp(
+                suffix='.tmp', dir=os.path.dirname(os.path.abspath(filename)))
+            os.close(fd)
+            shutil.copymode(filename, dest)
 
-        with open(filename, 'w') as output:
+        timed = len(hooks) > 0
+        if timed:
+            start = perf_counter()
+        try:
+            self._write(dest, filename, run_length=run_length, fmt=fmt,
+                        incremental=incremental, values=values, timed=timed)
+        except BaseException:
+            if dest != filename and os.path.exists(dest):
+                os.remove(dest)
+            raise
+        if dest != filename:
+            os.replace(dest, filename)
+        if timed:
+            emit('write', filename, bytes=os.path.getsize(filename),
+                 values=sum(p.nvalues for p in self.params.values()),
+                 elapsed=perf_counter() - start)
+        logger.info('wrote {}'.format(filename))
+        if samefile(filename, self.filename):
+            self._update_blocks()
+
+    def _write(self, dest, filename, run_length=False, fmt=None,
+               incremental=True, values=None, timed=False):
+        """Write the parameter file to dest (filename, or a temporary
+        file that replaces it); see :meth:`write`."""
+        with open(dest, 'w') as output:
             output.write(self.comments)
             if len(self.dimensions) > 0:
                 if self.verbose:
-                    print('\nwriting parameter dimension info...')
+                    logger.info('writing parameter dimension info...')
                 output.write('** Dimensions **\n')
                 for k, v in self.dimensions.items():
                     output.write('####\n{}\n{:d}\n'.format(k, v))
             if len(self.params) > 0:
                 if self.verbose:
-                    print('\nwriting parameters...')
+                    logger.info('writing parameters...')
                 if len(self.dimensions) > 0:
                     output.write('** Parameters **\n')
             for k in self.param_order:
-                self.params[k].write(output)
-            print('wrote {}'.format(filename))
+                p = self.params[k]
+                if incremental and k not in values and not p.modified and \
+                        not (p.loaded and p.block.changed):
+                    if timed:
+                        copy_start = perf_counter()
+                    p.block.copy(output)
+                    if timed:
+                        elapsed = perf_counter() - copy_start
+                        emit('copy', filename, p.name,
+                             bytes=p.block.end - p.block.header_offset,
+                             elapsed=elapsed)
+                    if self.verbose:
+                        logger.info('copied {}'.format(p.name))
+                else:
+                    p._write(output, filename, run_length=run_length,
+                             fmt=fmt.get(p.dtype), values=values.get(k))
+
+    def _update_blocks(self):
+        """Point the parameters to their entries in a newly written
+        parameter file, so that they are no longer considered modified."""
+        index = paramFile(filename=self.filename)
+        st = os.stat(self.filename)
+        if st.st_size == 0:
+            return
+        with open(self.filename, 'rb') as src, \
+                mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            blocks = index.read_index(buffer, stat=(st.st_size, st.st_mtime_ns))
+        blocks = {b.name: b for b in blocks}
+        for name, p in self.params.items():
+            if name in blocks:
+                # only the arrays that were written need new digests
+                if p.loaded and p.modified:
+                    p._read_digest = get_digest(p.array)
+                p.block = blocks[name]
+                p.modified = False
 
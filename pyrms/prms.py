@@ -1,10 +1,27 @@
 import os
+import logging
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import numpy as np
-import pandas as pd
 from pyrms.cascades import cascadeParamFile
 from pyrms.control import controlFile
-from pyrms.param import paramFile
+from pyrms.param import paramFile, diff_params
+from pyrms.utils import lazy_import, versionedDict
+
+pd = lazy_import('pandas')
+
+
+logger = logging.getLogger(__name__)
+
+
+def load_param_file(filename, model=None, xy_points=None, sr=None,
+                    **kwargs):
+    """Load a PRMS parameter file, as a :class:`pyrms.cascades.cascadeParamFile`
+    if it contains cascades, or otherwise a :class:`pyrms.param.paramFile`."""
+    if 'cascade' not in str(filename):
+        return paramFile.load(filename, model=model, **kwargs)
+    return cascadeParamFile.load(filename, model=model,
+                                 xy_points=xy_points, sr=sr, **kwargs)
 
 
 class model:
@@ -19,10 +36,17 @@ class model:
         self.model_ws, self.control_file = os.path.split(control_file)
         if model_ws is not None:
             self.model_ws = model_ws
-        self.files = {}
+        self.files = versionedDict()
         self.control_file = control_file
         self.dimensions_file = None
         self._dimensions = None
+        self._file_dimensions = {}
+        self._param_index = None
+        self._index_key = None
+        self._active = None
+        self._active_key = None
+        self._active_masks = {}
+        self.active_version = 0
         self.param_files = []
 
         self.xy_points = xy_points # placeholder for non-structured ref
@@ -45,12 +69,8 @@ class model:
     def dimensions(self):
         dims = self._dimensions
         if dims is None:
-            dims = {}
-            for k, v in self.files.items():
-                if len(v.dimensions) > 0:
-                    dims.update(v.dimensions)
-                    self.dimensions_file = k
-            self._dimensions = dims
+            self._update_index()
+            dims = self._file_dimensions
         return dims
 
     @property
@@ -60,32 +80,131 @@ class model:
             return hru_type.array
         return np.ones(self.nhru)
 
+    @property
+    def active(self):
+        """Boolean array of active HRUs (hru_type > 0).
+        Cached until the hru_type parameter is replaced or its values
+        change (including in-place changes, which are found by hashing
+        the hru_type array)."""
+        hru_type = self.params.get('hru_type', None)
+        values = self.hru_type
+        key = (id(hru_type), getattr(hru_type, 'array_digest', None),
+               self._index_key)
+        if self._active is None or self._active_key != key:
+            self._active = values > 0
+            self._active_key = key
+            self._active_masks = {}
+            self.active_version += 1
+        return self._active
+
+    def get_active(self, nvalues):
+        """Get the active HRU mask for a parameter with nvalues values,
+        with HRU as the first dimension. For parameters with additional
+        dimensions (e.g. nhru x nmonths), the mask is repeated in PRMS
+        (HRU fastest) order. Masks are shared by parameters with
+        the same number of values.
+        """
+        active = self.active
+        if nvalues == active.size:
+            return active
+        if nvalues not in self._active_masks:
+            if nvalues % active.size == 0:
+                mask = np.tile(active.ravel(), nvalues // active.size)
+            else:
+                mask = np.ones(nvalues, dtype=bool)
+            self._active_masks[nvalues] = mask
+        return self._active_masks[nvalues]
+
     @property
     def nhru(self):
-        for p in self.params:
+        nhru = self.dimensions.get('nhru') \
+            if isinstance(self.dimensions, dict) else None
+        if nhru is not None:
+            return nhru
+        for p in self.params.values():
             if p.dim_names[0] == 'nhru':
-                return p.dim_names[0]
+                return p.nvalues
         return 0
 
     @property
     def params(self):
+        """Parameters in all of the files, keyed by name.
+        The index is maintained until parameters or files are
+        added or removed."""
+        self._update_index()
+        return self._param_index
+
+    def _get_index_key(self):
+        return (id(self.files), getattr(self.files, 'version', None),
+                tuple((id(f.params), getattr(f.params, 'version', None))
+                      for f in self.files.values()))
+
+    def _update_index(self):
+        key = self._get_index_key()
+        if self._param_index is not None and key == self._index_key:
+            return
         params = {}
+        dims = {}
         for k, v in self.files.items():
             for n, p in v.params.items():
                 params[n] = p
-        return params
+            if len(v.dimensions) > 0:
+                dims.update(v.dimensions)
+                self.dimensions_file = k
+        self._param_index = params
+        self._file_dimensions = dims
+        self._index_key = key
+
+    def invalidate(self):
+        """Clear the cached parameter index and active HRU mask."""
+        self._param_index = None
+        self._active = None
 
     @property
     def summary(self):
-        return pd.concat([v.summary for k, v in self.files.items()])
+        return self.get_summary_dataframe()
+
+    def get_summary_dataframe(self, stats=None):
+        """Summarize the parameters in all of the files;
+        see :meth:`pyrms.param.paramFile.get_summary_dataframe`."""
+        return pd.concat([v.get_summary_dataframe(stats)
+                          for k, v in self.files.items()])
+
+    def diff(self, other, include_unchanged=False):
+        """Compare the parameters with those in another model,
+        regardless of which files they are in; see
+        :func:`pyrms.param.diff_params`.
+
+        Parameters
+        ----------
+        other : model instance
+            Model to compare to (values in other are compared
+            to those in this model).
+        include_unchanged : bool
+            By default, False.
+
+        Returns
+        -------
+        diff : DataFrame
+            With a 'file' column for the file containing each
+            parameter (in this model, or other for added parameters).
+        """
+        df = diff_params(self.params, other.params,
+                         include_unchanged=include_unchanged)
+        files = {n: k for k, f in other.files.items() for n in f.params}
+        files.update({n: k for k, f in self.files.items() for n in f.params})
+        df['file'] = [files.get(name) for name in df.name]
+        return df
 
     def check(self):
 
         # check for duplicate parameter values
-        isduplicate = self.summary.duplicated(subset='name', keep=False)
-        df = self.summary.loc[isduplicate]
+        summary = self.summary
+        isduplicate = summary.duplicated(subset='name', keep=False)
+        df = summary.loc[isduplicate]
         if len(df) > 0:
-            print('Warning: Duplicate parameter entries found! See duplicate_params.csv')
+            logger.warning('Duplicate parameter entries found! '
+                           'See duplicate_params.csv')
             df.to_csv('duplicate_params.csv')
 
     @staticmethod
@@ -93,7 +212,39 @@ class model:
              load_only=None,
              xy_points=None, sr=None, nrow=None, ncol=None,
              skip=None,
-             verbose=False, check=True):
+             verbose=False, check=True, lazy=False,
+             cache=True, cache_dir=None, cache_max_size=None, compact=False,
+             workers=None):
+        """Load a PRMS model from a control file.
+
+        Parameters
+        ----------
+        control_file : str
+        m : model instance, optional
+            Existing model to load the files into.
+        load_only : sequence of str, optional
+            Parameter files to load; other files listed in the
+            control file are skipped.
+        xy_points, sr : optional
+            Cell center coordinates or spatial reference,
+            for creating geometries of cascades.
+        nrow, ncol : int, optional
+            Parameters with nrow * ncol values are reshaped to 2D arrays.
+        skip : str or sequence of str, optional
+            Parameter files to skip.
+        verbose : bool
+        check : bool
+            Option to check the loaded model for duplicate parameters.
+        lazy, cache, cache_dir, cache_max_size, compact :
+            See :meth:`pyrms.param.paramFile.load`.
+        workers : int, optional
+            Number of processes for reading the parameter files in parallel.
+            By default, the files are read one after another.
+
+        Returns
+        -------
+        m : model instance
+        """
 
         if load_only is not None:
             load_only = [os.path.split(f)[1].split('.')[0]
@@ -108,29 +259,40 @@ class model:
             skip = []
         elif isinstance(skip, str):
             skip = [skip]
-        print('loading model...\n{}'.format(control_file))
+        logger.info('loading model {}'.format(control_file))
         m.ctrl = controlFile.load(control_file, verbose=verbose)
+        filenames = []
         for pf in m.ctrl.param_file.values:
             basename = os.path.split(pf)[1].split('.')[0]
             if load_only is not None and basename not in load_only:
-                print('\tskipping {}'.format(pf))
+                logger.info('skipping {}'.format(pf))
                 continue
             if basename in skip:
-                print('\tskipping {}'.format(pf))
+                logger.info('skipping {}'.format(pf))
                 continue
-            print(pf)
-            pf = Path(m.model_ws, pf.replace('\\', '/'))
-            if 'cascade' not in str(pf):
-                m.files[pf] = paramFile.load(pf, nrow=nrow, ncol=ncol,
-                                              model=m,
-                                              verbose=verbose)
-            else:
-                m.files[pf] = cascadeParamFile.load(pf,
-                                                     xy_points=xy_points, sr=sr,
-                                                     nrow=nrow, ncol=ncol,
-                                                     model=m,
-                                                     verbose=verbose)
-        m.check()
+            logger.info(pf)
+            filenames.append(Path(m.model_ws, pf.replace('\\', '/')))
+
+        kwargs = dict(xy_points=xy_points, sr=sr, nrow=nrow, ncol=ncol,
+                      verbose=verbose, lazy=lazy,
+                      cache=cache, cache_dir=cache_dir,
+                      cache_max_size=cache_max_size, compact=compact)
+        if workers is not None and workers > 1 and len(filenames) > 1:
+            # parse the files in separate processes;
+            # add them to the model in control file order
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(load_param_file, pf, **kwargs)
+                           for pf in filenames]
+                for pf, future in zip(filenames, futures):
+                    m.files[pf] = future.result()
+                    m.files[pf].model = m
+                    for p in m.files[pf].params.values():
+                        p.model = m
+        else:
+            for pf in filenames:
+                m.files[pf] = load_param_file(pf, model=m, **kwargs)
+        if check:
+            m.check()
         return m
 
     def write_dimensions(self, f=None):
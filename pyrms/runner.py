@@ -0,0 +1,361 @@
+"""
+Running ensembles of PRMS models, each in its own workspace.
+"""
+import os
+import copy
+import json
+import time
+import asyncio
+import logging
+from pyrms.control import controlFile, controlParam
+from pyrms.utils import lazy_import
+
+pd = lazy_import('pandas')
+
+
+# status file written to each member workspace when a run finishes
+status_file = 'pyrms_status.json'
+
+# control file variables that name input files; these (and any other
+# variables naming files in the base model folder, other than outputs)
+# are repointed to the base model folder in the member control files
+input_files = ('data_file', 'var_init_file', 'precip_map_file',
+               'temp_map_file', 'precip_day', 'tmax_day', 'tmin_day',
+               'humidity_day', 'swrad_day', 'potet_day', 'transp_day',
+               'windspeed_day', 'modflow_name')
+
+# control file variables that name output files, which are
+# written to the member workspaces
+output_files = ('model_output_file', 'stat_var_file', 'csv_output_file',
+                'map_output_file', 'ani_output_file', 'var_save_file',
+                'stats_output_file', 'nhruOutBaseFileName',
+                'nsubOutBaseFileName', 'basinOutBaseFileName')
+
+logger = logging.getLogger(__name__)
+
+
+class ensembleMember:
+    """A model run in an ensemble.
+
+    Parameters
+    ----------
+    name : str
+        Name of the run, and of its workspace folder.
+    param_files : dict or list, optional
+        Parameter files (:class:`pyrms.param.paramFile` instances) for the
+        run, keyed by their paths in the workspace, or a list (keyed by the
+        file names of the instances). Files with the same paths as files in
+        the base control file (or the same file names, if only one base file
+        has that name) replace them; other files are added. Parameter files
+        that aren't replaced are read from the base model.
+    workspace : str
+        Folder for the run.
+    """
+    def __init__(self, name, param_files=None, workspace=None):
+        self.name = name
+        if param_files is None:
+            param_files = {}
+        elif not isinstance(param_files, dict):
+            param_files = list(param_files)
+            names = [os.path.split(str(pf.filename))[1] for pf in param_files]
+            if len(set(names)) < len(names):
+                raise ValueError('{}: parameter files have the same names; '
+                                 'use a dict keyed by paths'.format(name))
+            param_files = dict(zip(names, param_files))
+        self.param_files = param_files
+        self.workspace = workspace
+        self.status = 'pending'
+        self.returncode = None
+        self.elapsed = None
+        self.outputs = {}
+        self.resumed = False
+
+    @property
+    def status_file(self):
+        return os.path.join(self.workspace, status_file)
+
+    def read_status(self):
+        """Read the status of a previous run from the workspace;
+        returns None if there isn't one."""
+        try:
+            with open(self.status_file) as src:
+                return json.load(src)
+        except (OSError, ValueError):
+            return
+
+    def write_status(self):
+        status = {'name': self.name,
+                  'status': self.status,
+                  'returncode': self.returncode,
+                  'elapsed': self.elapsed,
+                  'outputs': self.outputs}
+        tmpfile = self.status_file + '.tmp'
+        with open(tmpfile, 'w') as dest:
+            json.dump(status, dest)
+        os.replace(tmpfile, self.status_file)
+
+
+class ensembleRunner:
+    """Run an ensemble of PRMS models in parallel.
+
+    Each member gets its own workspace (a subfolder of workspace), with a
+    control file and its own parameter files. The model executable is run
+    in the workspace, with up to max_workers runs at a time; the output
+    of each run is streamed to a log file in its workspace (and optionally
+    to a callback). When a run finishes, its status is written to the
+    workspace, so that a partially completed ensemble can be resumed.
+
+    Parameters
+    ----------
+    ctrl : str or :class:`pyrms.control.controlFile`
+        Control file for the base model. Input file paths are relative
+        to the folder containing it; the member control files refer to
+        them there (see input_files), and outputs are written to the
+        member workspaces.
+    workspace : str
+        Folder for the member workspaces. By default, 'ensemble'.
+    executable : str or list, optional
+        Model executable (or a command, as a list of arguments); the control
+        file is added as the last argument. By default, executable_model in
+        the control file.
+    max_workers : int, optional
+        Maximum number of runs at a time. By default, os.cpu_count().
+    timeout : float, optional
+        Maximum duration of each run, in seconds. Runs that take longer
+        are killed. By default, no limit.
+    outputs : sequence of str
+        Output files to gather from each run, by their control file
+        variable names. By default, ['model_output_file', 'stat_var_file'].
+    on_output : callable, optional
+        Function of (member name, line) that is called with each line
+        of output from the runs.
+    """
+    def __init__(self, ctrl, workspace='ensemble', executable=None,
+                 max_workers=None, timeout=None,
+                 outputs=('model_output_file', 'stat_var_file'),
+                 on_output=None, verbose=False):
+        if not isinstance(ctrl, controlFile):
+            ctrl = controlFile.load(ctrl)
+        self.ctrl = ctrl
+        self.model_ws = os.path.split(getattr(ctrl, 'filename', ''))[0]
+        self.workspace = workspace
+        if executable is None:
+            executable = ctrl.executable_model.values[0]
+        if isinstance(executable, str):
+            executable = [executable]
+        self.command = list(executable)
+        # executables in the base model folder
+        path = os.path.join(self.model_ws, self.command[0])
+        if os.path.isfile(path):
+            self.command[0] = os.path.abspath(path)
+        self.max_workers = os.cpu_count() if max_workers is None else max_workers
+        self.timeout = timeout
+        self.outputs = list(outputs)
+        self.on_output = on_output
+        self.verbose = verbose
+        self.members = {}
+        self._tasks = []
+        self._loop = None
+
+    def add_member(self, name, param_files=None):
+        """Add a run to the ensemble; see :class:`ensembleMember`."""
+        member = ensembleMember(name, param_files,
+                                workspace=os.path.join(self.workspace, name))
+        self.members[name] = member
+        return member
+
+    @property
+    def control_filename(self):
+        return os.path.split(getattr(self.ctrl, 'filename', 'model.control'))[1]
+
+    def get_base_path(self, filename):
+        """Get the absolute path to a file in the base model folder."""
+        return os.path.abspath(os.path.join(self.model_ws,
+                                            filename.replace('\\', '/')))
+
+    def get_param_files(self, member):
+        """Get the parameter file paths for a member's control file;
+        files that aren't replaced by the member are read from the
+        base model folder."""
+        base_files = [os.path.normpath(f.replace('\\', '/'))
+                      for f in self.ctrl.param_file.values]
+        replaced = {}
+        for key in member.param_files:
+            path = os.path.normpath(key)
+            matches = [i for i, f in enumerate(base_files) if f == path]
+            if len(matches) == 0 and os.path.split(path)[0] == '':
+                matches = [i for i, f in enumerate(base_files)
+                           if os.path.split(f)[1] == path]
+            if len(matches) > 1:
+                raise ValueError('{}: {} matches more than one parameter file '
+                                 'in the base model; use its path relative '
+                                 'to the control file'.format(member.name, key))
+            if len(matches) == 1:
+                replaced[matches[0]] = key
+        filenames = [replaced[i] if i in replaced
+                     else self.get_base_path(filename)
+                     for i, filename in enumerate(self.ctrl.param_file.values)]
+        filenames += [key for key in member.param_files
+                      if key not in replaced.values()]
+        return filenames
+
+    def get_input_files(self):
+        """Get the control file variables with input files (other than
+        the parameter files), and their paths in the base model folder."""
+        outputs = set(output_files) | set(self.outputs)
+        inputs = {}
+        for name in self.ctrl.control_params:
+            cp = self.ctrl.__dict__[name]
+            if name == 'param_file' or name in outputs or cp.dtype != 4:
+                continue
+            values = [v for v in cp.values if v is not None]
+            if len(values) == 0:
+                continue
+            paths = [self.get_base_path(v) for v in values]
+            if name in input_files or name.endswith('_dynamic') or \
+                    all(os.path.isfile(path) for path in paths):
+                inputs[name] = paths
+        return inputs
+
+    def setup(self, member):
+        """Write the control and parameter files for a run."""
+        os.makedirs(member.workspace, exist_ok=True)
+        ctrl = copy.copy(self.ctrl)
+        ctrl.__dict__ = dict(self.ctrl.__dict__)
+        ctrl.param_file = controlParam('param_file',
+                                       self.get_param_files(member), 4)
+        for key, pf in member.param_files.items():
+            filename = os.path.join(member.workspace, key)
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
+            pf.write(filename)
+        for name, paths in self.get_input_files().items():
+            ctrl.__dict__[name] = controlParam(name, paths, 4)
+        # folders for the outputs
+        for name in self.outputs:
+            if name in ctrl.__dict__:
+                folder = os.path.split(ctrl.__dict__[name].values[0].replace('\\', '/'))[0]
+                os.makedirs(os.path.join(member.workspace, folder), exist_ok=True)
+        ctrl.write(os.path.join(member.workspace, self.control_filename))
+
+    def get_outputs(self, member):
+        """Get the paths of the outputs that were written by a run."""
+        outputs = {}
+        for name in self.outputs:
+            if name in self.ctrl.__dict__:
+                path = self.ctrl.get_path(name, model_ws=member.workspace)
+                if os.path.exists(path):
+                    outputs[name] = path
+        return outputs
+
+    async def run_member(self, member, semaphore, resume=True):
+        """Set up and run a member of the ensemble."""
+        if resume:
+            status = member.read_status()
+            if status is not None and status['status'] == 'success':
+                member.status = status['status']
+                member.returncode = status['returncode']
+                member.elapsed = status['elapsed']
+                member.outputs = status['outputs']
+                member.resumed = True
+                return member
+        try:
+            async with semaphore:
+                await self._run(member)
+        except asyncio.CancelledError:
+            # cancelled before it started
+            if member.status == 'pending':
+                member.status = 'cancelled'
+            raise
+        return member
+
+    async def _run(self, member):
+        loop = asyncio.get_running_loop()
+        try:
+            # format the parameter files outside of the event loop
+            await loop.run_in_executor(None, self.setup, member)
+        except Exception as e:
+            member.status = 'failed'
+            member.write_status()
+            logger.error('{}: could not set up run:\n{}'.format(member.name, e))
+            return
+        member.status = 'running'
+        start = time.time()
+        log_file = os.path.join(member.workspace, 'stdout.txt')
+        with open(log_file, 'w') as log:
+            process = await asyncio.create_subprocess_exec(
+                *self.command, self.control_filename, cwd=member.workspace,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT)
+            try:
+                await asyncio.wait_for(self._stream(member, process, log),
+                                       self.timeout)
+                member.status = 'success' if process.returncode == 0 \
+                    else 'failed'
+            except asyncio.TimeoutError:
+                member.status = 'timeout'
+            except asyncio.CancelledError:
+                member.status = 'cancelled'
+                raise
+            finally:
+                if process.returncode is None:
+                    process.kill()
+                    await process.wait()
+                member.returncode = process.returncode
+                member.elapsed = time.time() - start
+                member.outputs = self.get_outputs(member)
+                member.write_status()
+                if self.verbose:
+                    logger.info('{}: {} ({:.1f}s)'.format(
+                        member.name, member.status, member.elapsed))
+
+    async def _stream(self, member, process, log):
+        async for line in process.stdout:
+            line = line.decode(errors='replace')
+            log.write(line)
+            if self.on_output is not None:
+                self.on_output(member.name, line.rstrip('\r\n'))
+        await process.wait()
+
+    async def run_async(self, resume=True):
+        """Run the ensemble; see :meth:`run`."""
+        self._loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.max_workers)
+        self._tasks = [asyncio.ensure_future(self.run_member(m, semaphore, resume))
+                       for m in self.members.values()]
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        return self.summary
+
+    def run(self, resume=True):
+        """Run the ensemble.
+
+        Parameters
+        ----------
+        resume : bool
+            If True, runs that completed successfully before (according to
+            the status files in their workspaces) are skipped.
+            By default, True.
+
+        Returns
+        -------
+        summary : DataFrame
+            Status, return code, duration and outputs of each run.
+        """
+        return asyncio.run(self.run_async(resume=resume))
+
+    def cancel(self):
+        """Cancel the ensemble (e.g. from another thread);
+        running models are killed, and pending runs aren't started."""
+        if self._loop is not None:
+            for task in self._tasks:
+                self._loop.call_soon_threadsafe(task.cancel)
+
+    @property
+    def summary(self):
+        return pd.DataFrame([{'name': m.name,
+                              'status': m.status,
+                              'returncode': m.returncode,
+                              'elapsed': m.elapsed,
+                              'resumed': m.resumed,
+                              'workspace': m.workspace,
+                              **m.outputs} for m in self.members.values()])
@@ -0,0 +1,263 @@
+"""
+Sharing loaded models with worker processes through shared memory.
+
+The parameter arrays of a model are copied once into shared memory
+segments (one per parameter) by :class:`sharedModel`, which also makes a
+small, picklable descriptor of the model. Workers pass the descriptor to
+:func:`attach`, to get a model with parameters that are views of the
+shared arrays, instead of receiving pickled copies of the arrays.
+
+The process that creates a :class:`sharedModel` owns the segments, and
+removes them when it is closed (or at the end of a with block); models
+attached in workers should be closed (or discarded) before then.
+
+Examples
+--------
+>>> with sharedModel(m) as shared:  # doctest: +SKIP
+...     with ProcessPoolExecutor() as executor:
+...         results = list(executor.map(run, [shared.descriptor] * 10))
+>>> def run(descriptor):  # doctest: +SKIP
+...     with attach(descriptor) as attached:
+...         return attached.model.params['covden_sum'].array.mean()
+"""
+import os
+import sys
+import mmap
+import logging
+from pathlib import Path
+from multiprocessing import shared_memory
+import numpy as np
+from pyrms.cascades import cascadeParamFile
+from pyrms.param import paramFile, param
+from pyrms.prms import model
+
+
+logger = logging.getLogger(__name__)
+
+
+# location of POSIX shared memory on Linux, where segments
+# can be memory-mapped copy-on-write
+shm_dir = '/dev/shm'
+
+
+class sharedModel:
+    """Copy the parameter arrays of a model into shared memory.
+
+    Parameters
+    ----------
+    source : :class:`pyrms.prms.model`, :class:`pyrms.param.paramFile` or list
+        Model, or parameter files, to share.
+
+    Attributes
+    ----------
+    descriptor : dict
+        Picklable description of the model and its shared arrays,
+        for :func:`attach`.
+    segments : list of multiprocessing.shared_memory.SharedMemory
+    """
+    def __init__(self, source):
+        self.segments = []
+        self.descriptor = None
+        control_file = 'model.control'
+        nrow = ncol = None
+        if isinstance(source, model):
+            control_file = source.control_file
+            nrow, ncol = source.nrow, source.ncol
+            param_files = source.files
+        elif isinstance(source, paramFile):
+            param_files = {source.filename: source}
+        else:
+            param_files = {pf.filename: pf for pf in source}
+        try:
+            files = [self._share_file(key, pf)
+                     for key, pf in param_files.items()]
+        except Exception:
+            self.close()
+            raise
+        self.descriptor = {'control_file': str(control_file),
+                           'nrow': nrow, 'ncol': ncol,
+                           'files': files}
+
+    def _share_file(self, key, pf):
+        order = pf.param_order if len(pf.param_order) == len(pf.params) \
+            else sorted(pf.params)
+        params = []
+        for name in order:
+            p = pf.params[name]
+            array = np.ascontiguousarray(p.array)
+            entry = {'name': p.name,
+                     'dim_names': list(p.dim_names),
+                     'dtype': p.dtype,
+                     'array_dtype': array.dtype.str,
+                     'shape': array.shape,
+                     'segment': None}
+            if array.nbytes > 0:
+                shm = shared_memory.SharedMemory(create=True, size=array.nbytes)
+                self.segments.append(shm)
+                view = np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)
+                view[...] = array
+                del view
+                entry['segment'] = shm.name
+            params.append(entry)
+        return {'key': str(key),
+                'cascades': isinstance(pf, cascadeParamFile),
+                'gw': getattr(pf, 'gw', False),
+                'filename': str(pf.filename),
+                'comments': pf.comments,
+                'dimensions': dict(pf.dimensions),
+                'params': params}
+
+    @property
+    def nbytes(self):
+        """Total size of the shared memory segments."""
+        return sum(shm.size for shm in self.segments)
+
+    def close(self):
+        """Release and remove the shared memory segments."""
+        for shm in self.segments:
+            shm.close()
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+        self.segments = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def open_segment(name, nbytes, copy_on_write=False):
+    """Map a shared memory segment created by :class:`sharedModel`.
+
+    Returns
+    -------
+    buffer : mmap.mmap, or memoryview
+        Read-only (or copy-on-write) mapping of the segment.
+    handle : SharedMemory or None
+        Shared memory instance that needs to be kept open, on platforms
+        where segments can't be mapped from a file.
+    """
+    path = os.path.join(shm_dir, name.lstrip('/'))
+    if os.path.exists(path):
+        access = mmap.ACCESS_COPY if copy_on_write else mmap.ACCESS_READ
+        with open(path, 'rb') as src:
+            return mmap.mmap(src.fileno(), nbytes, access=access), None
+    # other platforms; segments are attached through SharedMemory,
+    # without registering them for removal when this process exits
+    kwargs = {'track': False} if sys.version_info >= (3, 13) else {}
+    shm = shared_memory.SharedMemory(name, **kwargs)
+    return shm.buf[:nbytes], shm
+
+
+class attachedModel:
+    """Model with parameters that are views of arrays in shared memory;
+    see :func:`attach`.
+
+    Attributes
+    ----------
+    model : :class:`pyrms.prms.model`
+    """
+    def __init__(self, model, handles):
+        self.model = model
+        self._handles = handles
+
+    @property
+    def files(self):
+        return self.model.files
+
+    @property
+    def params(self):
+        return self.model.params
+
+    def close(self):
+        """Release the references to the shared arrays. The segments are
+        unmapped once no arrays from the model are in use (on platforms
+        without /dev/shm, segments with arrays still in use are kept open,
+        until close is called again)."""
+        if self.model is not None:
+            for pf in self.model.files.values():
+                for p in pf.params.values():
+                    p._array = None
+        self.model = None
+        in_use = []
+        for shm in self._handles:
+            try:
+                shm.close()
+            except BufferError:
+                # arrays from the model are still in use
+                logger.warning('shared memory segment {} is still in use, '
+                               'and was not unmapped'.format(shm.name))
+                in_use.append(shm)
+        self._handles = in_use
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def attach(descriptor, copy_on_write=False):
+    """Attach to a model that was shared by :class:`sharedModel`
+    (e.g. in a worker process).
+
+    Parameters
+    ----------
+    descriptor : dict
+        :attr:`sharedModel.descriptor`
+    copy_on_write : bool
+        If False (default), the parameter arrays are read-only views of
+        the shared memory. If True, the arrays can be changed in place,
+        with changes kept private to this process (on platforms without
+        /dev/shm, the arrays are copied instead).
+
+    Returns
+    -------
+    attached : :class:`attachedModel`
+    """
+    nrow, ncol = descriptor['nrow'], descriptor['ncol']
+    m = model(descriptor['control_file'], nrow=nrow, ncol=ncol)
+    handles = []
+    for info in descriptor['files']:
+        if info['cascades']:
+            pf = cascadeParamFile(filename=info['filename'],
+                                  dimensions=info['dimensions'],
+                                  nrow=nrow, ncol=ncol, gw=info['gw'],
+                                  model=m)
+        else:
+            pf = paramFile(filename=info['filename'],
+                           dimensions=info['dimensions'],
+                           nrow=nrow, ncol=ncol, model=m)
+        pf.comments = info['comments']
+        for entry in info['params']:
+            dtype = np.dtype(entry['array_dtype'])
+            shape = tuple(entry['shape'])
+            if entry['segment'] is None:
+                array = np.zeros(shape, dtype=dtype)
+            else:
+                nbytes = int(np.prod(shape)) * dtype.itemsize
+                buffer, shm = open_segment(entry['segment'], nbytes,
+                                           copy_on_write=copy_on_write)
+                # frombuffer (unlike ndarray) holds on to the buffer,
+                # so that it can't be unmapped while the array is in use
+                array = np.frombuffer(buffer, dtype=dtype,
+                                      count=int(np.prod(shape))).reshape(shape)
+                if shm is not None:
+                    handles.append(shm)
+                    if copy_on_write:
+                        array = array.copy()
+                    else:
+                        array.flags.writeable = False
+            # the array is used as is (no dtype conversion or copy)
+            p = param.from_array(entry['name'], array,
+                                 dim_names=entry['dim_names'],
+                                 dtype=entry['dtype'],
+                                 filename=info['filename'], nrow=nrow,
+                                 ncol=ncol, model=m, dimensions=pf.dimensions)
+            pf.params[p.name] = p
+            pf.param_order.append(p.name)
+        m.files[Path(info['key'])] = pf
+    return attachedModel(m, handles)
@@ -0,0 +1,93 @@
+"""
+Summary statistics for parameter values.
+"""
+import numpy as np
+
+
+default_stats = ['min', 'mean', 'max']
+
+
+def count_nan(values):
+    if values.dtype.kind == 'f':
+        return np.count_nonzero(np.isnan(values))
+    return 0
+
+
+reducers = {'min': np.min,
+            'max': np.max,
+            'mean': np.mean,
+            'std': np.std,
+            'median': np.median,
+            'sum': np.sum,
+            'nnan': count_nan,
+            }
+
+
+def get_reducers(stats=None):
+    """Get functions for computing summary statistics.
+
+    Parameters
+    ----------
+    stats : sequence or dict, optional
+        Statistics to compute. Items can be names of functions in
+        pyrms.stats.reducers ('min', 'mean', 'max', 'std', 'median',
+        'sum' or 'nnan'), percentiles in the form 'p<q>' (e.g. 'p10'),
+        or functions of a 1D array, which are named by their __name__.
+        A dict of names and functions can also be supplied.
+        By default, ['min', 'mean', 'max'].
+
+    Returns
+    -------
+    reducers : dict
+        Function for each statistic, keyed by name.
+    """
+    if stats is None:
+        stats = default_stats
+    if isinstance(stats, dict):
+        return dict(stats)
+    if isinstance(stats, str) or callable(stats):
+        stats = [stats]
+    functions = {}
+    for stat in stats:
+        if callable(stat):
+            functions[stat.__name__] = stat
+        elif stat in reducers:
+            functions[stat] = reducers[stat]
+        elif stat.startswith('p'):
+            q = float(stat[1:])
+            functions[stat] = lambda values, q=q: np.percentile(values, q)
+        else:
+            raise ValueError('Unrecognized statistic: {}'.format(stat))
+    return functions
+
+
+def get_stats(values, active=None, stats=None):
+    """Compute summary statistics for the active values in an array.
+
+    Parameters
+    ----------
+    values : numpy array
+    active : boolean numpy array, optional
+        Mask of values to include, with the same number of elements
+        as values. By default, all values are included.
+    stats : sequence or dict, optional
+        Statistics to compute; see :func:`get_reducers`.
+
+    Returns
+    -------
+    results : dict
+        Value of each statistic, plus the number of active values
+        ('nactive_values'). Statistics are nan for non-numeric
+        values, or if there are no active values.
+    """
+    functions = get_reducers(stats)
+    values = values.ravel()
+    if active is not None:
+        # select the active values once, for all of the statistics
+        values = values[active.ravel()]
+    results = {'nactive_values': values.size}
+    if values.size == 0 or values.dtype.kind not in 'biuf':
+        results.update({name: np.nan for name in functions})
+    else:
+        results.update({name: func(values) for name, func in functions.items()})
+    return results
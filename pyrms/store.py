@@ -0,0 +1,291 @@
+"""
+Content-addressed store of parameter arrays, for archiving many
+parameter sets (e.g. calibration runs) that mostly share the same values.
+
+Each parameter array is saved once, as a compressed .npy blob named by
+the parameter's content digest (see :attr:`pyrms.param.param.digest`).
+Each run is a small JSON manifest, with the comments, dimensions and
+parameter headers of its parameter files, and the digest of each
+parameter's values:
+
+    <path>/blobs/<first 2 characters of digest>/<digest>.npy.z
+    <path>/runs/<run>.json
+
+Saving a run only compresses the arrays that aren't in the store yet,
+and any run can be rebuilt into standard PRMS parameter files.
+"""
+import io
+import os
+import json
+import zlib
+import time
+import numpy as np
+from pyrms.param import paramFile, param, get_canonical
+from pyrms.utils import lazy_import
+
+pd = lazy_import('pandas')
+
+
+def write_atomic(filename, chunks):
+    """Write chunks of bytes to a temporary file, and then move it into
+    place, so that readers (or other writers) never see a partial file."""
+    tmpfile = '{}.{}.tmp'.format(filename, os.getpid())
+    with open(tmpfile, 'wb') as dest:
+        for chunk in chunks:
+            dest.write(chunk)
+    os.replace(tmpfile, filename)
+
+
+def get_relative_paths(filenames):
+    """Paths of files relative to the deepest folder that contains all
+    of them (just the file names, if they're all in the same folder)."""
+    if not filenames:
+        return []
+    filenames = [os.path.abspath(f) for f in filenames]
+    folder = os.path.commonpath([os.path.dirname(f) for f in filenames])
+    return [os.path.relpath(f, folder).replace(os.sep, '/')
+            for f in filenames]
+
+
+class arrayStore:
+    """Content-addressed store of parameter arrays.
+
+    Parameters
+    ----------
+    path : str
+        Folder for the store (created if it doesn't exist).
+    compresslevel : int
+        zlib compression level for new arrays (1-9). By default, 1.
+
+    Examples
+    --------
+    >>> store = arrayStore('archive')  # doctest: +SKIP
+    >>> store.save('run001', m)  # doctest: +SKIP
+    >>> store.write('run001', 'rebuilt')  # doctest: +SKIP
+    """
+    def __init__(self, path, compresslevel=1):
+        self.path = path
+        self.compresslevel = compresslevel
+        self.blobs_path = os.path.join(path, 'blobs')
+        self.runs_path = os.path.join(path, 'runs')
+        os.makedirs(self.blobs_path, exist_ok=True)
+        os.makedirs(self.runs_path, exist_ok=True)
+
+    def blob_file(self, digest):
+        return os.path.join(self.blobs_path, digest[:2], digest + '.npy.z')
+
+    def run_file(self, run):
+        return os.path.join(self.runs_path, '{}.json'.format(run))
+
+    @property
+    def runs(self):
+        """Names of the runs in the store."""
+        return sorted(f[:-5] for f in os.listdir(self.runs_path)
+                      if f.endswith('.json'))
+
+    def __contains__(self, digest):
+        return os.path.exists(self.blob_file(digest))
+
+    def put(self, p, blocksize=2**24):
+        """Add the values of a parameter to the store, if they
+        aren't already there.
+
+        Parameters
+        ----------
+        p : :class:`pyrms.param.param`
+        blocksize : int
+            Number of bytes compressed at a time.
+
+        Returns
+        -------
+        digest : str
+            Content digest of the parameter.
+        """
+        # loaded arrays are hashed (see param.digest), so in-place changes
+        # are stored; digests from the file (or cache) are only reused
+        # for values that haven't changed since they were read
+        digest = p.digest
+        filename = self.blob_file(digest)
+        if os.path.exists(filename):
+            return digest
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        values = np.ascontiguousarray(
+            get_canonical(np.asarray(p.array), p.dtype).ravel())
+        header = io.BytesIO()
+        np.lib.format.write_array_header_1_0(
+            header, np.lib.format.header_data_from_array_1_0(values))
+        compressor = zlib.compressobj(self.compresslevel)
+        data = values.view(np.uint8)
+
+        def chunks():
+            yield compressor.compress(header.getvalue())
+            for start in range(0, len(data), blocksize):
+                yield compressor.compress(data[start:start + blocksize])
+            yield compressor.flush()
+        write_atomic(filename, chunks())
+        return digest
+
+    def get(self, digest):
+        """Read an array from the store, by its digest."""
+        with open(self.blob_file(digest), 'rb') as src:
+            data = zlib.decompress(src.read())
+        return np.lib.format.read_array(io.BytesIO(data), allow_pickle=False)
+
+    def save(self, run, param_files, metadata=None):
+        """Save the parameter files for a run, replacing any
+        existing run with the same name.
+
+        Parameters
+        ----------
+        run : str
+            Name of the run.
+        param_files : :class:`pyrms.param.paramFile`, list, dict or model
+            Parameter files for the run; a :class:`pyrms.prms.model`
+            instance saves all of the model's files. Files are keyed by
+            their paths relative to the folder that contains all of them
+            (just the file names, if they're in the same folder).
+        metadata : dict, optional
+            Additional information to save with the run
+            (must be JSON serializable).
+
+        Returns
+        -------
+        manifest : dict
+        """
+        if hasattr(param_files, 'files'):
+            param_files = param_files.files
+        if isinstance(param_files, paramFile):
+            param_files = [param_files]
+        if not isinstance(param_files, dict):
+            param_files = {pf.filename: pf for pf in param_files}
+        relpaths = get_relative_paths([str(key) for key in param_files])
+        files = {}
+        for relpath, (key, pf) in zip(relpaths, param_files.items()):
+            order = pf.param_order if len(pf.param_order) == len(pf.params) \
+                else sorted(pf.params)
+            params = []
+            for name in order:
+                p = pf.params[name]
+                params.append({'name': p.name,
+                               'dim_names': list(p.dim_names),
+                               'dtype': p.dtype,
+                               'nvalues': int(p.nvalues),
+                               'digest': self.put(p)})
+            files[relpath] = {
+                'comments': pf.comments,
+                'dimensions': {k: int(v) for k, v in pf.dimensions.items()},
+                'params': params}
+        manifest = {'run': run,
+                    'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                    'metadata': metadata if metadata is not None else {},
+                    'files': files}
+        text = json.dumps(manifest, indent=1).encode()
+        write_atomic(self.run_file(run), [text])
+        return manifest
+
+    def read_manifest(self, run):
+        """Read the manifest for a run."""
+        try:
+            with open(self.run_file(run)) as src:
+                return json.load(src)
+        except FileNotFoundError:
+            raise KeyError('No run {} in {}'.format(run, self.path))
+
+    def load(self, run, nrow=None, ncol=None):
+        """Load the parameter files for a run.
+
+        Parameters
+        ----------
+        run : str
+        nrow, ncol : int, optional
+            Parameters with nrow * ncol values are reshaped to 2D arrays.
+
+        Returns
+        -------
+        param_files : dict
+            :class:`pyrms.param.paramFile` instances, keyed by file name.
+        """
+        manifest = self.read_manifest(run)
+        param_files = {}
+        for filename, info in manifest['files'].items():
+            pf = paramFile(filename=filename, dimensions=info['dimensions'],
+                           nrow=nrow, ncol=ncol, comments=info['comments'])
+            for entry in info['params']:
+                p = param.from_array(entry['name'], self.get(entry['digest']),
+                                     dim_names=entry['dim_names'],
+                                     dtype=entry['dtype'], filename=filename,
+                                     nrow=nrow, ncol=ncol,
+                                     dimensions=pf.dimensions)
+                # the digest is known; saving the run again doesn't
+                # require rehashing unchanged parameters
+                p.digest = entry['digest']
+                pf.params[p.name] = p
+                pf.param_order.append(p.name)
+            param_files[filename] = pf
+        return param_files
+
+    def write(self, run, workspace, run_length=False, fmt=None):
+        """Rebuild the parameter files for a run.
+
+        Parameters
+        ----------
+        run : str
+        workspace : str
+            Folder for the parameter files.
+        run_length, fmt :
+            See :meth:`pyrms.param.paramFile.write`.
+
+        Returns
+        -------
+        filenames : list of str
+        """
+        os.makedirs(workspace, exist_ok=True)
+        filenames = []
+        for filename, pf in self.load(run).items():
+            dest = os.path.join(workspace, filename)
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            pf.write(dest, run_length=run_length, fmt=fmt)
+            filenames.append(dest)
+        return filenames
+
+    def remove(self, run):
+        """Remove a run from the store; its arrays are kept until
+        :meth:`prune` is called."""
+        os.remove(self.run_file(run))
+
+    def prune(self):
+        """Delete arrays that aren't used by any run.
+
+        Returns
+        -------
+        nremoved : int
+            Number of arrays that were deleted.
+        """
+        used = set()
+        for run in self.runs:
+            for info in self.read_manifest(run)['files'].values():
+                used.update(entry['digest'] for entry in info['params'])
+        nremoved = 0
+        for folder in os.scandir(self.blobs_path):
+            if not folder.is_dir():
+                continue
+            for entry in os.scandir(folder.path):
+                if entry.name.endswith('.npy.z') and \
+                        entry.name[:-6] not in used:
+                    os.remove(entry.path)
+                    nremoved += 1
+        return nremoved
+
+    @property
+    def summary(self):
+        """Files, number of parameters and metadata for each run."""
+        rows = []
+        for run in self.runs:
+            manifest = self.read_manifest(run)
+            rows.append({'run': run,
+                         'created': manifest['created'],
+                         'files': list(manifest['files']),
+                         'nparams': sum(len(info['params']) for info
+                                        in manifest['files'].values()),
+                         **manifest['metadata']})
+        return pd.DataFrame(rows)
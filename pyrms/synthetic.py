@@ -0,0 +1,280 @@
+"""
+Synthetic gridded PRMS models, for testing and benchmarking at scale.
+
+The model is a grid of square HRUs, with an elliptical basin of active
+HRUs (the rest are inactive), blocky land cover, a tilted and noisy
+land surface, monthly (nhru x nmonths) parameters and cascades that route
+each active HRU to its downslope neighbor(s). Parameters are written
+one at a time (and formatted in chunks), so that large models
+(10^7 HRUs) can be written without holding all of the arrays in memory.
+"""
+import os
+import numpy as np
+from pyrms.control import controlParam
+from pyrms.data import dataFile
+from pyrms.param import write_values
+from pyrms.utils import lazy_import
+
+pd = lazy_import('pandas')
+
+
+def get_grid_shape(nhru):
+    """Get an (nrow, ncol) grid shape with about nhru cells,
+    and 4 rows for every 5 columns."""
+    nrow = max(int(round(np.sqrt(nhru * 0.8))), 1)
+    ncol = max(int(round(nhru / nrow)), 1)
+    return nrow, ncol
+
+
+def get_xy_points(nrow, ncol, cellsize=100., xul=0., yul=None):
+    """Get the x, y coordinates of the grid cell centers, in row-major
+    (PRMS HRU) order, as an (nrow * ncol, 2) array."""
+    if yul is None:
+        yul = nrow * cellsize
+    x = xul + (np.arange(ncol) + 0.5) * cellsize
+    y = yul - (np.arange(nrow) + 0.5) * cellsize
+    xx, yy = np.meshgrid(x, y)
+    return np.column_stack([xx.ravel(), yy.ravel()])
+
+
+def get_basin(nrow, ncol):
+    """Get a boolean (nrow, ncol) mask of the active HRUs
+    (an ellipse filling most of the grid)."""
+    i = (np.arange(nrow) + 0.5) / nrow - 0.5
+    j = (np.arange(ncol) + 0.5) / ncol - 0.5
+    return (i[:, None] / 0.48)**2 + (j[None, :] / 0.48)**2 <= 1
+
+
+def get_cascades(active, elevation):
+    """Route each active HRU to its downslope east and/or south
+    neighbors, or to an outlet (down id of 0) at the edge of the basin.
+    Where both neighbors are downslope, every third HRU is split between
+    them (70% east, 30% south).
+
+    Returns
+    -------
+    up_id, down_id : 1D numpy arrays
+        1-based HRU numbers.
+    pct_up : 1D numpy array
+        Fraction of the upslope HRU draining to each cascade.
+    """
+    nrow, ncol = active.shape
+    ids = np.arange(1, active.size + 1).reshape(active.shape)
+    east = np.zeros_like(active)
+    east[:, :-1] = active[:, 1:] & (elevation[:, 1:] <= elevation[:, :-1])
+    south = np.zeros_like(active)
+    south[:-1] = active[1:] & (elevation[1:] <= elevation[:-1])
+    east &= active
+    south &= active
+    split = east & south & (ids % 3 == 0)
+    east_only = east & ~split
+    south_only = south & ~east & ~split
+    outlet = active & ~east & ~south
+    up_id = np.concatenate([ids[east_only], ids[south_only], ids[outlet],
+                            ids[split], ids[split]])
+    down_id = np.concatenate([ids[east_only] + 1, ids[south_only] + ncol,
+                              np.zeros(outlet.sum(), dtype=int),
+                              ids[split] + 1, ids[split] + ncol])
+    pct_up = np.concatenate([np.ones(east_only.sum() + south_only.sum() +
+                                     outlet.sum()),
+                             np.full(split.sum(), 0.7),
+                             np.full(split.sum(), 0.3)])
+    order = np.argsort(up_id, kind='stable')
+    return up_id[order], down_id[order], pct_up[order]
+
+
+def write_params(filename, params, dimensions=None, sizes=None,
+                 run_length=True,
+                 comments='Synthetic parameter file created by pyrms\n'):
+    """Write a parameter file.
+
+    Parameters
+    ----------
+    filename : str
+    params : iterable
+        (name, dim_names, values) for each parameter, where values is an
+        array, or an iterator of arrays (e.g. one per month), so that
+        parameters can be created as they are written.
+    dimensions : dict, optional
+        Dimensions to write at the top of the file.
+    sizes : dict, optional
+        Sizes of the dimensions of the parameters, for parameters with
+        values given as iterators.
+    run_length : bool
+        Option to write runs of repeated values in the N*value format.
+        By default, True.
+    comments : str
+    """
+    with open(filename, 'w') as dest:
+        dest.write(comments)
+        if dimensions is not None:
+            dest.write('** Dimensions **\n')
+            for name, value in dimensions.items():
+                dest.write('####\n{}\n{:d}\n'.format(name, value))
+        for i, (name, dim_names, values) in enumerate(params):
+            if i == 0 and dimensions is not None:
+                dest.write('** Parameters **\n')
+            if isinstance(values, np.ndarray):
+                nvalues = values.size
+                values = [values]
+            else:
+                nvalues = int(np.prod([sizes[dim] for dim in dim_names]))
+            dest.write('####\n{}\n{:d}\n'.format(name, len(dim_names)))
+            for dim in dim_names:
+                dest.write('{}\n'.format(dim))
+            dtype = None
+            for chunk in values:
+                if dtype is None:
+                    dtype = 2 if chunk.dtype.kind == 'f' else 1
+                    dest.write('{:d}\n{:d}\n'.format(nvalues, dtype))
+                write_values(dest, chunk, run_length=run_length)
+
+
+def write_synthetic_model(model_ws, nrow=None, ncol=None, nhru=None,
+                          nmonths=12, ndays=365, seed=0, cellsize=100.):
+    """Write a synthetic gridded PRMS model.
+
+    Parameters
+    ----------
+    model_ws : str
+        Folder for the model files (created if it doesn't exist).
+    nrow, ncol : int, optional
+        Grid shape.
+    nhru : int, optional
+        Approximate number of HRUs, if nrow and ncol aren't given;
+        see :func:`get_grid_shape`.
+    nmonths : int
+        By default, 12.
+    ndays : int
+        Number of days in the data file (and simulation).
+        By default, 365.
+    seed : int
+        Seed for the random values. By default, 0.
+    cellsize : float
+        Width of the grid cells, in meters. By default, 100.
+
+    Returns
+    -------
+    control_file : str
+        Path to the control file. The model consists of the control file,
+        a data file, and dimensions.param, params.param
+        and cascades.param.
+    """
+    if nrow is None or ncol is None:
+        if nhru is None:
+            raise ValueError('Specify nrow and ncol, or nhru')
+        nrow, ncol = get_grid_shape(nhru)
+    nhru = nrow * ncol
+    os.makedirs(model_ws, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    active = get_basin(nrow, ncol)
+
+    # land surface sloping down to the southeast, in meters
+    i, j = np.meshgrid(np.arange(nrow), np.arange(ncol), indexing='ij')
+    elevation = 2000. - (i + j) * cellsize * 0.02 + \
+        rng.normal(0, 0.5, size=(nrow, ncol))
+    elevation = np.round(elevation, 1)
+
+    # land cover in 8 x 8 HRU blocks
+    blocks = rng.integers(0, 5, size=(nrow // 8 + 1, ncol // 8 + 1))
+    cov_type = np.repeat(np.repeat(blocks, 8, axis=0), 8, axis=1)[:nrow, :ncol]
+    cov_type = np.where(active, cov_type, 0)
+    up_id, down_id, pct_up = get_cascades(active, elevation)
+
+    dimensions = {'nhru': nhru, 'nssr': nhru, 'ngw': nhru,
+                  'nmonths': nmonths, 'one': 1, 'nobs': 1,
+                  'ntemp': 1, 'nrain': 1, 'ncascade': up_id.size}
+    write_params(os.path.join(model_ws, 'dimensions.param'), [],
+                 dimensions=dimensions,
+                 comments='Synthetic dimensions created by pyrms\n')
+
+    def monthly(low, high, decimals):
+        # a value for each month, with HRU-to-HRU variation
+        # for the active HRUs; created one month at a time
+        for value in np.linspace(low, high, nmonths):
+            values = np.full(nhru, value)
+            if decimals is not None:
+                values += np.where(active.ravel(), rng.normal(0, 0.1, nhru), 0.)
+                values = np.round(values, decimals)
+            yield values
+
+    def get_params():
+        covden = np.array([0., 0.2, 0.5, 0.7, 0.9])
+        yield 'hru_type', ['nhru'], active.ravel().astype(int)
+        yield 'cov_type', ['nhru'], cov_type.ravel()
+        yield 'covden_sum', ['nhru'], covden[cov_type.ravel()]
+        yield 'covden_win', ['nhru'], covden[cov_type.ravel()] * 0.5
+        yield 'hru_area', ['nhru'], np.full(nhru, cellsize**2 / 4046.8564224)
+        yield 'hru_elev', ['nhru'], elevation.ravel()
+        yield 'hru_slope', ['nhru'], np.round(rng.uniform(0, 0.3, nhru), 3)
+        yield 'hru_lat', ['nhru'], np.round(np.repeat(np.linspace(
+            44.5, 44.5 - nrow * cellsize / 111000., nrow), ncol), 6)
+        yield 'soil_moist_max', ['nhru'], np.round(
+            np.where(active.ravel(), rng.gamma(4., 1.5, nhru), 0.), 2)
+        yield 'hru_id', ['nhru'], np.arange(1, nhru + 1)
+        yield 'tmax_allrain', ['nmonths'], np.linspace(35., 45., nmonths)
+        yield 'radmax', ['one'], np.array([0.8])
+        yield 'jh_coef', ['nhru', 'nmonths'], monthly(0.012, 0.016, None)
+        yield 'tmax_adj', ['nhru', 'nmonths'], monthly(-1., 1., 2)
+        yield 'rain_adj', ['nhru', 'nmonths'], monthly(0.9, 1.1, 3)
+
+    write_params(os.path.join(model_ws, 'params.param'), get_params(),
+                 sizes=dimensions)
+    write_params(os.path.join(model_ws, 'cascades.param'),
+                 [('hru_up_id', ['ncascade'], up_id),
+                  ('hru_down_id', ['ncascade'], down_id),
+                  ('hru_strmseg_down_id', ['ncascade'], np.zeros_like(up_id)),
+                  ('hru_pct_up', ['ncascade'], pct_up)],
+                 run_length=False,
+                 comments='Synthetic cascades created by pyrms\n')
+
+    # climate data for one station
+    dates = pd.date_range('2000-01-01', periods=ndays)
+    doy = dates.dayofyear.values
+    tmax = np.round(60 + 25 * np.sin((doy - 100) / 365 * 2 * np.pi) +
+                    rng.normal(0, 5, ndays), 1)
+    tmin = np.round(tmax - rng.uniform(10, 25, ndays), 1)
+    precip = np.round(np.where(rng.random(ndays) < 0.3,
+                               rng.gamma(1., 0.3, ndays), 0.), 2)
+    data = dataFile(variables={'tmax': 1, 'tmin': 1, 'precip': 1},
+                    dates=dates,
+                    values=np.column_stack([tmax, tmin, precip]),
+                    comments='Synthetic data file created by pyrms\n')
+    data.write(os.path.join(model_ws, 'synthetic.data'))
+
+    start, end = dates[0], dates[-1]
+    control = [
+        controlParam('param_file', ['dimensions.param', 'params.param',
+                                    'cascades.param'], 4),
+        controlParam('data_file', 'synthetic.data', 4),
+        controlParam('start_time', [start.year, start.month, start.day,
+                                    0, 0, 0], 1),
+        controlParam('end_time', [end.year, end.month, end.day, 0, 0, 0], 1),
+        controlParam('model_mode', 'PRMS', 4),
+        controlParam('executable_model', 'prms', 4),
+        controlParam('et_module', 'potet_jh', 4),
+        controlParam('precip_module', 'precip_1sta', 4),
+        controlParam('temp_module', 'temp_1sta', 4),
+        controlParam('solrad_module', 'ddsolrad', 4),
+        controlParam('srunoff_module', 'srunoff_smidx', 4),
+        controlParam('strmflow_module', 'strmflow', 4),
+        controlParam('transp_module', 'transp_tindex', 4),
+        controlParam('cascade_flag', 1, 1),
+        controlParam('model_output_file', 'output/prms.out', 4),
+        controlParam('statsON_OFF', 1, 1),
+        controlParam('nstatVars', 2, 1),
+        controlParam('statVar_names', ['basin_ppt', 'basin_actet'], 4),
+        controlParam('statVar_element', [1, 1], 1),
+        controlParam('stat_var_file', 'output/prms.statvar', 4),
+        controlParam('aniOutON_OFF', 1, 1),
+        controlParam('naniOutVars', 1, 1),
+        controlParam('aniOutVar_names', ['hru_actet'], 4),
+        controlParam('ani_output_file', 'output/prms.ani', 4),
+        controlParam('initial_deltat', 24.0, 2),
+    ]
+    control_file = os.path.join(model_ws, 'synthetic.control')
+    with open(control_file, 'w') as dest:
+        dest.write('Synthetic control file created by pyrms\n')
+        for p in control:
+            p.write(dest)
+    return control_file
@@ -0,0 +1,89 @@
+"""
+Miscellaneous utilities.
+"""
+import sys
+import importlib
+import importlib.util
+
+
+class lazyModule:
+    """Stand-in for a module, which is imported the first time
+    one of its attributes is used; see :func:`lazy_import`."""
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+
+    def __getattr__(self, attr):
+        value = getattr(importlib.import_module(self._name), attr)
+        # later lookups of the attribute don't go through __getattr__
+        self.__dict__[attr] = value
+        return value
+
+    def __repr__(self):
+        return "<lazy module '{}'>".format(self._name)
+
+
+def lazy_import(name, optional=False):
+    """Defer importing a module until it's used, to keep ``import pyrms``
+    fast for code that doesn't need it.
+
+    Parameters
+    ----------
+    name : str
+        Module name, e.g. 'pandas' or 'shapely.geometry'.
+    optional : bool
+        If True, return False (instead of a stand-in that raises
+        ImportError when it's used) if the module isn't installed.
+        Only the top-level package is looked for; nothing is imported.
+
+    Returns
+    -------
+    module : module, :class:`lazyModule` or False
+        The module itself, if it has already been imported.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    if optional and importlib.util.find_spec(name.split('.')[0]) is None:
+        return False
+    return lazyModule(name)
+
+
+
+class versionedDict(dict):
+    """dict that counts changes to its contents, so that objects derived
+    from it (such as indices) can be cached until it changes."""
+    version = 0
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.version += 1
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.version += 1
+
+    def clear(self):
+        super().clear()
+        self.version += 1
+
+    def pop(self, *args):
+        value = super().pop(*args)
+        self.version += 1
+        return value
+
+    def popitem(self):
+        item = super().popitem()
+        self.version += 1
+        return item
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self.version += 1
+        return super().setdefault(key, default)
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self.version += 1
+
+    def copy(self):
+        return versionedDict(self)
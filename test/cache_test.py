@@ -0,0 +1,122 @@
+import os
+import numpy as np
+import pyrms.cache
+from pyrms import paramFile
+from pyrms.cache import paramCache, evict
+from param_io_test import write_param_file
+
+
+def test_cache(tmp_path, cache_dir):
+    filename = write_param_file(tmp_path / 'test.param')
+    pf = paramFile.load(filename, nrow=2, ncol=3)
+    cache = paramCache(filename)
+    assert os.path.exists(cache.header_file)
+    assert os.path.exists(cache.array_file('hru_type'))
+
+    # arrays are memory-mapped from the cache on subsequent loads
+    pf2 = paramFile.load(filename, nrow=2, ncol=3)
+    assert pf2.comments == pf.comments
+    assert pf2.dimensions == pf.dimensions
+    assert pf2.param_order == pf.param_order
+    for name, p in pf.params.items():
+        p2 = pf2.params[name]
+        assert p2.array.dtype == p.array.dtype
+        assert np.array_equal(p2.array, p.array)
+        assert p2.array.base is not None
+
+    # in-place changes don't alter the cache
+    pf2.params['hru_type'].array[0, 0] = 9
+    pf3 = paramFile.load(filename, nrow=2, ncol=3)
+    assert pf3.params['hru_type'].array[0, 0] == 0
+
+    # touching the file doesn't invalidate the cache
+    st = os.stat(filename)
+    os.utime(filename, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert cache.read_header((st.st_size, st.st_mtime_ns + 10**9)) is not None
+
+    # changing it does
+    with open(filename, 'a') as dest:
+        dest.write('####\nextra\n1\none\n1\n1\n1\n')
+    pf4 = paramFile.load(filename)
+    assert pf4.params['extra'].array.tolist() == [1]
+
+
+def test_no_cache(tmp_path, cache_dir):
+    filename = write_param_file(tmp_path / 'test.param')
+    paramFile.load(filename, cache=False)
+    assert not os.path.exists(cache_dir)
+
+
+def test_lazy_cache(tmp_path):
+    filename = write_param_file(tmp_path / 'test.param')
+    cache_dir = tmp_path / 'lazy_cache'
+    cache = paramCache(filename, cache_dir=cache_dir)
+    # lazy loads, and loads of some parameters, only read from the cache
+    pf = paramFile.load(filename, lazy=True, cache_dir=cache_dir)
+    assert np.allclose(pf.params['jh_coef'].array, 0.014)
+    paramFile.load(filename, load_only=['jh_coef'], cache_dir=cache_dir)
+    assert not os.path.exists(cache.path)
+
+    # entries are written by full loads
+    paramFile.load(filename, cache_dir=cache_dir)
+    assert os.path.exists(cache.array_file('jh_coef'))
+    os.remove(cache.array_file('jh_coef'))
+    pf = paramFile.load(filename, lazy=True, cache_dir=cache_dir)
+    assert pf.params['hru_type'].array.tolist() == [0, 1, 1, 2, 1, 0]
+    assert pf.params['hru_type'].block.source == 'cache'
+    assert np.allclose(pf.params['jh_coef'].array, 0.014)
+    assert not os.path.exists(cache.array_file('jh_coef'))
+
+
+def test_cache_max_size(tmp_path, cache_dir):
+    filename = write_param_file(tmp_path / 'test.param')
+    paramFile.load(filename, cache_max_size=0)
+    # the entry doesn't fit
+    assert os.listdir(cache_dir) == []
+
+
+def test_evict(tmp_path, cache_dir):
+    for i in range(3):
+        filename = write_param_file(tmp_path / 'test{}.param'.format(i))
+        paramFile.load(filename)
+        header = paramCache(filename).header_file
+        os.utime(header, (i, i))
+    entries = os.listdir(cache_dir)
+    assert len(entries) == 3
+    entry_size = sum(f.stat().st_size for f in os.scandir(cache_dir / entries[0]))
+    evict(max_size=entry_size * 2.5)
+    assert len(os.listdir(cache_dir)) == 2
+    # the least recently used entry was removed
+    assert not os.path.exists(paramCache(str(tmp_path / 'test0.param')).path)
+
+
+def test_evict_arrays(tmp_path, cache_dir, monkeypatch):
+    filename = write_param_file(tmp_path / 'test0.param')
+    paramFile.load(filename)
+    entry_size = sum(f.stat().st_size
+                     for f in os.scandir(paramCache(filename).path))
+    header_size = os.path.getsize(paramCache(filename).header_file)
+    os.utime(paramCache(filename).header_file, (0, 0))
+    # room for the header of a second entry, but not its arrays
+    monkeypatch.setattr(pyrms.cache, 'default_max_size',
+                        entry_size + header_size * 1.5)
+    filename = write_param_file(tmp_path / 'test1.param')
+    paramFile.load(filename)
+    assert os.listdir(cache_dir) == [os.path.split(paramCache(filename).path)[1]]
+
+
+def test_replace_entry(tmp_path, cache_dir):
+    filename = write_param_file(tmp_path / 'test.param')
+    pf = paramFile.load(filename, nrow=2, ncol=3)
+    pf2 = paramFile.load(filename, nrow=2, ncol=3)
+    hru_type = pf2.params['hru_type'].array
+    with open(filename, 'a') as dest:
+        dest.write('####\nextra\n1\none\n1\n1\n1\n')
+    pf3 = paramFile.load(filename, nrow=2, ncol=3)
+    assert pf3.params['extra'].array.tolist() == [1]
+    # the entry was replaced, without leaving temporary folders
+    assert len(os.listdir(cache_dir)) == 1
+    with open(paramCache(filename).header_file) as src:
+        assert 'extra' in src.read()
+    # arrays mapped from the old entry are still readable
+    assert np.array_equal(hru_type, pf.params['hru_type'].array)
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+from pyrms import cascadeParamFile
+import pyrms.cascades
+from model_test import cascades_text
+
+
+@pytest.fixture
+def cascades(tmp_path):
+    filename = tmp_path / 'cascades.param'
+    filename.write_text(cascades_text)
+    # cell centers for a 2 row x 3 column grid with 100 m spacing
+    x, y = np.meshgrid(np.arange(3) * 100 + 50., np.arange(2)[::-1] * 100 + 50.)
+    xy_points = np.array(list(zip(x.ravel(), y.ravel())))
+    return cascadeParamFile.load(str(filename), xy_points=xy_points)
+
+
+def test_cascades_dataframe(cascades):
+    pytest.importorskip('shapely')
+    df = cascades.df
+    assert df.hru_up_id.tolist() == [1, 2, 3]
+    assert df.hru_down_id.tolist() == [2, 3, 6]
+    # same arrows as make_arrow
+    for d, u, line in zip(df.hru_down_id, df.hru_up_id, df.geometry):
+        expected = cascades.make_arrow(d, u)
+        assert line.equals(expected)
+    assert df.geometry[0].coords[:] == [(75., 150.), (125., 150.)]
+
+    df2 = cascades.get_cascades_dataframe(geometry=False)
+    assert 'geometry' not in df2.columns
+    assert df2[['x1', 'y1', 'x2', 'y2']].values[2].tolist() == [250., 125., 250., 75.]
+
+
+def test_outlets_dataframe(cascades):
+    pytest.importorskip('shapely')
+    df = cascades.outlets
+    assert df.hru_up_id.tolist() == [4]
+    assert df.geometry[0].coords[:] == [(50., 50.)]
+    df2 = cascades.get_outlets_dataframe(geometry=False)
+    assert df2[['x', 'y']].values.tolist() == [[50., 50.]]
+
+
+def test_without_shapely(cascades, monkeypatch):
+    monkeypatch.setattr(pyrms.cascades, 'shapely', False)
+    monkeypatch.setattr(pyrms.cascades, 'shapely_geometry', False)
+    with pytest.raises(ImportError, match='geometry=False'):
+        cascades.df
+    with pytest.raises(ImportError, match='geometry=False'):
+        cascades.outlets
+    assert len(cascades.get_cascades_dataframe(geometry=False)) == 3
+    assert len(cascades.get_outlets_dataframe(geometry=False)) == 1
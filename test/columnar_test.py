@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+from pyrms import cascadeParamFile
+from pyrms.columnar import read_table, to_wkb, write_table
+from model_test import cascades_text
+
+pa = pytest.importorskip('pyarrow')
+
+
+@pytest.fixture
+def cascades(tmp_path):
+    filename = tmp_path / 'cascades.param'
+    filename.write_text(cascades_text)
+    x, y = np.meshgrid(np.arange(3) * 100 + 50., np.arange(2)[::-1] * 100 + 50.)
+    xy_points = np.array(list(zip(x.ravel(), y.ravel())))
+    return cascadeParamFile.load(str(filename), xy_points=xy_points)
+
+
+def test_to_wkb():
+    shapely = pytest.importorskip('shapely')
+    start = np.array([[0., 1.], [2.5, -3.]])
+    end = np.array([[4., 5.], [6., 7.]])
+    lines = to_wkb([start, end]).to_pylist()
+    expected = shapely.to_wkb(shapely.linestrings(np.stack([start, end], axis=1)),
+                              byte_order=1)
+    assert lines == expected.tolist()
+    points = to_wkb([start]).to_pylist()
+    assert points == shapely.to_wkb(shapely.points(start), byte_order=1).tolist()
+
+
+@pytest.mark.parametrize('extension', ['parquet', 'feather'])
+def test_write_cascades_table(cascades, tmp_path, extension):
+    filename = tmp_path / 'cascades.{}'.format(extension)
+    cascades.write_cascades_table(filename, chunksize=2)
+    df = read_table(filename)
+    assert df.hru_up_id.tolist() == [1, 2, 3]
+    assert df.hru_down_id.tolist() == [2, 3, 6]
+    if 'shapely' in type(df.geometry[0]).__module__:
+        expected = cascades.df
+        assert all(a.equals(b) for a, b in zip(df.geometry, expected.geometry))
+
+    # partial reads
+    df = read_table(filename, id_range=(2, 3))
+    assert df.hru_up_id.tolist() == [2, 3]
+    # second arrow is from (150, 150) to (250, 150); the third goes down
+    df = read_table(filename, bbox=(160, 140, 240, 160))
+    assert df.hru_up_id.tolist() == [2]
+
+    cascades.write_cascades_table(filename, geometry='xy')
+    df = read_table(filename, columns=['hru_up_id', 'x1', 'y1', 'x2', 'y2'])
+    assert df[['x1', 'y1', 'x2', 'y2']].values[2].tolist() == [250., 125., 250., 75.]
+
+
+def test_write_outlets_table(cascades, tmp_path):
+    filename = tmp_path / 'outlets.parquet'
+    cascades.write_outlets_table(filename, geometry='xy')
+    df = read_table(filename)
+    assert df.hru_up_id.tolist() == [4]
+    assert df[['x', 'y']].values.tolist() == [[50., 50.]]
+    assert len(read_table(filename, bbox=(100, 100, 200, 200))) == 0
+
+
+def test_row_groups(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    n = 1000
+    ids = np.arange(1, n + 1)
+    xy = np.stack([ids * 1., np.zeros(n)], axis=1)
+    filename = tmp_path / 'points.parquet'
+    write_table(filename, {'id': ids}, [xy], id_column='id', chunksize=100)
+    assert pq.ParquetFile(filename).metadata.num_row_groups == 10
+    df = read_table(filename, bbox=(250, -1, 349, 1))
+    assert df.id.tolist() == list(range(250, 350))
+    assert read_table(filename, id_range=(990, 2000)).id.tolist() == \
+        list(range(990, 1001))
@@ -0,0 +1,10 @@
+import pytest
+import pyrms.cache
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """Keep the parameter file cache out of the user's home directory."""
+    cache_dir = tmp_path / 'pyrms_cache'
+    monkeypatch.setattr(pyrms.cache, 'default_cache_dir', str(cache_dir))
+    return cache_dir
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pyrms import controlFile
+from pyrms.data import dataFile
+
+
+data_text = """Test data file
+// two temperature stations and one precip station
+tmax 2
+tmin 2
+precip 1
+########################################
+2000 1 1 0 0 0 30.5 31 10 11.5 0.0
+2000 1 2 0 0 0 32 33.25 12 13 0.15
+2000 1 3 0 0 0 -999 34 14 15 1.2
+"""
+
+
+def test_load(tmp_path):
+    filename = tmp_path / 'test.data'
+    filename.write_text(data_text)
+    data = dataFile.load(str(filename))
+    assert data.comments == 'Test data file\n' \
+                            '// two temperature stations and one precip station\n'
+    assert data.variables == {'tmax': 2, 'tmin': 2, 'precip': 1}
+    assert data.dates.tolist() == pd.date_range('2000-01-01', periods=3).tolist()
+    assert data.values.shape == (3, 5)
+    assert data.get_variable('tmin').tolist() == [[10, 11.5], [12, 13], [14, 15]]
+    assert data.df.precip_1.tolist() == [0, 0.15, 1.2]
+    with pytest.raises(KeyError):
+        data.get_variable('runoff')
+
+
+def test_write(tmp_path):
+    filename = tmp_path / 'test.data'
+    filename.write_text(data_text)
+    data = dataFile.load(str(filename))
+    data.write(str(tmp_path / 'new.data'))
+    data2 = dataFile.load(str(tmp_path / 'new.data'))
+    assert data2.comments == data.comments
+    assert data2.variables == data.variables
+    assert data2.dates.equals(data.dates)
+    assert np.array_equal(data2.values, data.values)
+
+    # new data, with nans written as the missing value
+    dates = pd.date_range('2000-01-01', periods=1000)
+    values = np.random.randn(1000, 3)
+    values[10, 1] = np.nan
+    data = dataFile(variables={'tmax': 1, 'tmin': 1, 'precip': 1},
+                    dates=dates, values=values)
+    data.write(str(tmp_path / 'random.data'), chunksize=100)
+    data2 = dataFile.load(str(tmp_path / 'random.data'))
+    assert data2.values[10, 1] == -999
+    values[10, 1] = -999
+    assert np.array_equal(data2.values, values)
+
+    data.write(str(tmp_path / 'fmt.data'), fmt='%.2f')
+    lines = (tmp_path / 'fmt.data').read_text().splitlines()
+    assert lines[5] == '2000 1 1 0 0 0 ' + ' '.join('%.2f' % v for v in values[0])
+
+
+def test_control_data_file(tmp_path):
+    (tmp_path / 'test.data').write_text(data_text)
+    (tmp_path / 'test.control').write_text(
+        'Test control file\n####\ndata_file\n1\n4\ntest.data\n')
+    ctrl = controlFile.load(str(tmp_path / 'test.control'))
+    assert ctrl.get_data_file().variables == {'tmax': 2, 'tmin': 2, 'precip': 1}
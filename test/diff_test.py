@@ -0,0 +1,74 @@
+import numpy as np
+from pyrms import model, paramFile, param
+from param_io_test import write_param_file
+from model_test import write_model
+
+
+def test_digest(tmp_path):
+    filename = write_param_file(tmp_path / 'test.param')
+    pf = paramFile.load(filename)
+    lazy = paramFile.load(filename, lazy=True)
+    # digests are the same whether or not the values have been read;
+    # lazy parameters use the digests saved in the cache
+    for name, p in pf.params.items():
+        assert lazy.params[name].digest == p.digest
+        assert not lazy.params[name].loaded
+    covden = pf.params['covden_sum']
+    digest = covden.digest
+    assert covden.digest is digest  # cached
+
+    # same values with other dimensions or data types
+    p = param('covden_sum', covden.array.copy(), dim_names=['nhru'], dtype=2)
+    assert p.digest == digest
+    p.dim_names = ['nssr']
+    assert p.digest != digest
+    assert param('x', [1, 2]).digest != param('x', [1., 2.]).digest
+
+    # in-place changes are included
+    covden.array[0] = 0.3
+    assert covden.digest != digest
+    covden.array[0] = 0.5
+    assert covden.digest == digest
+
+
+def test_param_file_diff(tmp_path):
+    filename = write_param_file(tmp_path / 'test.param')
+    pf = paramFile.load(filename)
+    assert len(pf.diff(filename)) == 0
+    assert pf.diff(filename, include_unchanged=True).status.tolist() == \
+        ['unchanged'] * 4
+    # only parameters with different digests are read
+    lazy = paramFile.load(filename, lazy=True)
+    lazy.params['jh_coef'].array = np.zeros(72)
+    assert pf.diff(lazy).name.tolist() == ['jh_coef']
+    assert [p.loaded for p in lazy.params.values()] == [False, False, True, False]
+
+    pf2 = paramFile.load(filename)
+    pf2.params['covden_sum'].array[[1, 4]] = [0.75, 0.]
+    pf2.params['hru_type'].array = np.arange(3)
+    pf2.params['model_name'].array[1] = 'changed'
+    del pf2.params['jh_coef']
+    pf2.params['new'] = param('new', [1])
+    df = pf.diff(pf2).set_index('name')
+    assert df.status.to_dict() == {'hru_type': 'dimensions',
+                                   'covden_sum': 'modified',
+                                   'jh_coef': 'removed',
+                                   'model_name': 'modified',
+                                   'new': 'added'}
+    assert df.loc['covden_sum', 'nchanged'] == 2
+    assert df.loc['covden_sum', 'changed'].tolist() == [1, 4]
+    assert np.isclose(df.loc['covden_sum', 'max_abs_diff'], 0.25)
+    assert df.loc['model_name', 'changed'].tolist() == [1]
+    assert np.isnan(df.loc['model_name', 'max_abs_diff'])
+
+
+def test_model_diff(tmp_path):
+    control_file = write_model(tmp_path)
+    m = model.load(control_file, nrow=2, ncol=3)
+    m2 = model.load(control_file, nrow=2, ncol=3)
+    assert len(m.diff(m2)) == 0
+    m2.params['jh_coef'].array = m2.params['jh_coef'].array * 2
+    df = m.diff(m2)
+    assert df.name.tolist() == ['jh_coef']
+    assert df.file.tolist() == [tmp_path / 'test.param']
+    assert df.nchanged.tolist() == [72]
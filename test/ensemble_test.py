@@ -0,0 +1,97 @@
+import os
+import numpy as np
+import pytest
+from pyrms import model, paramFile
+from pyrms.ensemble import parameterEnsemble
+from model_test import write_model
+
+
+@pytest.fixture
+def m(tmp_path):
+    (tmp_path / 'model').mkdir()
+    return model.load(write_model(tmp_path / 'model'))
+
+
+def test_perturb(m):
+    ens = parameterEnsemble(m, 3)
+    assert ens.names == ['member000', 'member001', 'member002']
+    covden_sum = m.params['covden_sum'].array.ravel()
+    ens.multiply('covden_sum', [1, 2, 3])
+    ens.add('covden_sum', 1, mask=m.get_active(6))
+    expected = covden_sum * np.array([1, 2, 3])[:, None] + m.get_active(6)
+    assert np.allclose(ens['covden_sum'], expected)
+    # model is unchanged
+    assert np.array_equal(m.params['covden_sum'].array.ravel(), covden_sum)
+    assert not m.params['covden_sum'].modified
+
+    samples = np.arange(18).reshape(3, 6) + 0.6
+    ens.set('hru_type', samples)
+    assert ens.get_values('hru_type', 1).tolist() == [7, 8, 9, 10, 11, 12]
+    assert ens.get_values('hru_type', 1).dtype == m.params['hru_type'].array.dtype
+    with pytest.raises(ValueError):
+        ens.multiply('model_name', 2)
+
+
+@pytest.mark.parametrize('link', ['hardlink', 'symlink'])
+def test_write(m, tmp_path, link):
+    ens = parameterEnsemble(m, 4)
+    ens.multiply('covden_sum', np.arange(4))
+    summary = ens.write(str(tmp_path / 'ensemble'), link=link)
+    assert len(summary) == 4
+    model_ws = tmp_path / 'model'
+    for i, member_ws in enumerate(summary.workspace):
+        assert sorted(os.listdir(member_ws)) == ['cascades.param',
+                                                 'dimensions.param', 'test.param']
+        # only the file with perturbed parameters is written
+        assert summary.written[i] == [os.path.join(member_ws, 'test.param')]
+        pf = paramFile.load(os.path.join(member_ws, 'test.param'))
+        assert np.allclose(pf.params['covden_sum'].array,
+                           m.params['covden_sum'].array * i)
+        # unperturbed parameters are copied verbatim
+        assert '72*0.014' in open(os.path.join(member_ws, 'test.param')).read()
+        for filename in 'dimensions.param', 'cascades.param':
+            path = os.path.join(member_ws, filename)
+            if link == 'symlink':
+                assert os.path.realpath(path) == str(model_ws / filename)
+            else:
+                assert os.path.samefile(path, model_ws / filename)
+    # the model files aren't changed
+    assert paramFile.load(str(model_ws / 'test.param')).params['covden_sum'].array \
+        .tolist() == m.params['covden_sum'].array.tolist()
+
+    # files with unsaved changes are shared from a copy
+    m.params['hru_up_id'][0] = 2
+    summary = ens.write(str(tmp_path / 'ensemble'), members=[0], link=link)
+    path = os.path.join(summary.workspace[0], 'cascades.param')
+    assert os.path.samefile(path, tmp_path / 'ensemble' / 'shared' / 'cascades.param')
+    assert paramFile.load(path).params['hru_up_id'].array[0] == 2
+
+
+def test_write_layout(tmp_path):
+    model_ws = tmp_path / 'model'
+    model_ws.mkdir()
+    control_file = write_model(model_ws)
+    # parameter files with the same names, in different folders
+    for folder in 'a', 'b':
+        (model_ws / folder).mkdir()
+    os.replace(model_ws / 'dimensions.param', model_ws / 'a' / 'test.param')
+    os.replace(model_ws / 'test.param', model_ws / 'b' / 'test.param')
+    text = open(control_file).read().replace(
+        'dimensions.param\ntest.param\n', 'a/test.param\nb/test.param\n')
+    open(control_file, 'w').write(text)
+    m = model.load(control_file)
+    ens = parameterEnsemble(m, 2)
+    ens.multiply('covden_sum', [1, 2])
+    summary = ens.write(str(tmp_path / 'ensemble'))
+    member_ws = summary.workspace[1]
+    assert summary.written[1] == [os.path.join(member_ws, 'b', 'test.param')]
+    assert os.path.samefile(os.path.join(member_ws, 'a', 'test.param'),
+                            model_ws / 'a' / 'test.param')
+
+    # rewriting a model file doesn't change the linked member files
+    pf = m.files[model_ws / 'a' / 'test.param']
+    pf.dimensions['nhru'] = 7
+    pf.write(incremental=False)
+    member_file = os.path.join(member_ws, 'a', 'test.param')
+    assert not os.path.samefile(member_file, model_ws / 'a' / 'test.param')
+    assert paramFile.load(member_file).dimensions['nhru'] == 6
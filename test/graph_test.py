@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+from pyrms import model
+from pyrms.graph import cascadeGraph
+from model_test import write_model
+
+
+def test_graph(tmp_path):
+    m = model.load(write_model(tmp_path), nrow=2, ncol=3)
+    graph = m.files[tmp_path / 'cascades.param'].graph
+    # 1 -> 2 -> 3 -> 6, 4 -> outlet; 5 isn't part of any cascade
+    assert graph.nnodes == 6
+    assert graph.nlinks == 3
+    assert not graph.has_cycles
+    order = graph.order.tolist()
+    assert sorted(order) == [1, 2, 3, 4, 5, 6]
+    assert order.index(1) < order.index(2) < order.index(3) < order.index(6)
+    assert graph.upstream(6).tolist() == [1, 2, 3]
+    assert graph.upstream([2, 4]).tolist() == [1]
+    assert graph.downstream(2).tolist() == [3, 6]
+    assert graph.outlets.tolist() == [6, 6, 6, 4, 5, 6]
+    accumulated = graph.accumulate(np.ones(6))
+    assert accumulated.tolist() == [1, 2, 3, 1, 1, 4]
+
+
+def test_weighted_accumulation():
+    # 1 splits 75/25 to 2 and 3, which both drain to 4
+    graph = cascadeGraph([1, 1, 2, 3, 4], [2, 3, 4, 4, 0],
+                         weights=[0.75, 0.25, 1, 1, 1])
+    assert graph.nnodes == 4
+    assert [l.tolist() for l in graph.levels] == [[1], [2, 3], [4]]
+    assert graph.accumulate([1, 1, 1, 1]).tolist() == [1, 1.75, 1.25, 4]
+    assert graph.accumulate([1, 1, 1, 1], weighted=False).tolist() == [1, 2, 2, 5]
+    # outlets follow the largest fraction
+    assert graph.outlets.tolist() == [4, 4, 4, 4]
+
+
+def test_cycles():
+    # 2 -> 3 -> 4 -> 2 is a cycle; 5 is downslope of it
+    graph = cascadeGraph([1, 2, 3, 4, 4], [2, 3, 4, 2, 5])
+    assert graph.has_cycles
+    assert graph.cycle_nodes.tolist() == [2, 3, 4]
+    assert graph.order.tolist() == [1]
+    with pytest.raises(ValueError):
+        graph.accumulate(np.ones(5))
+
+
+def test_long_chain():
+    n = 10000
+    up = np.arange(1, n + 1)
+    down = up + 1
+    down[-1] = 0
+    graph = cascadeGraph(up, down)
+    assert graph.order.tolist() == up.tolist()
+    assert graph.accumulate(np.ones(n))[-1] == n
+    assert np.all(graph.outlets == n)
+
+
+def test_gw_cascades(tmp_path):
+    from pyrms import cascadeParamFile
+    from model_test import cascades_text
+    (tmp_path / 'cascades.param').write_text(cascades_text)
+    cascadeParamFile.write_gwcascade_from_hrucascade(
+        str(tmp_path / 'cascades.param'), str(tmp_path / 'gw_cascade.param'))
+    pf = cascadeParamFile.load(str(tmp_path / 'gw_cascade.param'))
+    assert pf.gw
+    assert pf.didname == 'gw_down_id'
+    graph = pf.get_graph(nnodes=6)
+    assert graph.nlinks == 3
+    assert graph.outlets.tolist() == [6, 6, 6, 4, 5, 6]
+
+
+def test_deep_and_wide_graphs():
+    # chain of small levels between two wide levels; levels are sorted
+    # with numpy or one node at a time, and values are accumulated the
+    # same way either way
+    rng = np.random.default_rng(0)
+    n = 2000
+    wide = np.arange(1, 101)
+    chain = np.arange(101, n - 99)
+    up = np.concatenate([wide, chain, np.arange(n - 99, n + 1)])
+    down = np.concatenate([np.full(100, 101), chain + 1,
+                           rng.integers(0, 2, 100) * n])
+    down[-1] = 0
+    up = np.concatenate([up, [n - 100] * 99])
+    down = np.concatenate([down, np.arange(n - 99, n)])
+    weights = rng.random(len(up))
+    graph = cascadeGraph(up, down, weights=weights, nnodes=n)
+    levels = graph.levels
+    assert [len(l) for l in levels[:3]] == [100, 1, 1]
+    assert len(levels[-2]) == 99
+    order = np.empty(n, dtype=int)
+    order[graph.order - 1] = np.arange(n)
+    links = down > 0
+    assert np.all(order[up[links] - 1] < order[down[links] - 1])
+    values = rng.random(n)
+    by_level = graph._accumulate_levels(values.copy())
+    by_node = graph._accumulate_nodes(values.copy())
+    assert np.allclose(by_level, by_node)
+    assert np.allclose(graph.accumulate(values), by_node)
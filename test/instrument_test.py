@@ -0,0 +1,77 @@
+import logging
+from pyrms import controlFile, model, paramFile
+from pyrms.data import dataFile
+from pyrms.instrument import hooks, ioStats
+from param_io_test import write_param_file
+from model_test import write_model
+from data_test import data_text
+
+
+def test_param_file_stats(tmp_path):
+    filename = write_param_file(tmp_path / 'test.param')
+    with ioStats() as stats:
+        pf = paramFile.load(filename, nrow=2, ncol=3)
+    assert len(hooks) == 0
+    df = stats.df
+    params = df.loc[df.name.notnull()]
+    assert params.name.tolist() == pf.param_order
+    assert set(params.operation) == {'read'}
+    assert set(params.source) == {'file'}
+    assert (params.parse_time > 0).all()
+    assert (params.convert_time >= 0).all()
+    hru_type = params.loc[params.name == 'hru_type'].iloc[0]
+    assert hru_type['values'] == 6
+    assert hru_type['allocated'] == pf.params['hru_type'].array.nbytes
+    files = df.loc[df.name.isnull()]
+    assert files.operation.tolist() == ['index', 'read']
+
+    # second load, from the cache
+    stats.clear()
+    with stats:
+        pf = paramFile.load(filename, nrow=2, ncol=3)
+        pf.params['covden_sum'].array = pf.params['covden_sum'].array * 2
+        pf.write(str(tmp_path / 'test2.param'))
+    summary = stats.summary()
+    assert summary.loc[(filename, 'read'), 'nparams'] == len(pf.params)
+    assert set(stats.df.source.dropna()) == {'cache'}
+    # only the modified parameter is formatted; others are copied
+    written = stats.df.loc[stats.df.file == str(tmp_path / 'test2.param')]
+    assert written.loc[written.operation == 'write'].name.tolist()[:-1] == \
+        ['covden_sum']
+    assert (written.operation == 'copy').sum() == len(pf.params) - 1
+    assert written.iloc[-1]['bytes'] == (tmp_path / 'test2.param').stat().st_size
+
+    # nothing is reported once the stats are stopped
+    n = len(stats.events)
+    paramFile.load(filename)
+    assert len(stats.events) == n
+
+
+def test_model_stats(tmp_path):
+    control_file = write_model(tmp_path)
+    (tmp_path / 'test.data').write_text(data_text)
+    with ioStats() as stats:
+        m = model.load(control_file, nrow=2, ncol=3)
+        ctrl = controlFile.load(control_file)
+        ctrl.write(str(tmp_path / 'test2.control'))
+        data = dataFile.load(str(tmp_path / 'test.data'))
+        data.write(str(tmp_path / 'test2.data'))
+    df = stats.df
+    assert set(df.file) >= {str(f) for f in m.files}
+    control = df.loc[df.file == control_file]
+    # read by model.load, and by controlFile.load
+    assert control.operation.tolist() == ['read', 'read']
+    assert control.iloc[0]['values'] > 0
+    assert df.loc[df.file == str(tmp_path / 'test2.control')].operation.tolist() \
+        == ['write']
+    data_events = df.loc[df.file.str.endswith('.data')]
+    assert data_events.operation.tolist() == ['read', 'write']
+    assert data_events['values'].tolist() == [15, 15]
+
+
+def test_logging(tmp_path, caplog):
+    filename = write_param_file(tmp_path / 'test.param')
+    with caplog.at_level(logging.INFO, logger='pyrms'):
+        paramFile.load(filename, load_only=['jh_coef', 'not_a_param'])
+    assert [r.levelname for r in caplog.records] == ['WARNING']
+    assert 'not_a_param not found' in caplog.records[0].message
@@ -0,0 +1,54 @@
+import subprocess
+import sys
+import pytest
+import pyrms
+from pyrms.utils import lazy_import, lazyModule
+
+
+def imported_modules(code):
+    """Modules in sys.modules after running code in a new interpreter."""
+    code += '\nimport sys; print(" ".join(sys.modules))'
+    return set(subprocess.check_output([sys.executable, '-c', code],
+                                       text=True).split())
+
+
+def test_import_control_file():
+    modules = imported_modules('from pyrms import controlFile')
+    heavy = {'pandas', 'shapely', 'pyarrow', 'gisutils', 'matplotlib', 'pyproj'}
+    assert not heavy & modules
+    assert 'pyrms.control' in modules
+    assert 'pyrms.prms' not in modules
+
+    # none of the modules import pandas (or other heavy dependencies)
+    # until it's needed
+    modules = imported_modules('import pyrms.prms, pyrms.runner, pyrms.ensemble, '
+                               'pyrms.store, pyrms.synthetic, pyrms.shared, '
+                               'pyrms.output, pyrms.columnar, pyrms.cascades')
+    assert not heavy & modules
+
+    # pandas is imported when it's first needed
+    modules = imported_modules('from pyrms import paramFile\n'
+                               'paramFile().get_summary_dataframe()')
+    assert 'pandas' in modules
+
+
+def test_lazy_attributes():
+    from pyrms import model, param
+    from pyrms.prms import model as prms_model
+    from pyrms.param import param as param_class
+    assert model is prms_model
+    assert param is param_class
+    assert {'controlFile', 'cascadeParamFile', 'model'} <= set(dir(pyrms))
+    with pytest.raises(AttributeError):
+        pyrms.not_a_name
+
+
+def test_lazy_import():
+    assert lazy_import('sys') is sys
+    pandas = lazy_import('pandas')
+    assert pandas.DataFrame({'a': [1]}).a.sum() == 1
+    assert lazy_import('not_a_module', optional=True) is False
+    missing = lazy_import('not_a_module')
+    assert isinstance(missing, lazyModule)
+    with pytest.raises(ImportError):
+        missing.anything
@@ -0,0 +1,205 @@
+import numpy as np
+from pyrms import model, paramFile, param, cascadeParamFile
+from param_io_test import param_text
+
+
+control_text = """Test control file
+####
+param_file
+3
+4
+dimensions.param
+test.param
+cascades.param
+####
+start_time
+6
+1
+2000
+1
+1
+0
+0
+0
+"""
+
+dimensions_text = """Test dimensions
+** Dimensions **
+####
+nhru
+6
+####
+nmonths
+12
+####
+ncascade
+4
+"""
+
+cascades_text = """Test cascades
+** Parameters **
+####
+hru_up_id
+1
+ncascade
+4
+1
+1
+2
+3
+4
+####
+hru_down_id
+1
+ncascade
+4
+1
+2
+3
+6
+0
+####
+hru_pct_up
+1
+ncascade
+4
+2
+1.0
+1.0
+1.0
+1.0
+"""
+
+
+def write_model(model_ws):
+    """Write a small PRMS model with 6 HRUs (2 rows x 3 columns)."""
+    (model_ws / 'test.control').write_text(control_text)
+    (model_ws / 'dimensions.param').write_text(dimensions_text)
+    # parameters only; dimensions are in a separate file
+    (model_ws / 'test.param').write_text(param_text.replace(
+        param_text[param_text.index('** Dimensions'):
+                   param_text.index('** Parameters')], ''))
+    (model_ws / 'cascades.param').write_text(cascades_text)
+    return str(model_ws / 'test.control')
+
+
+def test_load(tmp_path):
+    m = model.load(write_model(tmp_path), nrow=2, ncol=3)
+    assert [f.name for f in m.files] == ['dimensions.param', 'test.param',
+                                        'cascades.param']
+    assert isinstance(m.files[tmp_path / 'cascades.param'], cascadeParamFile)
+    assert m.dimensions == {'nhru': 6, 'nmonths': 12, 'ncascade': 4}
+    assert m.params['hru_type'].array.shape == (2, 3)
+    assert m.params['hru_type'].model is m
+
+
+def test_parallel_load(tmp_path):
+    control_file = write_model(tmp_path)
+    m = model.load(control_file, nrow=2, ncol=3, cache=False)
+    m2 = model.load(control_file, nrow=2, ncol=3, cache=False, workers=2)
+    assert list(m2.files.keys()) == list(m.files.keys())
+    for filename, pf in m.files.items():
+        pf2 = m2.files[filename]
+        assert type(pf2) == type(pf)
+        assert pf2.model is m2
+        assert pf2.param_order == pf.param_order
+        for name, p in pf.params.items():
+            assert pf2.params[name].model is m2
+            assert np.array_equal(pf2.params[name].array, p.array)
+
+    m3 = model.load(control_file, cache=False, workers=2, skip='cascades')
+    assert [f.name for f in m3.files] == ['dimensions.param', 'test.param']
+    m4 = model.load(control_file, cache=False, workers=2,
+                    load_only=['test.param', 'cascades.param'])
+    assert [f.name for f in m4.files] == ['test.param', 'cascades.param']
+
+
+def test_param_index(tmp_path):
+    m = model.load(write_model(tmp_path), nrow=2, ncol=3)
+    params = m.params
+    assert m.params is params
+    assert m.nhru == 6
+    # the index is updated when parameters or files are added
+    test_param = m.files[tmp_path / 'test.param']
+    test_param.params['new'] = param('new', [1, 2], dtype=1)
+    assert 'new' in m.params
+    del test_param.params['new']
+    assert 'new' not in m.params
+    pf = paramFile.load(write_model(tmp_path).replace('test.control',
+                                                      'dimensions.param'))
+    pf.dimensions['nsegment'] = 3
+    m.files['other.param'] = pf
+    assert m.dimensions['nsegment'] == 3
+    del m.files['other.param']
+    assert 'nsegment' not in m.dimensions
+
+
+def test_active(tmp_path):
+    m = model.load(write_model(tmp_path), nrow=2, ncol=3)
+    hru_type = m.params['hru_type']
+    active = m.active
+    assert active.tolist() == [[False, True, True], [True, True, False]]
+    assert m.active is active
+    assert m.params['covden_sum'].nactive_values == 4
+    hru_type.array[0, 0] = 1
+    assert m.active is not active
+    assert m.active.sum() == 5
+    hru_type.array = np.zeros((2, 3), dtype=int)
+    assert m.active.sum() == 0
+
+
+def test_summary(tmp_path):
+    m = model.load(write_model(tmp_path), nrow=2, ncol=3)
+    df = m.get_summary_dataframe(['min', 'mean', 'max', 'std', 'p50', 'nnan'])
+    assert df.columns.tolist() == ['name', 'dimensions', 'nvalues',
+                                   'nactive_values', 'min', 'mean', 'max',
+                                   'std', 'p50', 'nnan', 'file']
+    df.index = df.name
+    # statistics only include the active HRUs
+    assert df.loc['covden_sum', 'nactive_values'] == 4
+    assert df.loc['covden_sum', 'min'] == 1e-05
+    assert df.loc['covden_sum', 'max'] == 0.5
+    assert np.isclose(df.loc['covden_sum', 'mean'], (0.5 * 2 + 0.25 + 1e-05) / 4)
+    # the HRU mask is repeated for each month
+    assert df.loc['jh_coef', 'nactive_values'] == 4 * 12
+    assert np.isnan(df.loc['model_name', 'min'])
+    assert df.loc['hru_up_id', 'nactive_values'] == 4
+    assert m.summary.columns.tolist() == ['name', 'dimensions', 'nvalues',
+                                          'nactive_values', 'min', 'mean',
+                                          'max', 'file']
+
+    # results are cached until the parameter changes
+    covden = m.params['covden_sum']
+    covden.get_stats()
+    stats = covden._stats
+    covden.get_stats(['min'])
+    assert covden._stats is stats
+    covden.array = covden.array * 2
+    assert covden.max == 1.0
+    # including in-place changes
+    covden.array[0, 1] = 3.
+    assert covden.max == 3.
+    assert m.summary.set_index('name').loc['covden_sum', 'max'] == 3.
+    covden.array[0, 1] = 1.
+    # or the active mask does
+    hru_type = m.params['hru_type']
+    hru_type.array = np.ones((2, 3), dtype=int)
+    assert covden.nactive_values == 6
+    assert covden.get_stats()['nactive_values'] == 6
+    assert covden.min == 2e-05
+
+
+def test_view(tmp_path):
+    # the dimensions are in a separate file from the parameters
+    m = model.load(write_model(tmp_path), nrow=2, ncol=3)
+    jh_coef = m.params['jh_coef']
+    assert jh_coef.dimensions == {}
+    assert jh_coef.view.shape == (12, 2, 3)
+    assert jh_coef.get_view(grid=False).shape == (12, 6)
+
+
+def test_compact_load(tmp_path):
+    m = model.load(write_model(tmp_path), nrow=2, ncol=3, compact=True)
+    assert m.params['hru_type'].array.dtype == np.int8
+    assert m.params['covden_sum'].array.dtype == np.float32
+    assert m.params['hru_pct_up'].array.dtype == np.float32
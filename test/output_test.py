@@ -0,0 +1,168 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pyrms import controlFile
+from pyrms.output import statVarFile, aniFile, csvOutputFile
+
+
+def write_statvar(path, ndays=100):
+    """Daily statvar output for basin_cfs and two HRUs of hru_ppt."""
+    dates = pd.date_range('2000-01-01', periods=ndays)
+    lines = ['3', 'basin_cfs 1', 'hru_ppt 1', 'hru_ppt 2']
+    for i, date in enumerate(dates):
+        lines.append('{} {} {} {} 0 0 0 {} {} {}'.format(
+            i + 1, date.year, date.month, date.day, i * 1.5, i, -i))
+    path.write_text('\n'.join(lines) + '\n')
+    return str(path)
+
+
+def test_statvar(tmp_path):
+    statvar = statVarFile(write_statvar(tmp_path / 'test.statvar'))
+    assert statvar.columns == ['basin_cfs_1', 'hru_ppt_1', 'hru_ppt_2']
+    df = statvar.read()
+    assert df.shape == (100, 3)
+    assert df.index[0] == pd.Timestamp('2000-01-01')
+    assert df.basin_cfs_1.tolist() == [i * 1.5 for i in range(100)]
+
+    chunks = list(statvar.iter_chunks(chunksize=30, variables='hru_ppt',
+                                      elements=2))
+    assert [len(c) for c in chunks] == [30, 30, 30, 10]
+    assert chunks[0].columns.tolist() == ['hru_ppt_2']
+    assert pd.concat(chunks).hru_ppt_2.tolist() == [-i for i in range(100)]
+
+    dates, values = next(statvar.iter_chunks(variables=['hru_ppt'], as_array=True))
+    assert values.shape == (100, 2)
+
+    with pytest.raises(ValueError):
+        statvar.read(variables='foo')
+
+
+def test_statvar_date_range(tmp_path):
+    ndays = 5000
+    statvar = statVarFile(write_statvar(tmp_path / 'test.statvar', ndays))
+    df = statvar.read(start='2005-03-01', end='2005-03-31', chunksize=7)
+    assert df.index.tolist() == pd.date_range('2005-03-01', '2005-03-31').tolist()
+    expected = (pd.Timestamp('2005-03-01') - pd.Timestamp('2000-01-01')).days
+    assert df.hru_ppt_1.iloc[0] == expected
+    # whole file, bounded and unbounded
+    assert len(statvar.read(start='1999-01-01', end='2050-01-01')) == ndays
+    assert len(statvar.read(start='2000-01-01')) == ndays
+    assert len(statvar.read(start='2050-01-01')) == 0
+
+
+def test_control_statvar(tmp_path):
+    (tmp_path / 'output').mkdir()
+    write_statvar(tmp_path / 'output' / 'test.statvar')
+    (tmp_path / 'test.control').write_text(
+        'Test control file\n####\nstat_var_file\n1\n4\noutput\\test.statvar\n')
+    ctrl = controlFile.load(str(tmp_path / 'test.control'))
+    statvar = ctrl.get_statvar_file()
+    assert statvar.nvariables == 3
+    assert np.allclose(statvar.read(elements=1).hru_ppt_1, np.arange(100))
+
+
+def write_ani(path, ndays=10, nhru=6, fixed=True):
+    """Animation output for hru_ppt and hru_actet; values are
+    day + hru / 10 and -(day + hru / 10)."""
+    lines = ['#', '# Begin DIMENSIONS', '# nhru = {}'.format(nhru),
+             '# End DIMENSIONS', '#',
+             'timestamp\tnhru\thru_ppt\thru_actet', '10d\t5n\t10n\t10n']
+    for date in pd.date_range('2000-01-01', periods=ndays):
+        for hru in range(1, nhru + 1):
+            value = date.dayofyear + hru / 10
+            if fixed:
+                lines.append('{:%Y-%m-%d}\t{:5d}\t{:10.2f}\t{:10.2f}'.format(
+                    date, hru, value, -value))
+            else:
+                lines.append('{:%Y-%m-%d}\t{}\t{}\t{}'.format(
+                    date, hru, value, -value))
+    path.write_text('\n'.join(lines) + '\n')
+    return str(path)
+
+
+@pytest.mark.parametrize('fixed', [True, False])
+def test_ani(tmp_path, fixed):
+    ani = aniFile(write_ani(tmp_path / 'test.ani', fixed=fixed), nrow=2, ncol=3)
+    assert ani.variables == ['hru_ppt', 'hru_actet']
+    assert ani.nhru == 6
+    assert ani.ntimes == 10
+    assert (ani.row_length is not None) == fixed
+    assert ani.dates[-1] == pd.Timestamp('2000-01-10')
+    dates, values = ani.get_data('hru_actet', start='2000-01-03', end='2000-01-05')
+    assert dates.tolist() == pd.date_range('2000-01-03', '2000-01-05').tolist()
+    assert values.shape == (3, 2, 3)
+    expected = -(np.arange(3, 6)[:, None] + np.arange(1, 7)[None, :] / 10)
+    assert np.allclose(values.reshape(3, 6), expected)
+    dates, values = ani.get_data('hru_ppt')
+    assert values.shape == (10, 2, 3)
+    assert values[0, 0, 0] == 1.1
+    dates, values = ani.get_data('hru_ppt', start='2001-01-01')
+    assert values.shape == (0, 2, 3)
+
+
+def test_control_ani(tmp_path):
+    write_ani(tmp_path / 'test.ani')
+    (tmp_path / 'test.control').write_text(
+        'Test control file\n####\nani_output_file\n1\n4\ntest.ani\n')
+    ctrl = controlFile.load(str(tmp_path / 'test.control'))
+    ani = ctrl.get_ani_file()
+    dates, values = ani.get_data('hru_ppt')
+    assert values.shape == (10, 6)
+
+
+def test_csv_tail(tmp_path):
+    filename = tmp_path / 'prms_summary.csv'
+    rows = ['{:%Y-%m-%d},{},{}\n'.format(date, i, i * 2.)
+            for i, date in enumerate(pd.date_range('2000-01-01', periods=5))]
+    filename.write_text('Date,basin_ppt,basin_cfs\n' + ''.join(rows[:2]))
+    csv = csvOutputFile(str(filename))
+    df = csv.tail()
+    assert df.columns.tolist() == ['basin_ppt', 'basin_cfs']
+    assert df.index.tolist() == pd.date_range('2000-01-01', periods=2).tolist()
+    assert len(csv.tail()) == 0
+    # a partially written row isn't read until it's complete
+    with open(filename, 'a') as dest:
+        dest.write(rows[2] + rows[3][:5])
+    assert csv.tail().basin_ppt.tolist() == [2]
+    with open(filename, 'a') as dest:
+        dest.write(rows[3][5:] + rows[4])
+    assert csv.tail().basin_cfs.tolist() == [6., 8.]
+    assert csv.position == filename.stat().st_size
+    # rewritten file is read from the start
+    filename.write_text('Date,basin_ppt,basin_cfs\n' + rows[0])
+    assert len(csv.tail()) == 1
+    assert len(csvOutputFile(str(filename)).read()) == 1
+    # rerun that has grown past the last position read
+    filename.write_text('Date,basin_ppt,basin_cfs\n' +
+                        ''.join(rows).replace(',', ', '))
+    assert csv.tail().basin_ppt.tolist() == [0, 1, 2, 3, 4]
+
+
+def test_csv_incomplete_header(tmp_path):
+    filename = tmp_path / 'prms_summary.csv'
+    filename.write_text('')
+    csv = csvOutputFile(str(filename))
+    assert len(csv.read()) == 0
+    assert len(csv.tail()) == 0
+    filename.write_text('Date,basin_')
+    assert len(csv.tail()) == 0
+    assert csv.position == 0
+    with open(filename, 'a') as dest:
+        dest.write('ppt\n2000-01-01,1.5\n')
+    assert csv.tail().basin_ppt.tolist() == [1.5]
+
+
+def test_map_output(tmp_path):
+    lines = ['# map results', '# hru_ppt']
+    for month in range(1, 4):
+        lines.append('2000 {}'.format(month))
+        lines += [' '.join(str(month * 10 + c) for c in range(3))
+                  for r in range(2)]
+    (tmp_path / 'test.map').write_text('\n'.join(lines) + '\n')
+    (tmp_path / 'test.control').write_text(
+        'Test control file\n####\nmap_output_file\n1\n4\ntest.map\n')
+    ctrl = controlFile.load(str(tmp_path / 'test.control'))
+    dates, values = ctrl.get_map_file(nrow=2, ncol=3).read()
+    assert dates.tolist() == pd.date_range('2000-01-01', periods=3, freq='MS').tolist()
+    assert values.shape == (3, 2, 3)
+    assert values[2].tolist() == [[30, 31, 32], [30, 31, 32]]
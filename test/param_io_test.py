@@ -0,0 +1,339 @@
+import io
+import numpy as np
+import pandas as pd
+import pytest
+from pyrms import paramFile
+from pyrms.dtypes import fmt
+from pyrms.param import paramBlock, read_values, write_values
+
+
+param_text = """Test parameter file
+** Dimensions **
+####
+nhru
+6
+####
+nmonths
+12
+** Parameters **
+####
+hru_type
+1
+nhru
+6
+1
+0
+1
+1
+2
+1
+0
+####
+covden_sum
+1
+nhru
+6
+2
+3*0.5
+0.25
+2*1e-05
+####
+jh_coef
+2
+nhru
+nmonths
+72
+2
+72*0.014
+####
+model_name
+1
+one
+2
+4
+gridded model
+test
+"""
+
+
+def write_param_file(path):
+    path.write_text(param_text)
+    return str(path)
+
+
+def test_read_values():
+    values = read_values('1\n2*3\n4\n', 1)
+    assert values.dtype == np.int64
+    assert values.tolist() == [1, 3, 3, 4]
+    values = read_values('2*0.5\n\n1.5\n', 2)
+    assert values.dtype == np.float64
+    assert values.tolist() == [0.5, 0.5, 1.5]
+    # ints are truncated, as with int(float(value))
+    assert read_values('2.7\n-2.7\n', 1).tolist() == [2, -2]
+    values = read_values('foo bar\n2*baz\n', 4)
+    assert values.tolist() == ['foo bar', 'baz', 'baz']
+
+
+def test_load(tmp_path):
+    pf = paramFile.load(write_param_file(tmp_path / 'test.param'),
+                        nrow=2, ncol=3)
+    assert pf.comments == 'Test parameter file\n'
+    assert pf.dimensions == {'nhru': 6, 'nmonths': 12}
+    assert pf.param_order == ['hru_type', 'covden_sum', 'jh_coef', 'model_name']
+    hru_type = pf.params['hru_type']
+    assert hru_type.array.shape == (2, 3)
+    assert hru_type.array.dtype == np.int64
+    assert hru_type.array.ravel().tolist() == [0, 1, 1, 2, 1, 0]
+    covden = pf.params['covden_sum']
+    assert covden.array.ravel().tolist() == [0.5, 0.5, 0.5, 0.25, 1e-05, 1e-05]
+    jh_coef = pf.params['jh_coef']
+    assert jh_coef.dim_names == ['nhru', 'nmonths']
+    assert jh_coef.nvalues == 72
+    assert np.allclose(jh_coef.array, 0.014)
+    assert pf.params['model_name'].array.tolist() == ['gridded model', 'test']
+
+
+def test_load_only(tmp_path):
+    pf = paramFile.load(write_param_file(tmp_path / 'test.param'),
+                        load_only='jh_coef')
+    assert list(pf.params.keys()) == ['jh_coef']
+    assert pf.params['jh_coef'].nvalues == 72
+
+
+def test_lazy_load(tmp_path):
+    filename = write_param_file(tmp_path / 'test.param')
+    pf = paramFile.load(filename, nrow=2, ncol=3, lazy=True)
+    assert pf.dimensions == {'nhru': 6, 'nmonths': 12}
+    assert not any(p.loaded for p in pf.params.values())
+    jh_coef = pf.params['jh_coef']
+    assert jh_coef.nvalues == 72
+    assert jh_coef.dtype == 2
+    assert not jh_coef.loaded
+    assert np.allclose(jh_coef.array, 0.014)
+    assert jh_coef.loaded
+    assert pf.params['hru_type'].array.shape == (2, 3)
+
+    # header offsets point to the #### delimiter for each parameter
+    with open(filename, 'rb') as src:
+        src.seek(jh_coef.block.header_offset)
+        assert src.readline() == b'####\n'
+        assert src.readline() == b'jh_coef\n'
+
+    # lazy params are read before their source file is overwritten
+    pf.write()
+    pf2 = paramFile.load(filename, nrow=2, ncol=3)
+    for name, p in pf.params.items():
+        assert np.array_equal(p.array, pf2.params[name].array)
+
+
+def test_lazy_load_modified_file(tmp_path):
+    filename = write_param_file(tmp_path / 'test.param')
+    pf = paramFile.load(filename, lazy=True)
+    with open(filename, 'a') as dest:
+        dest.write('####\nextra\n1\none\n1\n1\n1\n')
+    with pytest.raises(IOError):
+        pf.params['hru_type'].array
+
+
+def test_write_values():
+    values = np.array([0.1, 1e-05, 100.0, 1 / 3, 1e16, -0.0, np.nan, np.inf])
+    # output matches the pandas writer used previously
+    expected = io.StringIO()
+    pd.DataFrame(values).to_csv(expected, index=False, header=False,
+                                lineterminator='\n')
+    for chunksize in 3, 2**16:
+        output = io.StringIO()
+        write_values(output, values, chunksize=chunksize)
+        assert output.getvalue() == expected.getvalue()
+
+    strings = np.array(['a b', 'c,d', 'e"', ''])
+    expected = io.StringIO()
+    pd.DataFrame(strings).to_csv(expected, index=False, header=False,
+                                 lineterminator='\n')
+    output = io.StringIO()
+    write_values(output, strings)
+    assert output.getvalue() == expected.getvalue()
+
+    output = io.StringIO()
+    write_values(output, np.array([1, 2, 3]), fmt=fmt[2])
+    assert output.getvalue() == '1.0000000000000000\n2.0000000000000000\n' \
+                                '3.0000000000000000\n'
+
+
+def test_write_run_length(tmp_path):
+    values = np.array([0, 0, 0, 1, 2, 2, 0])
+    for chunksize in 2, 2**16:
+        output = io.StringIO()
+        write_values(output, values, run_length=True, chunksize=chunksize)
+        assert output.getvalue() == '3*0\n1\n2*2\n0\n'
+        assert read_values(output.getvalue(), 1).tolist() == values.tolist()
+
+    pf = paramFile.load(write_param_file(tmp_path / 'test.param'))
+    pf.write(str(tmp_path / 'rle.param'), run_length=True)
+    text = (tmp_path / 'rle.param').read_text()
+    assert '72*0.014\n' in text
+    pf2 = paramFile.load(str(tmp_path / 'rle.param'))
+    for name, p in pf.params.items():
+        assert np.array_equal(pf2.params[name].array, p.array)
+
+
+def test_modified(tmp_path):
+    pf = paramFile.load(write_param_file(tmp_path / 'test.param'),
+                        nrow=2, ncol=3, lazy=True)
+    hru_type = pf.params['hru_type']
+    assert not hru_type.modified
+    hru_type.array
+    assert not hru_type.modified
+    # item assignment is tracked
+    hru_type[0, 0] = 5
+    assert hru_type.modified
+    assert hru_type[0, 0] == 5
+    # other in-place changes are found by comparing digests
+    jh_coef = pf.params['jh_coef']
+    jh_coef.view[0] = 0.5
+    assert not jh_coef.modified
+    assert jh_coef.check_modified()
+    assert jh_coef.modified
+    # as are new arrays and header changes
+    pf.params['covden_sum'].array = pf.params['covden_sum'].array * 2
+    assert pf.params['covden_sum'].modified
+    pf.params['jh_coef'].dim_names = ['nhru', 'nmonths', 'one']
+    assert pf.params['jh_coef'].modified
+
+
+def test_incremental_write(tmp_path):
+    filename = write_param_file(tmp_path / 'test.param')
+    pf = paramFile.load(filename, lazy=True)
+    pf.params['covden_sum'][:] = 0.75
+    # unmodified entries are copied verbatim
+    pf.write(str(tmp_path / 'new.param'))
+    text = (tmp_path / 'new.param').read_text()
+    assert '72*0.014\n' in text
+    assert '3*0.5' not in text
+    assert not pf.params['jh_coef'].loaded
+    pf2 = paramFile.load(str(tmp_path / 'new.param'))
+    assert pf2.params['covden_sum'].array.tolist() == [0.75] * 6
+    assert np.allclose(pf2.params['jh_coef'].array, 0.014)
+    assert pf2.params['model_name'].array.tolist() == ['gridded model', 'test']
+    # writing everything formats all of the values
+    pf.write(str(tmp_path / 'full.param'), incremental=False)
+    assert '72*0.014\n' not in (tmp_path / 'full.param').read_text()
+
+    # overwrite the source file
+    assert pf.params['covden_sum'].modified
+    pf.write()
+    assert (tmp_path / 'test.param').read_text() == text
+    assert not any(p.modified for p in pf.params.values())
+    # parameters that haven't been read yet point to the new file
+    assert np.allclose(pf.params['jh_coef'].array, 0.014)
+
+
+def test_write_replacement_values(tmp_path):
+    filename = write_param_file(tmp_path / 'test.param')
+    pf = paramFile.load(filename, lazy=True)
+    pf.write(str(tmp_path / 'new.param'), values={'covden_sum': np.zeros(6)})
+    assert pf.params['covden_sum'].array.ravel().tolist() == \
+        [0.5, 0.5, 0.5, 0.25, 1e-05, 1e-05]
+    assert not pf.params['covden_sum'].modified
+    pf2 = paramFile.load(str(tmp_path / 'new.param'))
+    assert pf2.params['covden_sum'].array.tolist() == [0.] * 6
+    # the source file can't be overwritten with replacement values
+    with pytest.raises(ValueError):
+        pf.write(values={'covden_sum': np.zeros(6)})
+
+
+def test_compact(tmp_path):
+    filename = write_param_file(tmp_path / 'test.param')
+    with open(filename, 'a') as dest:
+        dest.write('####\nhru_id\n1\nnhru\n6\n1\n1\n2\n3\n4\n5\n1000\n'
+                   '####\nhru_lat\n1\nnhru\n6\n2\n'
+                   '44.123456789012\n44.1\n44.2\n44.3\n44.4\n44.5\n')
+    pf = paramFile.load(filename, compact=True, cache=False)
+    dtypes = {name: p.array.dtype for name, p in pf.params.items()}
+    assert dtypes['hru_type'] == np.int8
+    assert dtypes['hru_id'] == np.int32
+    assert dtypes['covden_sum'] == np.float32
+    assert dtypes['jh_coef'] == np.float32
+    # floats that float32 doesn't represent exactly stay float64
+    assert dtypes['hru_lat'] == np.float64
+    assert not any(p.modified for p in pf.params.values())
+
+    # same content and output as with the default dtypes
+    pf2 = paramFile.load(filename, cache=False)
+    assert len(pf.diff(pf2)) == 0
+    pf.write(str(tmp_path / 'compact.param'), incremental=False)
+    pf2.write(str(tmp_path / 'default.param'), incremental=False)
+    assert (tmp_path / 'compact.param').read_bytes() == \
+        (tmp_path / 'default.param').read_bytes()
+    pf.write(str(tmp_path / 'compact_rl.param'), incremental=False,
+             run_length=True)
+    pf2.write(str(tmp_path / 'default_rl.param'), incremental=False,
+              run_length=True)
+    assert (tmp_path / 'compact_rl.param').read_bytes() == \
+        (tmp_path / 'default_rl.param').read_bytes()
+
+
+def test_view(tmp_path):
+    filename = write_param_file(tmp_path / 'test.param')
+    pf = paramFile.load(filename, nrow=2, ncol=3)
+    jh_coef = pf.params['jh_coef']
+    # nhru is the fastest dimension
+    assert jh_coef.get_shape(grid=False) == (12, 6)
+    view = jh_coef.view
+    assert view.shape == (12, 2, 3)
+    assert np.shares_memory(view, jh_coef.array)
+    view[6] = 0.5
+    assert jh_coef.array[36:42].tolist() == [0.5] * 6
+    assert jh_coef.array[42] == 0.014
+    assert pf.params['hru_type'].view.shape == (2, 3)
+
+    # changes through the view are written (in PRMS order)
+    # without flagging them
+    assert not jh_coef.modified
+    pf.write(str(tmp_path / 'test2.param'))
+    pf2 = paramFile.load(str(tmp_path / 'test2.param'), nrow=2, ncol=3)
+    assert np.array_equal(pf2.params['jh_coef'].view, view)
+
+    # parameters without dimension sizes can't be shaped
+    jh_coef.dimensions = {}
+    with pytest.raises(ValueError):
+        jh_coef.get_shape()
+    # unless only one size is missing
+    jh_coef.dimensions = {'nmonths': 12}
+    assert jh_coef.get_shape() == (12, 2, 3)
+
+
+def test_verify_write(tmp_path, monkeypatch):
+    filename = write_param_file(tmp_path / 'test.param')
+    pf = paramFile.load(filename)
+    # in-place changes are written, without flagging them
+    pf.params['covden_sum'].array[:] = 0.75
+    pf.write(str(tmp_path / 'new.param'))
+    pf2 = paramFile.load(str(tmp_path / 'new.param'))
+    assert pf2.params['covden_sum'].array.tolist() == [0.75] * 6
+    # unless the changes are tracked by the caller
+    pf.params['jh_coef'].array[0] = 0.5
+    pf.write(str(tmp_path / 'new.param'), verify=False)
+    pf2 = paramFile.load(str(tmp_path / 'new.param'))
+    assert pf2.params['jh_coef'].array[0] == 0.014
+    assert pf2.params['covden_sum'].array.tolist() == [0.75] * 6
+
+    # no temporary file is left behind if the write fails
+    def fail(*args, **kwargs):
+        raise IOError('disk full')
+    monkeypatch.setattr(paramBlock, 'copy', fail)
+    with pytest.raises(IOError):
+        pf.write(filename)
+    assert list(tmp_path.glob('*.tmp')) == []
+
+
+def test_copy_crlf(tmp_path):
+    filename = tmp_path / 'test.param'
+    filename.write_bytes(param_text.replace('\n', '\r\n').encode())
+    pf = paramFile.load(str(filename), lazy=True)
+    for blocksize in [1, 2, 3, 7, 2**20]:
+        dest = io.StringIO()
+        for name in pf.param_order:
+            pf.params[name].block.copy(dest, blocksize=blocksize)
+        assert '\r' not in dest.getvalue()
+        assert dest.getvalue() == param_text[param_text.index('####\nhru_type'):]
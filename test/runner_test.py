@@ -0,0 +1,155 @@
+import os
+import sys
+import time
+import asyncio
+import numpy as np
+import pytest
+from pyrms import controlFile, paramFile
+from pyrms.runner import ensembleRunner
+from model_test import write_model
+
+pytestmark = pytest.mark.skipif(sys.platform == 'win32',
+                                reason='stub executable is a shell script')
+
+# stub model: reads the parameter files from the control file,
+# writes the sum of covden_sum to the model output file,
+# and sleeps for the number of seconds in the workspace name (if any)
+stub = """#!{python}
+import os, sys, time
+from pyrms import controlFile, paramFile
+name = os.path.basename(os.getcwd())
+with open({log!r}, 'a') as log:
+    log.write(name + '\\n')
+ctrl = controlFile.load(sys.argv[1])
+print('running', name, flush=True)
+total = 0
+for filename in ctrl.param_file.values:
+    pf = paramFile.load(filename, cache=False)
+    if 'covden_sum' in pf.params:
+        total += pf.params['covden_sum'].array.sum()
+if name.startswith('sleep'):
+    time.sleep(float(name[5:]))
+if name.startswith('fail'):
+    sys.exit(1)
+with open(ctrl.model_output_file.values[0], 'w') as dest:
+    dest.write(str(total))
+print('done', flush=True)
+"""
+
+
+@pytest.fixture
+def base(tmp_path):
+    (tmp_path / 'model').mkdir()
+    control_file = write_model(tmp_path / 'model')
+    with open(control_file, 'a') as dest:
+        dest.write('####\nmodel_output_file\n1\n4\noutput/prms.out\n'
+                   '####\nexecutable_model\n1\n4\nstub.py\n')
+    executable = tmp_path / 'model' / 'stub.py'
+    executable.write_text(stub.format(python=sys.executable,
+                                      log=str(tmp_path / 'runs.log')))
+    executable.chmod(0o755)
+    return control_file
+
+
+def get_runs(base):
+    with open(os.path.join(os.path.dirname(os.path.dirname(base)),
+                           'runs.log')) as src:
+        return src.read().split()
+
+
+def test_ensemble(base, tmp_path):
+    lines = []
+    runner = ensembleRunner(base, workspace=str(tmp_path / 'ensemble'),
+                            max_workers=2,
+                            on_output=lambda name, line: lines.append((name, line)))
+    for i in range(4):
+        pf = paramFile.load(str(tmp_path / 'model' / 'test.param'))
+        pf.params['covden_sum'].array = np.ones(6) * i
+        runner.add_member('run{}'.format(i), {'test.param': pf})
+    summary = runner.run()
+    assert summary.status.tolist() == ['success'] * 4
+    assert summary.returncode.tolist() == [0] * 4
+    assert sorted(get_runs(base)) == ['run0', 'run1', 'run2', 'run3']
+    for i, output in enumerate(summary.model_output_file):
+        with open(output) as src:
+            assert float(src.read()) == i * 6
+    assert ('run2', 'running run2') in lines
+    with open(tmp_path / 'ensemble' / 'run0' / 'stdout.txt') as src:
+        assert src.read() == 'running run0\ndone\n'
+
+    # resume; only runs that didn't succeed are repeated
+    os.remove(tmp_path / 'ensemble' / 'run1' / 'pyrms_status.json')
+    summary = runner.run()
+    assert summary.status.tolist() == ['success'] * 4
+    assert summary.resumed.tolist() == [True, False, True, True]
+    assert sorted(get_runs(base)) == ['run0', 'run1', 'run1', 'run2', 'run3']
+
+
+def test_timeout_and_failure(base, tmp_path):
+    runner = ensembleRunner(base, workspace=str(tmp_path / 'ensemble'),
+                            timeout=1)
+    runner.add_member('sleep10')
+    runner.add_member('fail')
+    runner.add_member('ok')
+    start = time.time()
+    summary = runner.run().set_index('name')
+    assert time.time() - start < 5
+    assert summary.status.to_dict() == {'sleep10': 'timeout', 'fail': 'failed',
+                                        'ok': 'success'}
+    assert summary.loc['fail', 'returncode'] == 1
+
+
+def test_cancel(base, tmp_path):
+    # cancel once the first run has started
+    runner = ensembleRunner(base, workspace=str(tmp_path / 'ensemble'),
+                            max_workers=1,
+                            on_output=lambda name, line: runner.cancel())
+    runner.add_member('sleep2')
+    runner.add_member('sleep0')
+    summary = runner.run()
+    assert summary.status.tolist() == ['cancelled', 'cancelled']
+    assert get_runs(base) == ['sleep2']
+
+    # the cancelled runs are repeated when the ensemble is resumed
+    runner.on_output = None
+    summary = asyncio.run(runner.run_async())
+    assert summary.status.tolist() == ['success', 'success']
+    assert get_runs(base) == ['sleep2', 'sleep2', 'sleep0']
+
+
+def test_setup(base, tmp_path):
+    model_ws = tmp_path / 'model'
+    (model_ws / 'cbh').mkdir()
+    (model_ws / 'cbh' / 'precip.day').write_text('precip\n')
+    (model_ws / 'imperv.dyn').write_text('imperv\n')
+    (model_ws / 'prms.statvar').write_text('old output\n')
+    with open(base, 'a') as dest:
+        dest.write('####\nvar_init_file\n1\n4\nprms_ic.in\n'
+                   '####\nprecip_day\n1\n4\ncbh/precip.day\n'
+                   '####\nimperv_frac_dynamic\n1\n4\nimperv.dyn\n'
+                   '####\nstat_var_file\n1\n4\nprms.statvar\n'
+                   '####\nmodel_mode\n1\n4\nPRMS\n')
+    runner = ensembleRunner(base, workspace=str(tmp_path / 'ensemble'))
+    member = runner.add_member('run0')
+    runner.setup(member)
+    ctrl = controlFile.load(str(tmp_path / 'ensemble' / 'run0' / 'test.control'))
+    for name, filename in [('var_init_file', 'prms_ic.in'),
+                           ('precip_day', 'cbh/precip.day'),
+                           ('imperv_frac_dynamic', 'imperv.dyn')]:
+        assert ctrl.__dict__[name].values == [str(model_ws / filename)]
+    # outputs are written to the workspace
+    assert ctrl.stat_var_file.values == ['prms.statvar']
+    assert ctrl.model_output_file.values == ['output/prms.out']
+    assert ctrl.model_mode.values == ['PRMS']
+
+    # parameter files with the same names, in different folders
+    runner.ctrl.param_file.values = ['a/test.param', 'b/test.param']
+    pf = paramFile.load(str(model_ws / 'test.param'))
+    member = runner.add_member('run1', {'b/test.param': pf})
+    assert runner.get_param_files(member) == \
+        [str(model_ws / 'a' / 'test.param'), 'b/test.param']
+    runner.setup(member)
+    assert (tmp_path / 'ensemble' / 'run1' / 'b' / 'test.param').exists()
+    member = runner.add_member('run2', {'test.param': pf})
+    with pytest.raises(ValueError):
+        runner.get_param_files(member)
@@ -0,0 +1,85 @@
+import os
+import pickle
+import logging
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pytest
+import pyrms.shared
+from pyrms import model, param
+from pyrms.shared import sharedModel, attach, shm_dir
+from model_test import write_model
+
+
+def get_sum(descriptor):
+    with attach(descriptor) as attached:
+        return float(attached.params['covden_sum'].array.sum())
+
+
+def test_shared_model(tmp_path):
+    m = model.load(write_model(tmp_path), nrow=2, ncol=3, compact=True)
+    with sharedModel(m) as shared:
+        assert len(shared.segments) == 7
+        descriptor = pickle.loads(pickle.dumps(shared.descriptor))
+
+        attached = attach(descriptor)
+        m2 = attached.model
+        assert list(m2.files) == list(m.files)
+        assert m2.dimensions == m.dimensions
+        assert len(m.diff(m2)) == 0
+        hru_type = m2.params['hru_type']
+        assert hru_type.array.shape == (2, 3)
+        assert hru_type.array.dtype == np.int8
+        assert hru_type.model is m2
+        assert m2.get_active(6).sum() == 4
+        with pytest.raises(ValueError):
+            hru_type.array[0, 0] = 1
+        # cascades are rebuilt from the shared parameters
+        key = list(m.files)[2]
+        assert m2.files[key].graph.nlinks == m.files[key].graph.nlinks
+        attached.close()
+
+        # copy-on-write views; changes aren't seen by other processes
+        with attach(descriptor, copy_on_write=True) as attached:
+            attached.params['covden_sum'].array[:] = 0
+            assert attached.params['covden_sum'].array.sum() == 0
+            with attach(descriptor) as attached2:
+                assert np.array_equal(attached2.params['covden_sum'].array,
+                                      m.params['covden_sum'].array)
+
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            sums = list(executor.map(get_sum, [descriptor] * 4))
+        assert np.allclose(sums, m.params['covden_sum'].array.sum())
+        names = [shm.name for shm in shared.segments]
+    # segments are removed when the shared model is closed
+    if os.path.isdir(shm_dir):
+        assert not any(os.path.exists(os.path.join(shm_dir, name.lstrip('/')))
+                       for name in names)
+
+
+def test_from_array():
+    array = np.arange(6, dtype=np.int8)
+    p = param.from_array('hru_type', array, dim_names=['nhru'], nrow=2, ncol=3)
+    assert p.dtype == 1
+    assert p.array.shape == (2, 3)
+    assert p.array.dtype == np.int8
+    assert np.shares_memory(p.array, array)
+    assert p.modified
+    assert not np.shares_memory(param.from_array('x', array, copy=True).array,
+                                array)
+    assert param.from_array('x', np.zeros(2)).dtype == 2
+
+
+def test_close_in_use(tmp_path, monkeypatch, caplog):
+    # attach through SharedMemory, as on platforms without /dev/shm
+    monkeypatch.setattr(pyrms.shared, 'shm_dir', str(tmp_path / 'no_shm'))
+    m = model.load(write_model(tmp_path), nrow=2, ncol=3)
+    with sharedModel(m) as shared:
+        attached = attach(shared.descriptor)
+        array = attached.params['covden_sum'].array
+        with caplog.at_level(logging.WARNING, logger='pyrms.shared'):
+            attached.close()
+        assert 'still in use' in caplog.text
+        assert array.sum() == m.params['covden_sum'].array.sum()
+        del array
+        attached.close()
+        assert len(attached._handles) == 0
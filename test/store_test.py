@@ -0,0 +1,103 @@
+import os
+import numpy as np
+import pytest
+from pyrms import model, paramFile
+from pyrms.store import arrayStore
+from param_io_test import write_param_file
+from model_test import write_model
+
+
+def test_save_and_load(tmp_path):
+    filename = write_param_file(tmp_path / 'test.param')
+    pf = paramFile.load(filename)
+    store = arrayStore(str(tmp_path / 'store'))
+    manifest = pf.save(store, 'run0', metadata={'rmse': 1.5})
+    assert list(manifest['files']) == ['test.param']
+    assert len(os.listdir(store.runs_path)) == 1
+    nblobs = sum(len(files) for _, _, files in os.walk(store.blobs_path))
+    assert nblobs == 4
+
+    # only changed arrays are added
+    pf.params['covden_sum'].array = pf.params['covden_sum'].array * 2
+    pf.save(store, 'run1', metadata={'rmse': 1.2})
+    assert sum(len(files) for _, _, files in os.walk(store.blobs_path)) == 5
+    assert store.runs == ['run0', 'run1']
+    assert store.summary.rmse.tolist() == [1.5, 1.2]
+
+    pf0 = paramFile.load_from_store(str(tmp_path / 'store'), 'run0', nrow=2, ncol=3)
+    original = paramFile.load(filename, nrow=2, ncol=3)
+    assert pf0.comments == original.comments
+    assert pf0.dimensions == original.dimensions
+    assert pf0.param_order == original.param_order
+    assert len(original.diff(pf0)) == 0
+    assert pf0.params['hru_type'].array.shape == (2, 3)
+    assert pf0.params['model_name'].array.tolist() == ['gridded model', 'test']
+    pf1 = store.load('run1')['test.param']
+    assert original.diff(pf1).name.tolist() == ['covden_sum']
+
+    # removing a run, and the arrays that only it used
+    store.remove('run1')
+    assert store.prune() == 1
+    assert store.runs == ['run0']
+
+
+def test_rebuild_model(tmp_path):
+    (tmp_path / 'model').mkdir()
+    control_file = write_model(tmp_path / 'model')
+    m = model.load(control_file)
+    store = arrayStore(str(tmp_path / 'store'))
+    store.save('base', m)
+    filenames = store.write('base', str(tmp_path / 'rebuilt'))
+    assert [os.path.split(f)[1] for f in filenames] == \
+        ['dimensions.param', 'test.param', 'cascades.param']
+    for f in filenames:
+        original = paramFile.load(str(tmp_path / 'model' / os.path.split(f)[1]))
+        rebuilt = paramFile.load(f)
+        assert rebuilt.dimensions == original.dimensions
+        assert len(original.diff(rebuilt)) == 0
+        for name, p in original.params.items():
+            assert np.array_equal(p.array, rebuilt.params[name].array)
+
+
+def test_same_file_names(tmp_path):
+    for folder in 'a', 'b':
+        (tmp_path / folder).mkdir()
+        write_param_file(tmp_path / folder / 'test.param')
+    pfs = [paramFile.load(str(tmp_path / folder / 'test.param'))
+           for folder in ('a', 'b')]
+    pfs[1].params['covden_sum'].array = pfs[1].params['covden_sum'].array * 2
+    store = arrayStore(str(tmp_path / 'store'))
+    manifest = store.save('run0', pfs)
+    assert list(manifest['files']) == ['a/test.param', 'b/test.param']
+    loaded = store.load('run0')
+    assert pfs[0].params['covden_sum'].digest == \
+        loaded['a/test.param'].params['covden_sum'].digest
+    assert pfs[1].diff(loaded['b/test.param']).empty
+    filenames = store.write('run0', str(tmp_path / 'rebuilt'))
+    assert [os.path.relpath(f, str(tmp_path / 'rebuilt')).replace(os.sep, '/')
+            for f in filenames] == ['a/test.param', 'b/test.param']
+
+    # files are loaded by their paths in the run
+    store_path = str(tmp_path / 'store')
+    pf = paramFile.load_from_store(store_path, 'run0', filename='b/test.param')
+    assert pfs[1].diff(pf).empty
+    with pytest.raises(ValueError):
+        paramFile.load_from_store(store_path, 'run0', filename='test.param')
+    with pytest.raises(KeyError):
+        paramFile.load_from_store(store_path, 'run0', filename='other.param')
+    # or their file names, if they're unique
+    pfs[1].save(store, 'run1')
+    pf = paramFile.load_from_store(store_path, 'run1', filename='test.param')
+    assert pfs[1].diff(pf).empty
+
+
+def test_in_place_changes(tmp_path):
+    filename = write_param_file(tmp_path / 'test.param')
+    pf = paramFile.load(filename)
+    store = arrayStore(str(tmp_path / 'store'))
+    pf.save(store, 'run0')
+    pf.params['covden_sum'].array[0] = 0.9
+    pf.save(store, 'run1')
+    pf1 = store.load('run1')['test.param']
+    assert pf1.params['covden_sum'].array[0] == 0.9
+    assert store.load('run0')['test.param'].params['covden_sum'].array[0] != 0.9
@@ -0,0 +1,43 @@
+import numpy as np
+from pyrms import model, controlFile
+from pyrms.synthetic import write_synthetic_model, get_grid_shape, get_xy_points
+
+
+def test_synthetic_model(tmp_path):
+    control_file = write_synthetic_model(str(tmp_path / 'model'), nrow=20, ncol=30)
+    ctrl = controlFile.load(control_file)
+    assert ctrl.param_file.values == ['dimensions.param', 'params.param',
+                                      'cascades.param']
+    assert ctrl.get_data_file().variables == {'tmax': 1, 'tmin': 1, 'precip': 1}
+    m = model.load(control_file, nrow=20, ncol=30,
+                   xy_points=get_xy_points(20, 30))
+    assert m.dimensions['nhru'] == 600
+    assert m.params['hru_type'].array.shape == (20, 30)
+    assert 0 < m.active.sum() < 600
+    jh_coef = m.params['jh_coef']
+    assert jh_coef.dim_names == ['nhru', 'nmonths']
+    assert np.allclose(jh_coef.array.reshape(12, 600)[:, 0],
+                       np.linspace(0.012, 0.016, 12))
+    # runs of repeated values are written in the N*value format
+    text = (tmp_path / 'model' / 'params.param').read_text()
+    assert '600*0.012\n' in text
+
+    cascades = m.files[tmp_path / 'model' / 'cascades.param']
+    graph = cascades.graph
+    assert not graph.has_cycles
+    assert graph.nlinks + len(cascades.get_outlet_coordinates()[0]) == \
+        m.dimensions['ncascade']
+    # only active HRUs cascade
+    up_id = m.params['hru_up_id'].array
+    assert m.params['hru_type'].array.ravel()[up_id - 1].min() == 1
+    assert len(cascades.df) == graph.nlinks
+
+    # same model for the same seed
+    write_synthetic_model(str(tmp_path / 'model2'), nrow=20, ncol=30)
+    assert (tmp_path / 'model2' / 'params.param').read_text() == text
+
+
+def test_grid_shape():
+    nrow, ncol = get_grid_shape(10**6)
+    assert abs(nrow * ncol - 10**6) < 1000
+    assert get_grid_shape(1) == (1, 1)